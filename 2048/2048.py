@@ -1,144 +1,345 @@
-from enum import IntEnum
 import random
-from typing import List
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 
+import bitboard
+from cell_index import EmptyCellIndex
+from direction import Direction
+from expectimax import ExpectimaxPlayer
+from game_log import GameRecorder, LoggedGame, MoveEvent
 
-class Direction(IntEnum):
-    UP = 1
-    RIGHT = 2
-    DOWN = 3
-    LEFT  = 4
 
+WINNING_TILE = 2048
 
-class Position:
-    row: int
-    column: int
+
+def build_lines(size: int) -> Dict[Direction, List[List[Tuple[int, int]]]]:
+    # every row or column as the cells a move walks, starting from the edge
+    # the tiles slide towards
+    rows = [[(row, column) for column in range(size)] for row in range(size)]
+    columns = [[(row, column) for row in range(size)] for column in range(size)]
+    return {
+        Direction.LEFT: rows,
+        Direction.RIGHT: [line[::-1] for line in rows],
+        Direction.UP: columns,
+        Direction.DOWN: [line[::-1] for line in columns],
+    }
+
+
+def merge_line(values: List[Optional[int]]) -> Tuple[List[Optional[int]], int]:
+    tiles = [value for value in values if value is not None]
+    merged = []
+    score = 0
+    index = 0
+    while index < len(tiles):
+        value = tiles[index]
+        if index + 1 < len(tiles) and tiles[index + 1] == value:
+            value *= 2
+            score += value
+            index += 1
+        merged.append(value)
+        index += 1
     
-    def left(self):
-        return Position(self.row, self.column - 1) if self.column - 1 >= 0 else None
+    return merged + [None] * (len(values) - len(merged)), score
+
+
+def rotate_layout(layout: List[List[Optional[int]]], size: int):
+    max_layer = round(size/2)
+
+    for layer in range(0, max_layer):
+        first = layer
+        last = size - 1 - layer
+        for index in range(first, last):
+            offset = index - layer
+            
+            top = layout[first][index]
+            layout[first][index] = layout[last - offset][first]
+            layout[last - offset][first] = layout[last][last - offset]
+            layout[last][last - offset] = layout[index][last]
+            layout[index][last] = top
 
 
-class Tile:
-    value: int
+def build_rotated_cells(size: int) -> List[int]:
+    # where each cell ends up after rotate_layout, which turns the board clockwise
+    return [column * size + size - 1 - row for row in range(size) for column in range(size)]
+
+
+def layout_key(layout: List[List[Optional[int]]]) -> int:
+    # one byte per cell holding the tile's exponent, row 0 in the low bytes like
+    # the bitboard's nibbles; 4x4 boards use the bitboard itself as their key
+    exponents = bytes(value.bit_length() - 1 if value else 0 for row in layout for value in row)
+    return int.from_bytes(exponents, 'little')
 
 
 class Board:
     size = 4
     score: int
     is_playable: bool
-    layout = List[List[Tile]]
+    use_bitboard: bool
+    layout: List[List[Optional[int]]]
+    bitboard: int
+    moves: int
+    empty_cells: EmptyCellIndex
+    # neighbouring cells holding equal tiles, so a full board knows whether
+    # it can still move without scanning for a merge
+    merge_pairs: int
+    lines: Dict[Direction, List[List[Tuple[int, int]]]]
+    rotated_cells: List[int]
+    recorder: Optional[GameRecorder]
     
-    def __init__(self):
+    def __init__(self, use_bitboard: bool = False, rng: Optional[random.Random] = None, size: int = 4,
+                 recorder: Optional[GameRecorder] = None, spawn_tiles: bool = True):
+        if size < 2:
+            raise ValueError(f'Board size must be at least 2, got {size}')
+        if use_bitboard and size != bitboard.BOARD_SIZE:
+            raise ValueError(f'The bitboard backend only supports {bitboard.BOARD_SIZE}x{bitboard.BOARD_SIZE} boards')
+        
+        self.size = size
         self.score = 0
         self.is_playable = True
-        columns = [None] * self.size
-        self.layout = columns * self.size
+        self.use_bitboard = use_bitboard
+        self.rng = rng or random
+        self.moves = 0
+        self.layout = [[None] * self.size for _ in range(self.size)]
+        self.empty_cells = EmptyCellIndex(self.size * self.size)
+        self.merge_pairs = 0
+        self.lines = build_lines(self.size)
+        self.rotated_cells = build_rotated_cells(self.size)
+        self.bitboard = 0
+        self.recorder = recorder
+        
+        if spawn_tiles:
+            self.generate_tile()
+            self.generate_tile()
+        
+        
+    @classmethod
+    def replay(cls, game: LoggedGame, use_bitboard: bool = False) -> Iterator[Tuple['Board', Direction]]:
+        board = cls(use_bitboard=use_bitboard, size=game.size, spawn_tiles=False)
         
-        self.generate_tile()
-        self.generate_tile()
+        # yields the position each move was played from, the board is only
+        # moved on once the caller asks for the next one
+        for event in game.events():
+            if isinstance(event, MoveEvent):
+                yield board, event.direction
+                board.play_move(event.direction)
+            else:
+                board.place_tile(event.cell, event.value)
+        
+        
+    def get_layout(self) -> List[List[Optional[int]]]:
+        if self.use_bitboard:
+            return bitboard.to_layout(self.bitboard)
+        
+        return [list(row) for row in self.layout]
         
         
     def generate_tile(self):
-        possible_tile_values = [2, 4]
-        empty_positions = []
-        for row_index in range(self.size):
-            for column_index in range(self.size):
-                if self.layout[row_index][column_index] is None:
-                    empty_positions.append(Position(row_index, column_index))
-        
-        if not empty_positions:
-            self.is_playable = False
+        if self.use_bitboard:
+            spawn = bitboard.choose_spawn(self.bitboard, self.rng)
+            if spawn is not None:
+                cell, exponent = spawn
+                self.place_tile(cell, 1 << exponent)
+            
+            self.is_playable = bitboard.can_move(self.bitboard)
             return
-
-        random_position = random.choice(empty_positions)
-        random_value = random.choice(possible_tile_values)
-        self.layout[random_position.row][random_position.column] = random_value
         
+        possible_tile_values = [2, 4]
+        if self.empty_cells:
+            cell = self.empty_cells.choice(self.rng)
+            random_value = self.rng.choice(possible_tile_values)
+            self.place_tile(cell, random_value)
         
-    def play_move(self, direction: Direction):
-        rotations_to_left = Direction.LEFT - direction
-        rotations_back = Direction
+        self.is_playable = bool(self.empty_cells) or self.merge_pairs > 0
         
-        self.rotate_n_times(rotations_to_left)
         
-        self.play_move_left()
+    def place_tile(self, cell: int, value: int):
+        if self.recorder:
+            self.recorder.record_spawn(cell, value)
         
-        self.rotate_n_times(rotations_back)
+        if self.use_bitboard:
+            self.bitboard = bitboard.place_tile(self.bitboard, cell, value.bit_length() - 1)
+            return
         
+        self.merge_pairs -= self.count_merge_pairs([cell])
+        self.layout[cell // self.size][cell % self.size] = value
+        self.empty_cells.remove(cell)
+        self.merge_pairs += self.count_merge_pairs([cell])
         
-    def play_move_left(self):
-        for row_index in range(self.size):
-            last_free_space = None
-            for column_index in range(self.size):
-                position = Position(row_index, column_index)
-                
-                last_free_space = self.try_move(last_free_space, position)
-                last_free_space = self.try_merge(last_free_space, position)
-           
+        
+    def count_merge_pairs(self, cells: List[int]) -> int:
+        # pairs touching any of the cells, a pair between two of them counted once
+        layout = self.layout
+        size = self.size
+        cell_set = set(cells)
+        pairs = 0
+        for cell in cells:
+            row, column = divmod(cell, size)
+            value = layout[row][column]
+            if value is None:
+                continue
+            for next_row, next_column in ((row, column - 1), (row, column + 1), (row - 1, column), (row + 1, column)):
+                if 0 <= next_row < size and 0 <= next_column < size and layout[next_row][next_column] == value:
+                    next_cell = next_row * size + next_column
+                    if next_cell not in cell_set or next_cell > cell:
+                        pairs += 1
+        return pairs
+        
+        
+    def legal_moves(self) -> FrozenSet[Direction]:
+        if self.use_bitboard:
+            return bitboard.legal_moves(self.bitboard)
+        
+        legal = set()
+        for direction, opposite in ((Direction.LEFT, Direction.RIGHT), (Direction.UP, Direction.DOWN)):
+            for line in self.lines[direction]:
+                values = [self.layout[row][column] for row, column in line]
+                for value, next_value in zip(values, values[1:]):
+                    if value is not None and value == next_value:
+                        legal.update((direction, opposite))
+                    elif value is None and next_value is not None:
+                        legal.add(direction)
+                    elif value is not None and next_value is None:
+                        legal.add(opposite)
                 
-    def try_move(self, last_free_space: int, position: Position):
-        if self.layout[position.row][position.column] is None:
-            return last_free_space if last_free_space else position.column
+                if len(legal) == len(Direction):
+                    return frozenset(legal)
         
-        if last_free_space is None:
-            return last_free_space
+        return frozenset(legal)
         
-        self.layout[position.row][last_free_space] = self.layout[position.row][position.column]
-        self.layout[position.row][position.column] = None
-        return last_free_space + 1
         
-
-    def try_merge(self, last_free_space: int, position: Position):
-        position = Position(position.row, last_free_space - 1) if last_free_space else position
+    def play_move(self, direction: Direction) -> bool:
+        if self.use_bitboard:
+            moved, score = bitboard.move(self.bitboard, direction)
+            has_moved = moved != self.bitboard
+            self.bitboard = moved
+            self.score += score
+        else:
+            has_moved = False
+            for line in self.lines[direction]:
+                has_moved = self.slide_line(line) or has_moved
+        
+        # a move that changes nothing is not a turn, and replaying it would do nothing
+        if has_moved:
+            self.moves += 1
+            if self.recorder:
+                self.recorder.record_move(direction)
+        return has_moved
         
-        left_position = position.left()
-        if not left_position:
-            return last_free_space
         
-        if self.layout[left_position.row][left_position.column].value == self.layout[position.row][position.column].value:
-            self.layout[left_position.row][left_position.column].value *= 2
-            self.score += self.layout[left_position.row][left_position.column].value
-            self.layout[position.row][position.column]
-            return last_free_space - 1
+    def slide_line(self, line: List[Tuple[int, int]]) -> bool:
+        layout = self.layout
+        values = [layout[row][column] for row, column in line]
+        merged, score = merge_line(values)
+        if merged == values:
+            return False
         
-        return last_free_space
+        self.score += score
+        changed = [row * self.size + column for (row, column), old_value, new_value in zip(line, values, merged)
+                   if old_value != new_value]
+        self.merge_pairs -= self.count_merge_pairs(changed)
+        for (row, column), old_value, new_value in zip(line, values, merged):
+            if old_value == new_value:
+                continue
+            
+            layout[row][column] = new_value
+            if new_value is None:
+                self.empty_cells.add(row * self.size + column)
+            elif old_value is None:
+                self.empty_cells.remove(row * self.size + column)
+        self.merge_pairs += self.count_merge_pairs(changed)
+        
+        return True
     
         
+    def max_tile(self) -> int:
+        if self.use_bitboard:
+            exponent = bitboard.max_exponent(self.bitboard)
+            return 1 << exponent if exponent else 0
+        
+        return max(value or 0 for row in self.layout for value in row)
+        
+        
+    def key(self) -> int:
+        if self.use_bitboard:
+            return self.bitboard
+        # the same key on either backend, so tables can be shared between them
+        if self.size == bitboard.BOARD_SIZE:
+            return bitboard.from_layout(self.layout)
+        
+        return layout_key(self.layout)
+        
+        
+    def canonical_key(self) -> int:
+        if self.size == bitboard.BOARD_SIZE:
+            return bitboard.canonical(self.key())
+        
+        # the 4 turns of the board and the mirror image of each
+        layout = self.get_layout()
+        keys = []
+        for _ in range(len(Direction)):
+            keys.append(layout_key(layout))
+            keys.append(layout_key([row[::-1] for row in layout]))
+            rotate_layout(layout, self.size)
+        
+        return min(keys)
+        
+        
     def rotate_n_times(self, rotations: int):
         for n in range(rotations):
             self.rotate()
         
     
     def rotate(self):
-        max_layer = round(self.size/2)
-
-        for layer in range(0, max_layer):
-            first = layer
-            last = self.size - 1 - layer
-            for index in range(first, last):
-                offset = index - layer
-                
-                top = self.layout[first][index]
-                self.layout[first][index] = self.layout[last - offset][first]
-                self.layout[last - offset][first] = self.layout[last][last - offset]
-                self.layout[last][last - offset] = self.layout[index][last]
-                self.layout[index][last] = top
+        if self.use_bitboard:
+            self.bitboard = bitboard.rotate(self.bitboard)
+            return
+        
+        # a turn keeps neighbours next to each other, so merge_pairs stays as it is
+        rotate_layout(self.layout, self.size)
+        self.empty_cells.remap(self.rotated_cells)
 
 
 class Game:
-    def start(self):
-        board = Board()
+    player: ExpectimaxPlayer
+    size: int
+    use_bitboard: bool
+    stop_at_win: bool
+    
+    def __init__(self, player: Optional[ExpectimaxPlayer] = None, rng: Optional[random.Random] = None,
+                 recorder: Optional[GameRecorder] = None, size: int = bitboard.BOARD_SIZE, use_bitboard: bool = True,
+                 stop_at_win: bool = True):
+        self.player = player or ExpectimaxPlayer()
+        self.rng = rng
+        self.recorder = recorder
+        self.size = size
+        self.use_bitboard = use_bitboard
+        self.stop_at_win = stop_at_win
+        
         
-        while board.is_playable and not self.is_won(board.score):
-            direction = self.get_player_move()
+    def start(self) -> Board:
+        board = Board(use_bitboard=self.use_bitboard, rng=self.rng, size=self.size, recorder=self.recorder)
+        
+        while board.is_playable and not (self.stop_at_win and self.is_won(board)):
+            direction = self.get_player_move(board)
+            if direction is None:
+                board.is_playable = False
+                break
             
-            board.play_move(direction)
+            if board.play_move(direction):
+                board.generate_tile()
+        
+        return board
+        
         
+    def get_player_move(self, board: Board) -> Optional[Direction]:
+        if board.use_bitboard:
+            return self.player.get_move(board.bitboard)
+        if board.size == bitboard.BOARD_SIZE:
+            return self.player.get_move(bitboard.from_layout(board.layout))
         
-    def get_player_move(self):
-        # do something to get move
-        return
+        # the player only searches 4x4 boards, other sizes fall back to the
+        # first legal move the way the player does when it runs out of time
+        return min(board.legal_moves(), default=None)
         
         
-    def is_won(self, score: int):
-        return score == 2048
\ No newline at end of file
+    def is_won(self, board: Board) -> bool:
+        return board.max_tile() >= WINNING_TILE
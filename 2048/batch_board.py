@@ -0,0 +1,128 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+import bitboard
+from direction import Direction
+
+# the scalar bitboard row tables laid end to end, left moves then right moves
+ROW_TABLE = np.array(bitboard.ROW_LEFT + bitboard.ROW_RIGHT, dtype=np.uint16)
+SCORE_TABLE = np.array(bitboard.SCORE_LEFT + bitboard.SCORE_RIGHT, dtype=np.int64)
+RIGHT_TABLE_OFFSET = bitboard.ROW_MASK + 1
+ROW_CAN_MOVE = np.array(
+    [left != row or right != row for row, (left, right) in enumerate(zip(bitboard.ROW_LEFT, bitboard.ROW_RIGHT))],
+    dtype=np.uint8,
+)
+
+
+def pack_boards(cells: np.ndarray) -> np.ndarray:
+    # two cells per byte, then the 8 bytes of a board read as one little-endian
+    # uint64 laid out exactly like the scalar bitboard
+    pairs = cells[..., 0::2] | (cells[..., 1::2] << 4)
+    return np.ascontiguousarray(pairs).reshape(len(cells), -1).view('<u8')[:, 0]
+
+
+def unpack_boards(boards: np.ndarray) -> np.ndarray:
+    pairs = np.ascontiguousarray(boards, dtype='<u8')[:, np.newaxis].view(np.uint8)
+    cells = np.empty((len(boards), bitboard.CELL_COUNT), dtype=np.uint8)
+    cells[:, 0::2] = pairs & bitboard.CELL_MASK
+    cells[:, 1::2] = pairs >> 4
+    return cells.reshape(len(boards), bitboard.BOARD_SIZE, bitboard.BOARD_SIZE)
+
+
+def get_rows(boards: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(boards, dtype='<u8').view('<u2').reshape(len(boards), bitboard.BOARD_SIZE)
+
+
+def transpose_boards(boards: np.ndarray) -> np.ndarray:
+    a1 = boards & np.uint64(0xF0F00F0FF0F00F0F)
+    a2 = boards & np.uint64(0x0000F0F00000F0F0)
+    a3 = boards & np.uint64(0x0F0F00000F0F0000)
+    a = a1 | (a2 << np.uint64(12)) | (a3 >> np.uint64(12))
+    b1 = a & np.uint64(0xFF00FF0000FF00FF)
+    b2 = a & np.uint64(0x00FF00FF00000000)
+    b3 = a & np.uint64(0x00000000FF00FF00)
+    return b1 | (b2 >> np.uint64(24)) | (b3 << np.uint64(24))
+
+
+def sum_rows(values: np.ndarray) -> np.ndarray:
+    return values[:, 0] + values[:, 1] + values[:, 2] + values[:, 3]
+
+
+class BatchBoard:
+    size = bitboard.BOARD_SIZE
+    cells: np.ndarray
+    scores: np.ndarray
+    is_playable: np.ndarray
+    rng: np.random.Generator
+
+    def __init__(self, count: int, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+        self.cells = np.zeros((count, self.size, self.size), dtype=np.uint8)
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.is_playable = np.ones(count, dtype=bool)
+
+        self.generate_tiles()
+        self.generate_tiles()
+
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+
+    def play_moves(self, directions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        directions = np.asarray(directions)
+        is_vertical = (directions == Direction.UP) | (directions == Direction.DOWN)
+        towards_end = (directions == Direction.RIGHT) | (directions == Direction.DOWN)
+
+        # columns are handled as rows of the transposed board, so every board
+        # goes through the same row lookup whatever its direction
+        boards = pack_boards(self.cells)
+        oriented = np.where(is_vertical, transpose_boards(boards), boards)
+        table_indexes = get_rows(oriented) + np.where(towards_end, RIGHT_TABLE_OFFSET, 0)[:, np.newaxis]
+
+        moved_rows = ROW_TABLE[table_indexes]
+        score_deltas = sum_rows(SCORE_TABLE[table_indexes])
+
+        moved_boards = moved_rows.view('<u8')[:, 0]
+        moved = moved_boards != oriented
+        self.cells = unpack_boards(np.where(is_vertical, transpose_boards(moved_boards), moved_boards))
+        self.scores += score_deltas
+        return score_deltas, moved
+
+
+    def generate_tiles(self, mask: Optional[np.ndarray] = None):
+        empty = (self.cells == 0).reshape(len(self), -1)
+        empty_counts = np.count_nonzero(empty, axis=1)
+        can_spawn = empty_counts > 0
+        if mask is not None:
+            can_spawn &= mask
+
+        # one draw per board picks both the empty cell and the 2 or 4
+        draws = self.rng.random((len(self), 2))
+        chosen = (draws[:, 0] * empty_counts).astype(np.int64)
+        cell_indexes = np.argmax(np.cumsum(empty, axis=1, dtype=np.uint8) > chosen[:, np.newaxis], axis=1)
+        exponents = np.where(draws[:, 1] < 0.5, 1, 2).astype(np.uint8)
+
+        boards = np.nonzero(can_spawn)[0]
+        rows, columns = np.divmod(cell_indexes[boards], self.size)
+        self.cells[boards, rows, columns] = exponents[boards]
+
+
+    def update_is_playable(self) -> np.ndarray:
+        boards = pack_boards(self.cells)
+        row_moves = sum_rows(ROW_CAN_MOVE[get_rows(boards)])
+        column_moves = sum_rows(ROW_CAN_MOVE[get_rows(transpose_boards(boards))])
+
+        self.is_playable = (row_moves + column_moves) > 0
+        return self.is_playable
+
+
+    def step(self, directions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        score_deltas, moved = self.play_moves(directions)
+        self.generate_tiles(moved)
+        return score_deltas, self.update_is_playable()
+
+
+    def get_tile_values(self) -> np.ndarray:
+        return np.where(self.cells > 0, np.left_shift(1, self.cells.astype(np.int64)), 0)
@@ -0,0 +1,133 @@
+import argparse
+import random
+import time
+from typing import List
+
+import numpy as np
+
+import bitboard
+from batch_board import BatchBoard
+from direction import Direction
+from loader import load_game_module
+
+
+def benchmark_scalar(game_count: int, steps: int, use_bitboard: bool) -> float:
+    game = load_game_module()
+    boards = [game.Board(use_bitboard=use_bitboard) for _ in range(game_count)]
+    directions = list(Direction)
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        for board in boards:
+            board.play_move(random.choice(directions))
+            board.generate_tile()
+    elapsed = time.perf_counter() - start
+
+    return game_count * steps / elapsed
+
+
+def benchmark_batch(game_count: int, steps: int, seed: int = 0) -> float:
+    batch = BatchBoard(game_count, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        batch.step(rng.integers(Direction.UP, Direction.LEFT + 1, game_count))
+    elapsed = time.perf_counter() - start
+
+    return game_count * steps / elapsed
+
+
+def run_batch_benchmark(game_count: int, steps: int):
+    list_rate = benchmark_scalar(game_count, steps, use_bitboard=False)
+    bitboard_rate = benchmark_scalar(game_count, steps, use_bitboard=True)
+    batch_rate = benchmark_batch(game_count, steps)
+
+    print(f'{game_count} games x {steps} moves')
+    print(f'scalar list board:     {list_rate:>14,.0f} moves/s')
+    print(f'scalar bitboard board: {bitboard_rate:>14,.0f} moves/s')
+    print(f'batch board:           {batch_rate:>14,.0f} moves/s '
+          f'({batch_rate / list_rate:.0f}x list, {batch_rate / bitboard_rate:.0f}x bitboard)')
+
+
+def benchmark_size(size: int, moves: int) -> float:
+    game = load_game_module()
+    board = game.Board(size=size)
+    directions = list(Direction)
+
+    start = time.perf_counter()
+    for _ in range(moves):
+        board.play_move(random.choice(directions))
+        board.generate_tile()
+        if not board.is_playable:
+            board = game.Board(size=size)
+    elapsed = time.perf_counter() - start
+
+    return moves / elapsed
+
+
+def run_size_benchmark(sizes: List[int], moves: int):
+    print(f'{moves} moves per board size')
+    for size in sizes:
+        rate = benchmark_size(size, moves)
+        print(f'{size:>2}x{size:<2} {rate:>12,.0f} moves/s {rate * size * size:>14,.0f} cells/s')
+
+
+def benchmark_hash(boards: List, function) -> float:
+    start = time.perf_counter()
+    for board in boards:
+        function(board)
+    elapsed = time.perf_counter() - start
+
+    return len(boards) / elapsed
+
+
+def run_hash_benchmark(board_count: int, seed: int = 0):
+    game = load_game_module()
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(board_count):
+        board = game.Board(use_bitboard=True, rng=rng)
+        for _ in range(rng.randrange(200)):
+            if board.play_move(rng.choice(list(Direction))):
+                board.generate_tile()
+        boards.append(board)
+    list_boards = [game.Board(rng=rng) for _ in range(board_count)]
+    for board, list_board in zip(boards, list_boards):
+        list_board.layout = board.get_layout()
+    states = [board.bitboard for board in boards]
+
+    print(f'{board_count} boards')
+    for name, items, function in (
+        ('bitboard hash_board', states, bitboard.hash_board),
+        ('bitboard canonical', states, bitboard.canonical),
+        ('Board.key (bitboard)', boards, game.Board.key),
+        ('Board.canonical_key (bitboard)', boards, game.Board.canonical_key),
+        ('Board.key (list)', list_boards, game.Board.key),
+        ('Board.canonical_key (list)', list_boards, game.Board.canonical_key),
+    ):
+        print(f'{name:<32} {benchmark_hash(items, function):>14,.0f} boards/s')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='2048 engine benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    batch_parser = subparsers.add_parser('batch', help='BatchBoard against the scalar Board')
+    batch_parser.add_argument('--games', type=int, default=10_000)
+    batch_parser.add_argument('--steps', type=int, default=10)
+
+    size_parser = subparsers.add_parser('sizes', help='moves per second as the board grows')
+    size_parser.add_argument('--sizes', type=int, nargs='+', default=[4, 5, 6, 8, 10, 12, 16])
+    size_parser.add_argument('--moves', type=int, default=20_000)
+
+    hash_parser = subparsers.add_parser('hash', help='board keys and symmetry canonicalization')
+    hash_parser.add_argument('--boards', type=int, default=20_000)
+
+    args = parser.parse_args()
+    if args.benchmark == 'batch':
+        run_batch_benchmark(args.games, args.steps)
+    elif args.benchmark == 'sizes':
+        run_size_benchmark(args.sizes, args.moves)
+    elif args.benchmark == 'hash':
+        run_hash_benchmark(args.boards)
@@ -0,0 +1,254 @@
+import random
+from typing import FrozenSet, List, Optional, Tuple
+
+from direction import Direction
+
+# A 4x4 board packed into one 64-bit int. Each cell holds the log2 exponent of
+# its tile in 4 bits (0 is empty), cell (row, column) lives at bits
+# 16 * row + 4 * column, so row 0 is the lowest 16 bits.
+BOARD_SIZE = 4
+CELL_COUNT = BOARD_SIZE * BOARD_SIZE
+ROW_MASK = 0xFFFF
+BOARD_MASK = 0xFFFFFFFFFFFFFFFF
+CELL_MASK = 0xF
+MAX_EXPONENT = 15
+
+
+def reverse_row(row: int) -> int:
+    return ((row >> 12) & 0x000F) | ((row >> 4) & 0x00F0) | ((row << 4) & 0x0F00) | ((row << 12) & 0xF000)
+
+
+def slide_line_left(line: List[int]) -> Tuple[List[int], int]:
+    tiles = [exponent for exponent in line if exponent]
+    moved = []
+    score = 0
+    index = 0
+    while index < len(tiles):
+        exponent = tiles[index]
+        # 32768 is the largest tile a nibble can hold, so those never merge
+        if index + 1 < len(tiles) and tiles[index + 1] == exponent and exponent < MAX_EXPONENT:
+            exponent += 1
+            score += 1 << exponent
+            index += 1
+        moved.append(exponent)
+        index += 1
+
+    return moved + [0] * (len(line) - len(moved)), score
+
+
+def _build_row_tables() -> Tuple[List[int], List[int], List[int], List[int]]:
+    row_left = [0] * (ROW_MASK + 1)
+    row_right = [0] * (ROW_MASK + 1)
+    score_left = [0] * (ROW_MASK + 1)
+    score_right = [0] * (ROW_MASK + 1)
+
+    for row in range(ROW_MASK + 1):
+        line = [(row >> (4 * column)) & CELL_MASK for column in range(BOARD_SIZE)]
+        moved, score = slide_line_left(line)
+
+        packed = 0
+        for column, exponent in enumerate(moved):
+            packed |= exponent << (4 * column)
+
+        row_left[row] = packed
+        score_left[row] = score
+
+    for row in range(ROW_MASK + 1):
+        reversed_row = reverse_row(row)
+        row_right[row] = reverse_row(row_left[reversed_row])
+        score_right[row] = score_left[reversed_row]
+
+    return row_left, row_right, score_left, score_right
+
+
+ROW_LEFT, ROW_RIGHT, SCORE_LEFT, SCORE_RIGHT = _build_row_tables()
+ROW_REVERSE = [reverse_row(row) for row in range(ROW_MASK + 1)]
+
+
+def _build_empty_tables() -> Tuple[List[int], List[Tuple[int, ...]]]:
+    # only 16 distinct column tuples exist, every row shares one of them
+    columns_by_mask = [tuple(column for column in range(BOARD_SIZE) if not mask & (1 << column))
+                       for mask in range(1 << BOARD_SIZE)]
+    empty_counts = [0] * (ROW_MASK + 1)
+    empty_columns = [()] * (ROW_MASK + 1)
+
+    for row in range(ROW_MASK + 1):
+        filled_mask = 0
+        for column in range(BOARD_SIZE):
+            if (row >> (4 * column)) & CELL_MASK:
+                filled_mask |= 1 << column
+        empty_columns[row] = columns_by_mask[filled_mask]
+        empty_counts[row] = len(empty_columns[row])
+
+    return empty_counts, empty_columns
+
+
+ROW_EMPTY_COUNT, ROW_EMPTY_COLUMNS = _build_empty_tables()
+
+# which ways a single row can slide: bit 0 for towards column 0, bit 1 for
+# towards column 3, read as left/right on rows and up/down on columns
+SLIDES_TO_START = 1
+SLIDES_TO_END = 2
+ROW_SLIDES = [(SLIDES_TO_START if left != row else 0) | (SLIDES_TO_END if right != row else 0)
+              for row, (left, right) in enumerate(zip(ROW_LEFT, ROW_RIGHT))]
+LEGAL_DIRECTIONS = [
+    frozenset(direction for direction, flag in (
+        (Direction.LEFT, 1), (Direction.RIGHT, 2), (Direction.UP, 4), (Direction.DOWN, 8)) if mask & flag)
+    for mask in range(16)
+]
+
+
+def transpose(board: int) -> int:
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def flip_horizontal(board: int) -> int:
+    return (ROW_REVERSE[board & ROW_MASK] | (ROW_REVERSE[(board >> 16) & ROW_MASK] << 16)
+            | (ROW_REVERSE[(board >> 32) & ROW_MASK] << 32) | (ROW_REVERSE[(board >> 48) & ROW_MASK] << 48))
+
+
+def rotate(board: int) -> int:
+    # clockwise, the same turn as Board.rotate
+    return flip_horizontal(transpose(board))
+
+
+def flip_vertical(board: int) -> int:
+    return (((board & 0xFFFF) << 48) | ((board & 0xFFFF0000) << 16)
+            | ((board >> 16) & 0xFFFF0000) | (board >> 48))
+
+
+def symmetries(board: int) -> List[int]:
+    # the 4 rotations and their mirror images, built from one transpose plus
+    # row and column flips rather than 4 successive rotations
+    mirrored = flip_horizontal(board)
+    transposed = transpose(board)
+    transposed_mirrored = flip_horizontal(transposed)
+    return [
+        board, mirrored, flip_vertical(board), flip_vertical(mirrored),
+        transposed, transposed_mirrored, flip_vertical(transposed), flip_vertical(transposed_mirrored),
+    ]
+
+
+def canonical(board: int) -> int:
+    # the smallest of the 8 rotations and reflections stands in for all of them
+    return min(symmetries(board))
+
+
+def hash_board(board: int) -> int:
+    # the board already is a unique 64-bit key, this only spreads its bits so
+    # the low ones can index a table
+    board = ((board ^ (board >> 30)) * 0xBF58476D1CE4E5B9) & BOARD_MASK
+    board = ((board ^ (board >> 27)) * 0x94D049BB133111EB) & BOARD_MASK
+    return board ^ (board >> 31)
+
+
+def _move_rows(board: int, rows: List[int], scores: List[int]) -> Tuple[int, int]:
+    row0 = board & ROW_MASK
+    row1 = (board >> 16) & ROW_MASK
+    row2 = (board >> 32) & ROW_MASK
+    row3 = (board >> 48) & ROW_MASK
+    moved = rows[row0] | (rows[row1] << 16) | (rows[row2] << 32) | (rows[row3] << 48)
+    return moved, scores[row0] + scores[row1] + scores[row2] + scores[row3]
+
+
+def move(board: int, direction: Direction) -> Tuple[int, int]:
+    if direction == Direction.LEFT:
+        return _move_rows(board, ROW_LEFT, SCORE_LEFT)
+    elif direction == Direction.RIGHT:
+        return _move_rows(board, ROW_RIGHT, SCORE_RIGHT)
+
+    # columns become rows once transposed, with the top of the board on the left
+    rows, scores = (ROW_LEFT, SCORE_LEFT) if direction == Direction.UP else (ROW_RIGHT, SCORE_RIGHT)
+    moved, score = _move_rows(transpose(board), rows, scores)
+    return transpose(moved), score
+
+
+def _row_slides(board: int) -> int:
+    return (ROW_SLIDES[board & ROW_MASK] | ROW_SLIDES[(board >> 16) & ROW_MASK]
+            | ROW_SLIDES[(board >> 32) & ROW_MASK] | ROW_SLIDES[(board >> 48) & ROW_MASK])
+
+
+def legal_moves(board: int) -> FrozenSet[Direction]:
+    return LEGAL_DIRECTIONS[_row_slides(board) | (_row_slides(transpose(board)) << 2)]
+
+
+def get_cell(board: int, row: int, column: int) -> int:
+    return (board >> (4 * (BOARD_SIZE * row + column))) & CELL_MASK
+
+
+def max_exponent(board: int) -> int:
+    return max((board >> (4 * cell)) & CELL_MASK for cell in range(CELL_COUNT))
+
+
+def empty_cells(board: int) -> List[int]:
+    cells = []
+    for row_index in range(BOARD_SIZE):
+        offset = BOARD_SIZE * row_index
+        cells.extend(offset + column for column in ROW_EMPTY_COLUMNS[(board >> (16 * row_index)) & ROW_MASK])
+    return cells
+
+
+def count_empty(board: int) -> int:
+    return (ROW_EMPTY_COUNT[board & ROW_MASK] + ROW_EMPTY_COUNT[(board >> 16) & ROW_MASK]
+            + ROW_EMPTY_COUNT[(board >> 32) & ROW_MASK] + ROW_EMPTY_COUNT[(board >> 48) & ROW_MASK])
+
+
+def place_tile(board: int, cell: int, exponent: int) -> int:
+    return board | (exponent << (4 * cell))
+
+
+def choose_spawn(board: int, rng: Optional[random.Random] = None) -> Optional[Tuple[int, int]]:
+    rng = rng or random
+    empty_count = count_empty(board)
+    if not empty_count:
+        return None
+
+    exponent = rng.choice([1, 2])
+    chosen = rng.randrange(empty_count)
+    for row_index in range(BOARD_SIZE):
+        columns = ROW_EMPTY_COLUMNS[(board >> (16 * row_index)) & ROW_MASK]
+        if chosen < len(columns):
+            return BOARD_SIZE * row_index + columns[chosen], exponent
+        chosen -= len(columns)
+
+
+def spawn_tile(board: int, rng: Optional[random.Random] = None) -> Optional[int]:
+    spawn = choose_spawn(board, rng)
+    if spawn is None:
+        return None
+
+    return place_tile(board, *spawn)
+
+
+def can_move(board: int) -> bool:
+    if count_empty(board):
+        return True
+
+    return bool(_row_slides(board) or _row_slides(transpose(board)))
+
+
+def from_layout(layout: List[List[Optional[int]]]) -> int:
+    board = 0
+    for row_index, row in enumerate(layout):
+        for column_index, value in enumerate(row):
+            if value:
+                board = place_tile(board, BOARD_SIZE * row_index + column_index, value.bit_length() - 1)
+    return board
+
+
+def to_layout(board: int) -> List[List[Optional[int]]]:
+    layout = []
+    for row_index in range(BOARD_SIZE):
+        row = []
+        for column_index in range(BOARD_SIZE):
+            exponent = get_cell(board, row_index, column_index)
+            row.append(1 << exponent if exponent else None)
+        layout.append(row)
+    return layout
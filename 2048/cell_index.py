@@ -0,0 +1,46 @@
+import random
+from typing import List
+
+
+class EmptyCellIndex:
+    cells: List[int]
+    slots: List[int]
+
+    def __init__(self, cell_count: int):
+        self.cells = list(range(cell_count))
+        self.slots = list(range(cell_count))
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __contains__(self, cell: int) -> bool:
+        return self.slots[cell] >= 0
+
+    def add(self, cell: int) -> None:
+        if self.slots[cell] >= 0:
+            return
+
+        self.slots[cell] = len(self.cells)
+        self.cells.append(cell)
+
+    def remove(self, cell: int) -> None:
+        slot = self.slots[cell]
+        if slot < 0:
+            return
+
+        # swap the last cell into the hole so removal stays O(1)
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[slot] = last
+            self.slots[last] = slot
+        self.slots[cell] = -1
+
+    def remap(self, new_cells: List[int]) -> None:
+        # moves every empty cell to new_cells[cell], keeping the order cells are chosen in
+        self.cells = [new_cells[cell] for cell in self.cells]
+        self.slots = [-1] * len(self.slots)
+        for slot, cell in enumerate(self.cells):
+            self.slots[cell] = slot
+
+    def choice(self, rng=random) -> int:
+        return self.cells[rng.randrange(len(self.cells))]
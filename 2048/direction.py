@@ -0,0 +1,8 @@
+from enum import IntEnum
+
+
+class Direction(IntEnum):
+    UP = 1
+    RIGHT = 2
+    DOWN = 3
+    LEFT  = 4
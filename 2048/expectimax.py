@@ -0,0 +1,157 @@
+from collections import OrderedDict
+import time
+from typing import Callable, Optional, Tuple
+
+import bitboard
+from direction import Direction
+from heuristics import Evaluator
+
+# tiles spawn as a 2 or a 4 with equal odds, matching Board.generate_tile
+SPAWN_PROBABILITIES = ((1, 0.5), (2, 0.5))
+NODES_PER_CLOCK_CHECK = 256
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable:
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, board: int, depth: int) -> Optional[float]:
+        entry = self.entries.get(board)
+        # a value searched shallower than asked for is no use to this node
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(board)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, board: int, depth: int, value: float) -> None:
+        if board in self.entries:
+            self.entries.move_to_end(board)
+        elif len(self.entries) >= self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        self.entries[board] = (depth, value)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ExpectimaxPlayer:
+    time_budget_ms: Optional[float]
+    max_depth: int
+    min_probability: float
+    table: TranspositionTable
+    evaluate: Callable[[int], float]
+    canonical_keys: bool
+    nodes: int
+    last_depth: int
+
+    def __init__(self, time_budget_ms: Optional[float] = 50, max_depth: int = 6, min_probability: float = 0.0001,
+                 table: Optional[TranspositionTable] = None, evaluate: Optional[Callable[[int], float]] = None,
+                 canonical_keys: bool = False):
+        self.time_budget_ms = time_budget_ms
+        self.max_depth = max_depth
+        self.min_probability = min_probability
+        self.table = table or TranspositionTable()
+        self.evaluate = evaluate or Evaluator().evaluate
+        self.canonical_keys = canonical_keys
+        self.nodes = 0
+        self.last_depth = 0
+        self.deadline = 0.0
+
+    def get_move(self, board: int) -> Optional[Direction]:
+        # self-play passes no budget so a seeded game makes the same moves on any machine
+        if self.time_budget_ms is None:
+            self.deadline = float('inf')
+        else:
+            self.deadline = time.perf_counter() + self.time_budget_ms / 1000
+        self.nodes = 0
+        self.last_depth = 0
+
+        best_direction = None
+        for depth in range(1, self.max_depth + 1):
+            try:
+                direction, _ = self.search_root(board, depth)
+            except SearchTimeout:
+                break
+
+            if direction is None:
+                return None
+
+            best_direction = direction
+            self.last_depth = depth
+
+        # the clock can run out inside the first iteration, fall back to any legal move
+        if best_direction is None:
+            best_direction = min(bitboard.legal_moves(board), default=None)
+
+        return best_direction
+
+    def search_root(self, board: int, depth: int) -> Tuple[Optional[Direction], float]:
+        best_direction = None
+        best_value = float('-inf')
+        for direction in sorted(bitboard.legal_moves(board)):
+            moved, _ = bitboard.move(board, direction)
+            value = self.chance_node(moved, depth, 1.0)
+            if value > best_value:
+                best_direction, best_value = direction, value
+
+        return best_direction, best_value
+
+    def max_node(self, board: int, depth: int, probability: float) -> float:
+        best_value = 0.0
+        for direction in bitboard.legal_moves(board):
+            best_value = max(best_value, self.chance_node(bitboard.move(board, direction)[0], depth, probability))
+
+        return best_value
+
+    def chance_node(self, board: int, depth: int, probability: float) -> float:
+        self.nodes += 1
+        if self.nodes % NODES_PER_CLOCK_CHECK == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        # spawns that are too unlikely to matter are scored without searching further
+        if depth <= 1 or probability < self.min_probability:
+            return self.evaluate(board)
+
+        # symmetric positions share one entry, only valid while evaluate is symmetric too
+        key = bitboard.canonical(board) if self.canonical_keys else board
+        cached = self.table.get(key, depth)
+        if cached is not None:
+            return cached
+
+        cells = bitboard.empty_cells(board)
+        cell_probability = 1 / len(cells)
+        value = 0.0
+        for cell in cells:
+            for exponent, spawn_probability in SPAWN_PROBABILITIES:
+                branch_probability = cell_probability * spawn_probability
+                spawned = bitboard.place_tile(board, cell, exponent)
+                value += branch_probability * self.max_node(spawned, depth - 1, probability * branch_probability)
+
+        self.table.put(key, depth, value)
+        return value
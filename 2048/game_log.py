@@ -0,0 +1,175 @@
+from array import array
+import mmap
+import struct
+import sys
+from typing import Iterator, NamedTuple, Tuple, Union
+
+from direction import Direction
+
+# File layout, all little-endian:
+#   file header   magic, version
+#   game records  seed u64, board size u8, event count u32, then one byte per event
+#   game index    one u64 file offset per game
+#   trailer       index offset u64, game count u64, magic
+# A move byte is the direction (1-4). A spawn byte has the top bit set, the
+# next bit is 0 for a 2 and 1 for a 4, and the low 6 bits are the cell index.
+FILE_MAGIC = b'2048'
+TRAILER_MAGIC = b'IDX1'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')
+GAME_HEADER = struct.Struct('<QBI')
+TRAILER = struct.Struct('<QQ4s')
+OFFSET = struct.Struct('<Q')
+
+SPAWN_FLAG = 0x80
+FOUR_FLAG = 0x40
+CELL_BITS = 0x3F
+MAX_SIZE = 8
+
+
+class MoveEvent(NamedTuple):
+    direction: Direction
+
+
+class SpawnEvent(NamedTuple):
+    cell: int
+    value: int
+
+
+Event = Union[MoveEvent, SpawnEvent]
+
+
+class GameRecorder:
+    seed: int
+    size: int
+    events: bytearray
+
+    def __init__(self, seed: int, size: int = 4):
+        if size > MAX_SIZE:
+            raise ValueError(f'Game logs hold boards up to {MAX_SIZE}x{MAX_SIZE}, got {size}x{size}')
+
+        self.seed = seed
+        self.size = size
+        self.events = bytearray()
+
+    def record_move(self, direction: Direction) -> None:
+        self.events.append(direction)
+
+    def record_spawn(self, cell: int, value: int) -> None:
+        self.events.append(SPAWN_FLAG | (FOUR_FLAG if value == 4 else 0) | cell)
+
+
+def decode_event(byte: int) -> Event:
+    if byte & SPAWN_FLAG:
+        return SpawnEvent(byte & CELL_BITS, 4 if byte & FOUR_FLAG else 2)
+    return MoveEvent(Direction(byte))
+
+
+class GameLogWriter:
+    offsets: array
+
+    def __init__(self, path: str):
+        self.file = open(path, 'wb')
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, VERSION))
+        self.offsets = array('Q')
+
+    def write_game(self, recorder: GameRecorder) -> None:
+        self.offsets.append(self.file.tell())
+        self.file.write(GAME_HEADER.pack(recorder.seed, recorder.size, len(recorder.events)))
+        self.file.write(recorder.events)
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+
+        index_offset = self.file.tell()
+        offsets = self.offsets
+        if sys.byteorder != 'little':
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        self.file.write(offsets.tobytes())
+        self.file.write(TRAILER.pack(index_offset, len(self.offsets), TRAILER_MAGIC))
+        self.file.close()
+
+    def __enter__(self) -> 'GameLogWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class LoggedGame:
+    seed: int
+    size: int
+    data: bytes
+
+    def __init__(self, seed: int, size: int, data: bytes):
+        self.seed = seed
+        self.size = size
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def events(self) -> Iterator[Event]:
+        for byte in self.data:
+            yield decode_event(byte)
+
+
+class GameLogReader:
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # too short to hold a header and a trailer counts as not a game log
+        magic, version = (FILE_HEADER.unpack_from(self.buffer, 0)
+                          if len(self.buffer) >= FILE_HEADER.size + TRAILER.size else (b'', 0))
+        if magic != FILE_MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a version {VERSION} 2048 game log')
+
+        index_offset, game_count, trailer_magic = TRAILER.unpack_from(self.buffer, len(self.buffer) - TRAILER.size)
+        if trailer_magic != TRAILER_MAGIC:
+            self.close()
+            raise ValueError(f'{path} has no game index, was the writer closed?')
+
+        self.index_offset = index_offset
+        self.game_count = game_count
+
+    def __len__(self) -> int:
+        return self.game_count
+
+    def __getitem__(self, number: int) -> LoggedGame:
+        if number < 0:
+            number += self.game_count
+        if not 0 <= number < self.game_count:
+            raise IndexError(f'Game {number} is out of range for a log of {self.game_count} games')
+
+        offset, = OFFSET.unpack_from(self.buffer, self.index_offset + number * OFFSET.size)
+        return self._read_game(offset)[0]
+
+    def __iter__(self) -> Iterator[LoggedGame]:
+        # walking the records front to back touches each page once and never
+        # needs the index
+        offset = FILE_HEADER.size
+        while offset < self.index_offset:
+            game, offset = self._read_game(offset)
+            yield game
+
+    def _read_game(self, offset: int) -> Tuple[LoggedGame, int]:
+        seed, size, event_count = GAME_HEADER.unpack_from(self.buffer, offset)
+        start = offset + GAME_HEADER.size
+        end = start + event_count
+        # a game keeps its own copy of its events, a view into the map would
+        # stop the reader from closing while any game is still alive
+        return LoggedGame(seed, size, self.buffer[start:end]), end
+
+    def close(self) -> None:
+        self.buffer.close()
+        self.file.close()
+
+    def __enter__(self) -> 'GameLogReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,94 @@
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Dict, List
+
+import bitboard
+
+MONOTONICITY_POWER = 4
+SUM_POWER = 3.5
+
+
+@dataclass(frozen=True)
+class HeuristicWeights:
+    base: float = 200_000.0
+    empty: float = 270.0
+    merges: float = 700.0
+    monotonicity: float = -47.0
+    smoothness: float = 0.0
+    sum: float = -11.0
+
+
+def row_features(line: List[int]) -> Dict[str, float]:
+    tiles = [exponent for exponent in line if exponent]
+
+    merges = 0
+    run = 0
+    previous = 0
+    for exponent in tiles:
+        if exponent == previous:
+            run += 1
+        elif run:
+            merges += 1 + run
+            run = 0
+        previous = exponent
+    if run:
+        merges += 1 + run
+
+    # how far the row is from sorted, whichever way it is closer to
+    decreasing = 0
+    increasing = 0
+    for left, right in zip(line, line[1:]):
+        if left > right:
+            decreasing += left ** MONOTONICITY_POWER - right ** MONOTONICITY_POWER
+        else:
+            increasing += right ** MONOTONICITY_POWER - left ** MONOTONICITY_POWER
+
+    return {
+        'base': 1.0,
+        'empty': float(len(line) - len(tiles)),
+        'merges': float(merges),
+        'monotonicity': float(min(decreasing, increasing)),
+        'smoothness': float(-sum(abs(left - right) for left, right in zip(tiles, tiles[1:]))),
+        'sum': float(sum(exponent ** SUM_POWER for exponent in line)),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_feature_tables() -> Dict[str, List[float]]:
+    names = [feature.name for feature in fields(HeuristicWeights)]
+    tables = {name: [0.0] * (bitboard.ROW_MASK + 1) for name in names}
+
+    for row in range(bitboard.ROW_MASK + 1):
+        line = [(row >> (4 * column)) & bitboard.CELL_MASK for column in range(bitboard.BOARD_SIZE)]
+        for name, value in row_features(line).items():
+            tables[name][row] = value
+
+    return tables
+
+
+@lru_cache(maxsize=16)
+def get_weighted_table(weights: HeuristicWeights) -> List[float]:
+    features = [(getattr(weights, name), table) for name, table in get_feature_tables().items()]
+    features = [(weight, table) for weight, table in features if weight]
+    return [sum(weight * table[row] for weight, table in features) for row in range(bitboard.ROW_MASK + 1)]
+
+
+class Evaluator:
+    weights: HeuristicWeights
+    table: List[float]
+
+    def __init__(self, weights: HeuristicWeights = HeuristicWeights()):
+        self.weights = weights
+        self.table = get_weighted_table(weights)
+
+    def __call__(self, board: int) -> float:
+        return self.evaluate(board)
+
+    def evaluate(self, board: int) -> float:
+        table = self.table
+        mask = bitboard.ROW_MASK
+        columns = bitboard.transpose(board)
+        return (table[board & mask] + table[(board >> 16) & mask]
+                + table[(board >> 32) & mask] + table[(board >> 48) & mask]
+                + table[columns & mask] + table[(columns >> 16) & mask]
+                + table[(columns >> 32) & mask] + table[(columns >> 48) & mask])
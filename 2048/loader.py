@@ -0,0 +1,13 @@
+import importlib.util
+import os
+
+GAME_MODULE_NAME = 'game_2048'
+
+
+def load_game_module():
+    # 2048.py can't be imported by name, so load it from next to this file
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '2048.py')
+    spec = importlib.util.spec_from_file_location(GAME_MODULE_NAME, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,125 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+import os
+import random
+import statistics
+import time
+from typing import Dict, Iterator, List, Optional
+
+from expectimax import ExpectimaxPlayer
+from loader import load_game_module
+
+_game_module = None
+
+
+@dataclass(frozen=True)
+class GameRecord:
+    seed: int
+    score: int
+    max_tile: int
+    moves: int
+    wall_time: float
+
+
+@dataclass
+class SelfPlaySummary:
+    games: int = 0
+    moves: int = 0
+    elapsed: float = 0.0
+    scores: List[int] = field(default_factory=list)
+    max_tiles: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, record: GameRecord) -> None:
+        self.games += 1
+        self.moves += record.moves
+        self.scores.append(record.score)
+        self.max_tiles[record.max_tile] = self.max_tiles.get(record.max_tile, 0) + 1
+
+    @property
+    def games_per_second(self) -> float:
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def moves_per_second(self) -> float:
+        return self.moves / self.elapsed if self.elapsed else 0.0
+
+    def score_percentiles(self) -> Dict[int, float]:
+        if len(self.scores) < 2:
+            return {percentile: float(sum(self.scores)) for percentile in (10, 50, 90)}
+
+        cuts = statistics.quantiles(self.scores, n=10, method='inclusive')
+        return {10: cuts[0], 50: cuts[4], 90: cuts[8]}
+
+    def report(self) -> str:
+        lines = [
+            f'games: {self.games} in {self.elapsed:.2f}s '
+            f'({self.games_per_second:.2f} games/s, {self.moves_per_second:,.0f} moves/s)',
+        ]
+        if self.scores:
+            percentiles = self.score_percentiles()
+            lines.append(
+                f'score: mean {statistics.fmean(self.scores):,.0f}, min {min(self.scores):,}, '
+                f'p10 {percentiles[10]:,.0f}, p50 {percentiles[50]:,.0f}, p90 {percentiles[90]:,.0f}, '
+                f'max {max(self.scores):,}'
+            )
+        for tile in sorted(self.max_tiles):
+            count = self.max_tiles[tile]
+            lines.append(f'max tile {tile:>6}: {count:>6} ({count / self.games:.1%})')
+
+        return '\n'.join(lines)
+
+
+def play_game(seed: int, depth: int, time_budget_ms: Optional[float]) -> GameRecord:
+    global _game_module
+    if _game_module is None:
+        _game_module = load_game_module()
+
+    start = time.perf_counter()
+    player = ExpectimaxPlayer(time_budget_ms=time_budget_ms, max_depth=depth)
+    # games are played out to the end, stopping at the 2048 tile would cap the figures reported
+    board = _game_module.Game(player, random.Random(seed), stop_at_win=False).start()
+    wall_time = time.perf_counter() - start
+
+    return GameRecord(seed, board.score, board.max_tile(), board.moves, wall_time)
+
+
+def play_games(seeds: List[int], depth: int, time_budget_ms: Optional[float]) -> List[GameRecord]:
+    return [play_game(seed, depth, time_budget_ms) for seed in seeds]
+
+
+def run_self_play(game_count: int, workers: int, seed: int, depth: int, time_budget_ms: Optional[float] = None,
+                  games_per_task: int = 4) -> Iterator[GameRecord]:
+    # each game's RNG is seeded from its index, so results don't depend on
+    # which worker ends up playing it
+    seeds = [seed + index for index in range(game_count)]
+    shards = [seeds[index:index + games_per_task] for index in range(0, game_count, games_per_task)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_games, shard, depth, time_budget_ms) for shard in shards]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Play 2048 self-play games across worker processes')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--time-budget-ms', type=float, default=None,
+                        help='per-move search budget, runs stop being reproducible when set')
+    parser.add_argument('--games-per-task', type=int, default=4)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    summary = SelfPlaySummary()
+    start = time.perf_counter()
+    for record in run_self_play(args.games, args.workers, args.seed, args.depth, args.time_budget_ms,
+                                args.games_per_task):
+        summary.add(record)
+        if args.verbose:
+            print(record)
+    summary.elapsed = time.perf_counter() - start
+
+    print(summary.report())
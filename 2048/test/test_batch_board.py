@@ -0,0 +1,123 @@
+import random
+
+import numpy as np
+import pytest
+
+from batch_board import BatchBoard, pack_boards, unpack_boards
+import bitboard
+from direction import Direction
+from loader import load_game_module
+
+game = load_game_module()
+
+
+def random_batch(count, seed, max_exponent=11):
+    rng = np.random.default_rng(seed)
+    batch = BatchBoard(count, seed)
+    # about a third of the cells empty, with some boards full so stuck boards come up
+    cells = rng.integers(1, max_exponent + 1, size=(count, 4, 4), dtype=np.uint8)
+    cells[rng.random((count, 4, 4)) < rng.random((count, 1, 1)) * 0.6] = 0
+    batch.cells = cells
+    return batch
+
+
+def scalar_boards(batch):
+    return [int(board) for board in pack_boards(batch.cells)]
+
+
+def test_pack_boards_when_unpacked_then_same_cells_and_scalar_layout():
+    batch = random_batch(200, 0, max_exponent=15)
+
+    boards = scalar_boards(batch)
+
+    assert np.array_equal(unpack_boards(pack_boards(batch.cells)), batch.cells)
+    for cells, board in zip(batch.cells, boards):
+        assert [[bitboard.get_cell(board, row, column) for column in range(4)] for row in range(4)] == cells.tolist()
+
+
+@pytest.mark.parametrize('direction', list(Direction))
+def test_play_moves_when_random_boards_then_matches_scalar_bitboard(direction):
+    batch = random_batch(500, int(direction))
+    before = scalar_boards(batch)
+
+    score_deltas, moved = batch.play_moves(np.full(len(batch), direction))
+
+    after = scalar_boards(batch)
+    for index, board in enumerate(before):
+        expected_board, expected_score = bitboard.move(board, direction)
+        assert after[index] == expected_board
+        assert score_deltas[index] == expected_score
+        assert moved[index] == (expected_board != board)
+
+
+def test_play_moves_when_directions_mixed_then_each_board_uses_its_own():
+    batch = random_batch(400, 7)
+    before = scalar_boards(batch)
+    directions = np.array([random.Random(index).choice(list(Direction)) for index in range(len(batch))])
+
+    score_deltas, _ = batch.play_moves(directions)
+
+    after = scalar_boards(batch)
+    for index, board in enumerate(before):
+        assert (after[index], score_deltas[index]) == bitboard.move(board, Direction(directions[index]))
+    assert np.array_equal(batch.scores, score_deltas)
+
+
+def test_play_moves_when_compared_with_list_board_then_same_layout_and_score():
+    batch = random_batch(100, 3)
+    layouts = [bitboard.to_layout(board) for board in scalar_boards(batch)]
+
+    score_deltas, _ = batch.play_moves(np.full(len(batch), Direction.DOWN))
+
+    values = batch.get_tile_values()
+    for index, layout in enumerate(layouts):
+        board = game.Board(use_bitboard=False, spawn_tiles=False)
+        for row_index, row in enumerate(layout):
+            for column_index, value in enumerate(row):
+                if value:
+                    board.place_tile(row_index * 4 + column_index, value)
+        board.play_move(Direction.DOWN)
+        assert [[value or 0 for value in row] for row in board.get_layout()] == values[index].tolist()
+        assert board.score == score_deltas[index]
+
+
+def test_generate_tiles_when_masked_then_one_tile_spawned_on_an_empty_cell():
+    batch = random_batch(500, 11)
+    before = batch.cells.copy()
+    mask = np.arange(len(batch)) % 2 == 0
+
+    batch.generate_tiles(mask)
+
+    for index in range(len(batch)):
+        changed = np.argwhere(batch.cells[index] != before[index])
+        if not mask[index] or not (before[index] == 0).any():
+            assert len(changed) == 0
+            continue
+        assert len(changed) == 1
+        row, column = changed[0]
+        assert before[index, row, column] == 0
+        assert batch.cells[index, row, column] in (1, 2)
+
+
+def test_update_is_playable_when_random_boards_then_matches_scalar_can_move():
+    batch = random_batch(500, 5)
+
+    is_playable = batch.update_is_playable()
+
+    assert is_playable.tolist() == [bitboard.can_move(board) for board in scalar_boards(batch)]
+    assert not is_playable.all()
+
+
+def test_step_when_played_to_the_end_then_scores_add_up():
+    batch = BatchBoard(50, seed=1)
+    rng = np.random.default_rng(1)
+    totals = np.zeros(len(batch), dtype=np.int64)
+
+    for _ in range(2000):
+        if not batch.is_playable.any():
+            break
+        score_deltas, _ = batch.step(rng.integers(1, 5, size=len(batch)))
+        totals += score_deltas
+
+    assert np.array_equal(batch.scores, totals)
+    assert not batch.is_playable.any()
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+import bitboard
+from direction import Direction
+from loader import load_game_module
+
+game = load_game_module()
+
+
+def random_layout(rng, max_exponent=11):
+    return [[rng.choice([None, None] + [1 << exponent for exponent in range(1, max_exponent + 1)])
+             for _ in range(bitboard.BOARD_SIZE)] for _ in range(bitboard.BOARD_SIZE)]
+
+
+def place_layout(board, layout):
+    for row_index, row in enumerate(layout):
+        for column_index, value in enumerate(row):
+            if value:
+                board.place_tile(row_index * bitboard.BOARD_SIZE + column_index, value)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_play_move_when_same_tiles_spawned_then_backends_agree(seed):
+    rng = random.Random(seed)
+    list_board = game.Board(use_bitboard=False, spawn_tiles=False)
+    bitboard_board = game.Board(use_bitboard=True, spawn_tiles=False)
+
+    # both boards get the spawns the list board picks, so only the moves can tell them apart
+    while True:
+        if list_board.empty_cells:
+            cell = list_board.empty_cells.choice(rng)
+            value = rng.choice([2, 4])
+            list_board.place_tile(cell, value)
+            bitboard_board.place_tile(cell, value)
+
+        assert list_board.legal_moves() == bitboard_board.legal_moves()
+        if not list_board.legal_moves():
+            break
+
+        direction = rng.choice(sorted(Direction))
+        assert list_board.play_move(direction) == bitboard_board.play_move(direction)
+        assert list_board.get_layout() == bitboard_board.get_layout()
+        assert list_board.score == bitboard_board.score
+        assert list_board.moves == bitboard_board.moves
+
+    list_board.generate_tile()
+    bitboard_board.generate_tile()
+    assert not list_board.is_playable
+    assert not bitboard_board.is_playable
+    assert list_board.moves > 0
+
+
+@pytest.mark.parametrize('direction', list(Direction))
+def test_move_when_random_layouts_then_matches_list_board(direction):
+    rng = random.Random(direction)
+    for _ in range(200):
+        layout = random_layout(rng)
+        list_board = game.Board(use_bitboard=False, spawn_tiles=False)
+        place_layout(list_board, layout)
+
+        moved, score = bitboard.move(bitboard.from_layout(layout), direction)
+        list_board.play_move(direction)
+
+        assert bitboard.to_layout(moved) == list_board.get_layout()
+        assert score == list_board.score
+
+
+def test_from_layout_when_converted_back_then_same_layout():
+    rng = random.Random(0)
+    for _ in range(100):
+        layout = random_layout(rng, max_exponent=15)
+
+        assert bitboard.to_layout(bitboard.from_layout(layout)) == layout
+
+
+def test_can_move_when_full_board_then_depends_on_merges():
+    stuck = [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]]
+    mergeable = [[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 4]]
+
+    assert not bitboard.can_move(bitboard.from_layout(stuck))
+    assert bitboard.can_move(bitboard.from_layout(mergeable))
+    assert bitboard.legal_moves(bitboard.from_layout(mergeable)) == frozenset(Direction)
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from loader import load_game_module
+
+game = load_game_module()
+
+
+def board_from_layout(layout, use_bitboard=False):
+    board = game.Board(use_bitboard=use_bitboard, size=len(layout), spawn_tiles=False)
+    for row_index, row in enumerate(layout):
+        for column_index, value in enumerate(row):
+            if value:
+                board.place_tile(row_index * len(layout) + column_index, value)
+    return board
+
+
+def scanned_merge_pairs(board):
+    layout = board.get_layout()
+    size = len(layout)
+    return sum(1 for row in range(size) for column in range(size) for next_row, next_column in
+               ((row, column + 1), (row + 1, column)) if next_row < size and next_column < size
+               and layout[row][column] is not None and layout[row][column] == layout[next_row][next_column])
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 6])
+def test_play_move_when_random_game_then_merge_pairs_and_empty_cells_kept_up_to_date(size):
+    rng = random.Random(size)
+    board = game.Board(rng=rng, size=size)
+
+    while board.is_playable:
+        assert board.merge_pairs == scanned_merge_pairs(board)
+        assert sorted(board.empty_cells.cells) == [cell for cell in range(size * size)
+                                                   if board.layout[cell // size][cell % size] is None]
+        assert board.is_playable == bool(board.legal_moves())
+        if rng.random() < 0.2:
+            board.rotate_n_times(rng.randrange(1, 4))
+        elif board.play_move(rng.choice(sorted(board.legal_moves()))):
+            board.generate_tile()
+
+    assert not board.legal_moves()
+
+
+def test_generate_tile_when_full_board_has_merge_then_playable():
+    board = board_from_layout([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, None]])
+
+    board.place_tile(15, 4)
+    board.generate_tile()
+
+    assert board.merge_pairs == 2
+    assert board.is_playable
+
+
+def test_generate_tile_when_full_board_has_no_merge_then_game_over():
+    board = board_from_layout([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, None]])
+
+    board.place_tile(15, 2)
+    board.generate_tile()
+
+    assert board.merge_pairs == 0
+    assert not board.is_playable
+
+
+def test_rotate_when_turned_then_empty_cells_follow_the_layout():
+    board = board_from_layout([[2, None, None], [None, 4, None], [8, None, 16]])
+    order = list(board.empty_cells.cells)
+
+    board.rotate()
+
+    assert board.get_layout() == [[8, None, 2], [None, 4, None], [16, None, None]]
+    assert board.empty_cells.cells == [board.rotated_cells[cell] for cell in order]
+    assert sorted(board.empty_cells.cells) == [1, 3, 5, 7, 8]
+
+
+def test_key_when_same_layout_on_either_backend_then_same_keys():
+    rng = random.Random(9)
+    list_board = game.Board(rng=rng)
+    for _ in range(40):
+        if list_board.play_move(rng.choice(sorted(list_board.legal_moves()))):
+            list_board.generate_tile()
+        bitboard_board = board_from_layout(list_board.get_layout(), use_bitboard=True)
+
+        assert list_board.key() == bitboard_board.key()
+        assert list_board.canonical_key() == bitboard_board.canonical_key()
+
+
+@pytest.mark.parametrize('size', [3, 4, 5])
+def test_canonical_key_when_board_turned_or_mirrored_then_unchanged(size):
+    rng = random.Random(size)
+    layout = [[rng.choice([None, 2, 4, 8, 1024]) for _ in range(size)] for _ in range(size)]
+    board = board_from_layout(layout)
+    mirrored = board_from_layout([row[::-1] for row in layout])
+    canonical_key = board.canonical_key()
+
+    assert mirrored.canonical_key() == canonical_key
+    for _ in range(3):
+        board.rotate()
+        assert board.canonical_key() == canonical_key
+
+
+def test_key_when_layouts_differ_then_keys_differ():
+    first = board_from_layout([[2, None, None], [None, None, None], [None, None, 4]])
+    second = board_from_layout([[4, None, None], [None, None, None], [None, None, 2]])
+
+    assert first.key() != second.key()
+    assert first.canonical_key() == second.canonical_key()
@@ -0,0 +1,110 @@
+import time
+
+import pytest
+
+import bitboard
+from direction import Direction
+from expectimax import ExpectimaxPlayer, TranspositionTable
+
+BOARD = bitboard.from_layout([[2, 4, 8, 16], [None, 2, None, 4], [None, None, 2, None], [None, None, None, 2]])
+STUCK = bitboard.from_layout([[2, 4, 2, 4], [4, 2, 4, 2], [2, 4, 2, 4], [4, 2, 4, 2]])
+
+
+class CountingEvaluator:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, board):
+        self.calls += 1
+        return float(bitboard.count_empty(board))
+
+
+def test_table_when_full_then_least_recently_used_entry_evicted():
+    table = TranspositionTable(max_entries=2)
+    table.put(1, 3, 1.0)
+    table.put(2, 3, 2.0)
+
+    assert table.get(1, 3) == 1.0
+    table.put(3, 3, 3.0)
+
+    assert table.get(2, 3) is None
+    assert table.get(1, 3) == 1.0
+    assert table.get(3, 3) == 3.0
+    assert len(table) == 2
+    assert table.evictions == 1
+
+
+def test_table_when_stored_shallower_than_asked_then_miss():
+    table = TranspositionTable()
+    table.put(1, 2, 5.0)
+
+    assert table.get(1, 3) is None
+    assert table.get(1, 2) == 5.0
+    assert table.get(1, 1) == 5.0
+    assert (table.hits, table.misses) == (2, 1)
+    assert table.hit_rate == pytest.approx(2 / 3)
+
+
+def test_table_when_key_stored_again_then_replaced_without_eviction():
+    table = TranspositionTable(max_entries=1)
+    table.put(1, 2, 5.0)
+
+    table.put(1, 4, 6.0)
+
+    assert table.get(1, 4) == 6.0
+    assert table.evictions == 0
+
+
+def test_get_move_when_searched_then_table_is_used():
+    player = ExpectimaxPlayer(time_budget_ms=None, max_depth=3)
+
+    player.get_move(BOARD)
+
+    assert len(player.table) > 0
+    assert player.table.hits > 0
+
+
+def test_get_move_when_unlikely_spawns_pruned_then_fewer_evaluations_and_a_legal_move():
+    full = CountingEvaluator()
+    pruned = CountingEvaluator()
+
+    full_move = ExpectimaxPlayer(time_budget_ms=None, max_depth=3, min_probability=0.0, evaluate=full).get_move(BOARD)
+    pruned_move = ExpectimaxPlayer(time_budget_ms=None, max_depth=3, min_probability=0.1,
+                                   evaluate=pruned).get_move(BOARD)
+
+    assert pruned.calls < full.calls
+    assert full_move in bitboard.legal_moves(BOARD)
+    assert pruned_move in bitboard.legal_moves(BOARD)
+
+
+def test_get_move_when_no_budget_then_searches_to_max_depth():
+    player = ExpectimaxPlayer(time_budget_ms=None, max_depth=2)
+
+    player.get_move(BOARD)
+
+    assert player.last_depth == 2
+
+
+def test_get_move_when_budget_short_then_returns_in_time_with_a_legal_move():
+    player = ExpectimaxPlayer(time_budget_ms=20, max_depth=20)
+
+    start = time.perf_counter()
+    direction = player.get_move(BOARD)
+    elapsed = time.perf_counter() - start
+
+    assert direction in bitboard.legal_moves(BOARD)
+    assert player.last_depth < 20
+    # the clock is checked every few hundred nodes, so allow some slack past the budget
+    assert elapsed < 0.5
+
+
+def test_get_move_when_board_is_stuck_then_none():
+    assert ExpectimaxPlayer(time_budget_ms=None, max_depth=2).get_move(STUCK) is None
+
+
+def test_get_move_when_canonical_keys_then_same_move():
+    plain = ExpectimaxPlayer(time_budget_ms=None, max_depth=3)
+    canonical = ExpectimaxPlayer(time_budget_ms=None, max_depth=3, canonical_keys=True)
+
+    assert plain.get_move(BOARD) == canonical.get_move(BOARD)
+    assert isinstance(plain.get_move(BOARD), Direction)
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+import bitboard
+from direction import Direction
+from expectimax import ExpectimaxPlayer
+from game_log import GameRecorder
+from loader import load_game_module
+
+game = load_game_module()
+
+
+def quick_player():
+    return ExpectimaxPlayer(time_budget_ms=None, max_depth=1)
+
+
+@pytest.mark.parametrize('size, use_bitboard', [(4, True), (4, False), (3, False), (5, False)])
+def test_start_when_size_and_backend_given_then_board_uses_them(size, use_bitboard):
+    board = game.Game(quick_player(), random.Random(size), size=size, use_bitboard=use_bitboard).start()
+
+    assert board.size == size
+    assert board.use_bitboard == use_bitboard
+    assert len(board.get_layout()) == size
+    assert board.moves > 0
+    assert not board.is_playable or board.max_tile() >= 2048
+
+
+def test_get_player_move_when_list_board_then_same_move_as_bitboard():
+    list_board = game.Board(use_bitboard=False, rng=random.Random(1))
+    for _ in range(10):
+        list_board.play_move(min(list_board.legal_moves()))
+        list_board.generate_tile()
+    bitboard_board = game.Board(use_bitboard=True, spawn_tiles=False)
+    bitboard_board.bitboard = bitboard.from_layout(list_board.get_layout())
+
+    player_game = game.Game(quick_player())
+
+    assert player_game.get_player_move(list_board) == player_game.get_player_move(bitboard_board)
+
+
+def test_get_player_move_when_board_is_stuck_then_none():
+    board = game.Board(size=3, spawn_tiles=False)
+    for cell, value in enumerate([2, 4, 2, 4, 2, 4, 2, 4, 2]):
+        board.place_tile(cell, value)
+
+    assert game.Game(quick_player(), size=3, use_bitboard=False).get_player_move(board) is None
+
+
+def test_start_when_bitboard_asked_for_other_size_then_raises():
+    with pytest.raises(ValueError):
+        game.Game(quick_player(), size=5, use_bitboard=True).start()
+
+
+@pytest.mark.parametrize('use_bitboard', [True, False])
+def test_play_move_when_nothing_moves_then_not_counted_or_recorded(use_bitboard):
+    recorder = GameRecorder(0)
+    board = game.Board(use_bitboard=use_bitboard, recorder=recorder, spawn_tiles=False)
+    board.place_tile(0, 2)
+    events = len(recorder.events)
+
+    assert not board.play_move(Direction.LEFT)
+    assert not board.play_move(Direction.UP)
+    assert board.moves == 0
+    assert len(recorder.events) == events
+
+    assert board.play_move(Direction.RIGHT)
+    assert board.moves == 1
+    assert len(recorder.events) == events + 1
+
+
+def test_is_won_when_score_is_2048_but_no_2048_tile_then_not_won():
+    board = game.Board(spawn_tiles=False)
+    board.place_tile(0, 256)
+    board.score = 2048
+
+    assert not game.Game(quick_player()).is_won(board)
+
+    board.place_tile(1, 2048)
+    assert game.Game(quick_player()).is_won(board)
+
+
+@pytest.mark.parametrize('use_bitboard', [True, False])
+def test_max_tile_when_tiles_placed_then_largest_value(use_bitboard):
+    board = game.Board(use_bitboard=use_bitboard, spawn_tiles=False)
+    assert board.max_tile() == 0
+
+    board.place_tile(3, 8)
+    board.place_tile(9, 512)
+
+    assert board.max_tile() == 512
+
+
+def test_start_when_not_stopping_at_win_then_played_until_stuck():
+    board = game.Game(quick_player(), random.Random(0), stop_at_win=False).start()
+
+    assert not board.is_playable
+    assert not board.legal_moves()
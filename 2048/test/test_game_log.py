@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from game_log import GameLogReader, GameLogWriter, GameRecorder, MoveEvent, SpawnEvent
+from loader import load_game_module
+
+game = load_game_module()
+
+
+def play_random_game(seed, size=4, max_moves=200):
+    rng = random.Random(seed)
+    recorder = GameRecorder(seed, size)
+    board = game.Board(rng=rng, size=size, recorder=recorder)
+    for _ in range(max_moves):
+        legal_moves = board.legal_moves()
+        if not legal_moves:
+            break
+        if board.play_move(rng.choice(sorted(legal_moves))):
+            board.generate_tile()
+    return recorder, board
+
+
+def write_log(path, seeds, size=4):
+    boards = []
+    with GameLogWriter(str(path)) as writer:
+        for seed in seeds:
+            recorder, board = play_random_game(seed, size)
+            writer.write_game(recorder)
+            boards.append(board)
+    return boards
+
+
+def replay_final_layout(logged_game):
+    board = None
+    for board, _ in game.Board.replay(logged_game):
+        pass
+    # the board is moved on once more after the last yield, when the loop finishes
+    return board.get_layout()
+
+
+def test_reader_when_games_read_back_then_replay_to_final_layout(tmp_path):
+    path = tmp_path / 'games.log'
+    boards = write_log(path, range(5))
+
+    with GameLogReader(str(path)) as reader:
+        assert len(reader) == 5
+        for logged_game, board in zip(reader, boards):
+            assert replay_final_layout(logged_game) == board.get_layout()
+
+
+def test_reader_when_closed_after_iterating_then_closes(tmp_path):
+    path = tmp_path / 'games.log'
+    boards = write_log(path, range(3))
+
+    with GameLogReader(str(path)) as reader:
+        games = list(reader)
+        for logged_game in reader:
+            pass
+
+    assert reader.buffer.closed
+    assert [replay_final_layout(logged_game) for logged_game in games] == [board.get_layout() for board in boards]
+
+
+def test_reader_when_closed_while_game_held_then_game_still_readable(tmp_path):
+    path = tmp_path / 'games.log'
+    write_log(path, [7])
+    reader = GameLogReader(str(path))
+    logged_game = reader[0]
+
+    reader.close()
+
+    events = list(logged_game.events())
+    assert logged_game.seed == 7
+    assert isinstance(events[0], SpawnEvent)
+    assert any(isinstance(event, MoveEvent) for event in events)
+
+
+def test_reader_when_indexed_then_matches_iteration(tmp_path):
+    path = tmp_path / 'games.log'
+    write_log(path, range(4), size=5)
+
+    with GameLogReader(str(path)) as reader:
+        in_order = [(logged_game.seed, logged_game.size, logged_game.data) for logged_game in reader]
+        by_index = [(reader[number].seed, reader[number].size, reader[number].data) for number in range(-1, -5, -1)]
+
+    assert by_index == in_order[::-1]
+    assert all(size == 5 for _, size, _ in in_order)
+
+
+def test_reader_when_game_out_of_range_then_raises(tmp_path):
+    path = tmp_path / 'games.log'
+    write_log(path, [1])
+
+    with GameLogReader(str(path)) as reader:
+        with pytest.raises(IndexError):
+            reader[1]
+
+
+def test_recorder_when_board_too_big_then_raises():
+    with pytest.raises(ValueError):
+        GameRecorder(0, size=9)
+
+
+def test_reader_when_not_a_game_log_then_raises_and_closes(tmp_path):
+    path = tmp_path / 'games.log'
+    path.write_bytes(b'not a game log at all, just some bytes')
+    # built in two steps so the half-open reader can be looked at after it raises
+    reader = GameLogReader.__new__(GameLogReader)
+
+    with pytest.raises(ValueError):
+        reader.__init__(str(path))
+
+    assert reader.file.closed
+    assert reader.buffer.closed
+
+
+def test_reader_when_writer_not_closed_then_raises_and_closes(tmp_path):
+    path = tmp_path / 'games.log'
+    writer = GameLogWriter(str(path))
+    recorder, _ = play_random_game(0)
+    writer.write_game(recorder)
+    writer.file.close()
+    reader = GameLogReader.__new__(GameLogReader)
+
+    with pytest.raises(ValueError):
+        reader.__init__(str(path))
+
+    assert reader.file.closed
+    assert reader.buffer.closed
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+import bitboard
+from heuristics import Evaluator, HeuristicWeights, row_features
+
+
+def direct_evaluation(board, weights):
+    # every row and column scored straight from row_features, without the tables
+    layout = [[bitboard.get_cell(board, row, column) for column in range(4)] for row in range(4)]
+    lines = layout + [list(column) for column in zip(*layout)]
+    return sum(getattr(weights, name) * value for line in lines for name, value in row_features(line).items())
+
+
+def random_board(rng):
+    board = 0
+    for cell in range(bitboard.CELL_COUNT):
+        if rng.random() < 0.7:
+            board = bitboard.place_tile(board, cell, rng.randint(1, 15))
+    return board
+
+
+@pytest.mark.parametrize('weights', [HeuristicWeights(), HeuristicWeights(smoothness=3.0, sum=-1.0, merges=0.0)])
+def test_evaluate_when_random_boards_then_matches_direct_row_computation(weights):
+    rng = random.Random(0)
+    evaluator = Evaluator(weights)
+
+    for _ in range(300):
+        board = random_board(rng)
+        assert evaluator(board) == pytest.approx(direct_evaluation(board, weights), rel=1e-9)
+
+
+def test_evaluate_when_board_turned_or_mirrored_then_same_value():
+    rng = random.Random(1)
+    evaluator = Evaluator()
+
+    for _ in range(50):
+        board = random_board(rng)
+        assert {round(evaluator(symmetry), 6) for symmetry in bitboard.symmetries(board)} == {round(evaluator(board), 6)}
+
+
+def test_row_features_when_row_has_merges_and_gaps_then_counted():
+    features = row_features([1, 1, 0, 1])
+
+    assert features['empty'] == 1.0
+    # three equal tiles in a row once the gap closes
+    assert features['merges'] == 3.0
+    assert features['smoothness'] == 0.0
@@ -0,0 +1,234 @@
+import argparse
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from chess_bitboard import CHECKMATE, ONGOING, STALEMATE, BitBoard, move_to_uci
+from search import MATE_SCORE, MAX_PLY, AlphaBetaPlayer
+
+# positions with the same pieces, side, castling and en passant square and the
+# same limits give the same answer, the move clocks are left out
+CacheKey = Tuple[int, int, Optional[float]]
+STATUS_NAMES = {ONGOING: 'ongoing', CHECKMATE: 'checkmate', STALEMATE: 'stalemate'}
+
+# the process's own player, kept between positions so its table carries over
+_player: Optional[AlphaBetaPlayer] = None
+_hash_mb = 16.0
+
+
+def _start_worker(hash_mb: float) -> None:
+    global _hash_mb
+    _hash_mb = hash_mb
+
+
+def analyse(fen: str, depth: int, time_budget_ms: Optional[float]) -> Dict[str, object]:
+    global _player
+    started = time.monotonic()
+    if _player is None:
+        _player = AlphaBetaPlayer(hash_mb=_hash_mb)
+    _player.max_depth = min(depth, MAX_PLY - 1)
+    _player.time_budget_ms = time_budget_ms
+
+    position = BitBoard.from_fen(fen)
+    status = position.status()
+    move = _player.get_move(position) if status == ONGOING else None
+    result = {'bestmove': move_to_uci(move) if move is not None else None, 'status': STATUS_NAMES[status],
+              'started': started}
+    if move is not None and _player.info:
+        info = _player.info[-1]
+        result.update(depth=info.depth, score=info.score, mate=info.mate_in, nodes=info.nodes,
+                      pv=[move_to_uci(pv_move) for pv_move in info.pv])
+    elif move is not None:
+        # the clock ran out inside the first iteration, so the move is just a
+        # legal one and its depth and score are unknown
+        result.update(depth=None, score=None, mate=None, nodes=_player.nodes, pv=[])
+    elif status == CHECKMATE:
+        # scored as the search scores being mated at the root
+        result.update(depth=0, score=-MATE_SCORE, mate=0, nodes=0, pv=[])
+    else:
+        result.update(depth=0, score=0, mate=None, nodes=0, pv=[])
+    result['time_ms'] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+
+@dataclass
+class ServiceStats:
+    start: float = field(default_factory=time.monotonic)
+    requests: int = 0
+    searched: int = 0
+    cache_hits: int = 0
+    # requests that joined a search already running for the same position
+    joined: int = 0
+    errors: int = 0
+    nodes: int = 0
+    queue_latencies: List[float] = field(default_factory=list)
+
+    def report(self) -> Dict[str, object]:
+        elapsed = time.monotonic() - self.start
+        latencies = sorted(self.queue_latencies)
+
+        def percentile(fraction: float) -> float:
+            return round(latencies[int(fraction * (len(latencies) - 1))] * 1000, 1) if latencies else 0.0
+
+        return {'requests': self.requests, 'searched': self.searched, 'cache_hits': self.cache_hits,
+                'joined': self.joined, 'errors': self.errors, 'elapsed_s': round(elapsed, 2),
+                'positions_per_s': round(self.requests / elapsed, 2) if elapsed else 0.0,
+                'nodes_per_s': round(self.nodes / elapsed) if elapsed else 0,
+                'queue_ms_mean': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+                'queue_ms_p50': percentile(0.5), 'queue_ms_p95': percentile(0.95), 'queue_ms_max': percentile(1.0)}
+
+
+class AnalysisService:
+    workers: int
+    default_depth: int
+    default_time_ms: Optional[float]
+    cache_size: int
+
+    def __init__(self, output: TextIO, workers: int = os.cpu_count() or 1, hash_mb: float = 16,
+                 default_depth: int = 6, default_time_ms: Optional[float] = None, cache_size: int = 100000,
+                 max_pending: Optional[int] = None):
+        if workers < 1:
+            raise ValueError(f'The analysis service needs at least one worker, got {workers}')
+
+        self.output = output
+        self.workers = workers
+        self.default_depth = default_depth
+        self.default_time_ms = default_time_ms
+        self.cache_size = cache_size
+        self.stats = ServiceStats()
+        self.cache: 'OrderedDict[CacheKey, Dict[str, object]]' = OrderedDict()
+        # requests waiting on a search, by position, so duplicates share one search
+        self.pending: Dict[CacheKey, List[Tuple[object, str, float]]] = {}
+        self.lock = threading.Lock()
+        # reading stops while this many searches are queued, so a huge input
+        # is never held in memory all at once
+        self.slots = threading.BoundedSemaphore(max_pending or workers * 4)
+        self.executor = ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(hash_mb,))
+
+    def submit(self, request: Dict[str, object]) -> None:
+        received = time.monotonic()
+        request_id = request.get('id')
+        with self.lock:
+            self.stats.requests += 1
+        try:
+            fen = str(request['fen'])
+            depth = int(request.get('depth', self.default_depth))
+            time_ms = request.get('time_ms', self.default_time_ms)
+            time_ms = None if time_ms is None else float(time_ms)
+            if depth < 1:
+                raise ValueError(f'Depth must be at least 1, got {depth}')
+            key = (BitBoard.from_fen(fen).key, depth, time_ms)
+        except (KeyError, TypeError, ValueError) as error:
+            with self.lock:
+                self.write_error(request_id, f'{type(error).__name__}: {error}')
+            return
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.stats.cache_hits += 1
+                self.write(request_id, fen, cached, cached=True, queue_ms=0.0)
+                return
+            if key in self.pending:
+                self.stats.joined += 1
+                self.pending[key].append((request_id, fen, received))
+                return
+            self.pending[key] = [(request_id, fen, received)]
+
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(analyse, fen, depth, time_ms)
+        except Exception as error:
+            # a broken or shut down pool never calls finish, so the slot and
+            # the waiting requests are given up here
+            self.slots.release()
+            with self.lock:
+                for waiting_id, _, _ in self.pending.pop(key):
+                    self.write_error(waiting_id, f'{type(error).__name__}: {error}')
+            return
+        future.add_done_callback(lambda done: self.finish(key, done))
+
+    def finish(self, key: CacheKey, future: Future) -> None:
+        try:
+            with self.lock:
+                waiting = self.pending.pop(key)
+                error = future.exception()
+                if error is not None:
+                    for request_id, _, _ in waiting:
+                        self.write_error(request_id, f'{type(error).__name__}: {error}')
+                    return
+
+                result = future.result()
+                started = result.pop('started')
+                self.stats.searched += 1
+                self.stats.nodes += result['nodes']
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+                for index, (request_id, fen, received) in enumerate(waiting):
+                    # time spent queued before a worker picked the position up
+                    latency = max(started - received, 0.0)
+                    self.stats.queue_latencies.append(latency)
+                    self.write(request_id, fen, result, cached=index > 0, queue_ms=round(latency * 1000, 1))
+        finally:
+            self.slots.release()
+
+    def write(self, request_id: object, fen: str, result: Dict[str, object], cached: bool, queue_ms: float) -> None:
+        self.output.write(json.dumps({'id': request_id, 'fen': fen, **result, 'cached': cached,
+                                      'queue_ms': queue_ms}) + '\n')
+        self.output.flush()
+
+    # callers hold the lock, so lines from different threads never interleave
+    def write_error(self, request_id: object, message: str) -> None:
+        self.stats.errors += 1
+        self.output.write(json.dumps({'id': request_id, 'error': message}) + '\n')
+        self.output.flush()
+
+    def run(self, lines: TextIO) -> None:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('a request must be a JSON object')
+            except ValueError as error:
+                with self.lock:
+                    self.stats.requests += 1
+                    self.write_error(None, f'line {number}: {error}')
+                continue
+            self.submit(request)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> 'AnalysisService':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Analyse a stream of positions. Reads one JSON request per line from stdin, '
+                    'e.g. {"id": 1, "fen": "...", "depth": 6, "time_ms": 500}, and writes one JSON '
+                    'result per line to stdout as searches finish. Metrics go to stderr.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--hash-mb', type=float, default=16)
+    parser.add_argument('--depth', type=int, default=6, help='depth for requests that do not give one')
+    parser.add_argument('--time-ms', type=float, default=None, help='time budget for requests that do not give one')
+    parser.add_argument('--cache-size', type=int, default=100000)
+
+    args = parser.parse_args()
+    with AnalysisService(sys.stdout, args.workers, args.hash_mb, args.depth, args.time_ms, args.cache_size) as service:
+        service.run(sys.stdin)
+    print(json.dumps(service.stats.report()), file=sys.stderr)
@@ -1,17 +1,25 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict, List
+import random
+from typing import Dict, List, Optional, Tuple, Type
+
+import chess_bitboard
+from compact_position import CompactPosition
+from opening_book import OpeningBook
+from search import AlphaBetaPlayer
 
 class Color(Enum):
     BLACK = 'Black'
     WHITE = 'White'
     
     def get_opposite(self) -> 'Color':
-        return Color.WHITE if self == Color.BLACK else Color.WHITE
+        return Color.WHITE if self == Color.BLACK else Color.BLACK
 
 
 @dataclass
 class Position:
+    __slots__ = ('row', 'column')
+    
     row: int
     column: int
     
@@ -21,9 +29,12 @@ class Move:
     initial: Position
     target: Position
     turn: Color
+    promotion: Optional[Type['Piece']] = None
     
 
 class Piece():
+    __slots__ = ('position', 'color')
+    
     position: Position
     color: Color
     
@@ -36,6 +47,8 @@ class Piece():
         
         
 class Pawn(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         row_diff = target.row - self.position.row
         abs_column_diff = abs(target.column - self.position.column)
@@ -49,6 +62,8 @@ class Pawn(Piece):
     
 
 class King(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         abs_row_diff = abs(target.row - self.position.row)
         abs_column_diff = abs(target.column - self.position.column)
@@ -56,11 +71,15 @@ class King(Piece):
     
 
 class Queen(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         return Castle(self.position, self.color).can_move_to(target, layout) or Bishop(self.position, self.color).can_move_to(target, layout)
     
 
 class Knight(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         abs_row_diff = abs(target.row - self.position.row)
         abs_column_diff = abs(target.column - self.position.column)
@@ -69,6 +88,8 @@ class Knight(Piece):
         
     
 class Castle(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         row_diff = target.row - self.position.row
         column_diff = target.column - self.position.column
@@ -92,6 +113,8 @@ class Castle(Piece):
         
 
 class Bishop(Piece):
+    __slots__ = ()
+    
     def can_move_to(self, target: Position, layout: List[List['Piece']]) -> bool:
         row_diff = target.row - self.position.row
         column_diff = target.column - self.position.column
@@ -118,22 +141,84 @@ class Bishop(Piece):
                 
         return True
         
+
+PIECE_TYPES = {Pawn: chess_bitboard.PAWN, Knight: chess_bitboard.KNIGHT, Bishop: chess_bitboard.BISHOP,
+               Castle: chess_bitboard.CASTLE, Queen: chess_bitboard.QUEEN, King: chess_bitboard.KING}
+PIECE_CLASSES = {piece_type: piece_class for piece_class, piece_type in PIECE_TYPES.items()}
+COLORS = {Color.WHITE: chess_bitboard.WHITE, Color.BLACK: chess_bitboard.BLACK}
+COLORS_BY_INDEX = {index: color for color, index in COLORS.items()}
+
+# (right, color, king square, castle square): a side keeps the right while both are still at home
+CASTLING_HOMES = [
+    (chess_bitboard.WHITE_KINGSIDE, Color.WHITE, chess_bitboard.parse_square('e1'), chess_bitboard.parse_square('h1')),
+    (chess_bitboard.WHITE_QUEENSIDE, Color.WHITE, chess_bitboard.parse_square('e1'), chess_bitboard.parse_square('a1')),
+    (chess_bitboard.BLACK_KINGSIDE, Color.BLACK, chess_bitboard.parse_square('e8'), chess_bitboard.parse_square('h8')),
+    (chess_bitboard.BLACK_QUEENSIDE, Color.BLACK, chess_bitboard.parse_square('e8'), chess_bitboard.parse_square('a8')),
+]
+
+
+def to_square(position: Position) -> int:
+    return position.row * chess_bitboard.SIZE + position.column
+
+
+def to_position(square: int) -> Position:
+    return Position(row=square // chess_bitboard.SIZE, column=square % chess_bitboard.SIZE)
+
+
+def to_piece_code(piece: Piece) -> int:
+    return chess_bitboard.piece_code(COLORS[piece.color], PIECE_TYPES[type(piece)])
+
+
+def to_piece(code: int, square: int) -> Piece:
+    color, piece_type = divmod(code, chess_bitboard.PIECE_TYPE_COUNT)
+    return PIECE_CLASSES[piece_type](to_position(square), COLORS_BY_INDEX[color])
+
     
 class Board:
     size: int = 8
     layout: List[List[Piece]]
+    is_check: bool
     is_checkmate: bool
+    is_stalemate: bool
+    is_draw: bool
     captured_pieces: Dict[Color, List[Piece]]
+    bitboard: chess_bitboard.BitBoard
+    # (move, moved piece, captured piece)
+    move_history: List[Tuple[Move, Piece, Optional[Piece]]]
+    # the key of the position before each move in move_history
+    keys: List[int]
     
-    def __init__(self) -> None:
-        row = [None] * self.size
-        self.layout = row * self.size
-        self.set_up_pawns()
-        self.set_up_back_rows()
-        self.is_checkmate = False
+    def __init__(self, fen: Optional[str] = None, position: Optional[chess_bitboard.BitBoard] = None) -> None:
+        self.layout = [[None] * self.size for _ in range(self.size)]
+        if fen is not None:
+            position = chess_bitboard.BitBoard.from_fen(fen)
+        if position is None:
+            self.set_up_pawns()
+            self.set_up_back_rows()
+            self.bitboard = self.build_bitboard(Color.WHITE)
+        else:
+            self.bitboard = position
+            self.set_up_from_bitboard()
         self.captured_pieces = {}
         self.captured_pieces[Color.WHITE] = []
         self.captured_pieces[Color.BLACK] = []
+        self.move_history = []
+        self.keys = []
+        self.update_status()
+    
+    @classmethod
+    def from_fen(cls, fen: str) -> 'Board':
+        return cls(fen)
+    
+    def to_fen(self) -> str:
+        return self.bitboard.to_fen()
+    
+    @classmethod
+    def from_compact(cls, compact: CompactPosition) -> 'Board':
+        return cls(position=compact.to_bitboard())
+    
+    def to_compact(self) -> CompactPosition:
+        return CompactPosition.from_bitboard(self.bitboard)
     
     def set_up_pawns(self):
         for column in range(self.size):
@@ -158,19 +243,67 @@ class Board:
                 self.layout[0][column] = King(Position(row=0, column=column), Color.BLACK)
                 self.layout[7][column] = King(Position(row=7, column=column), Color.WHITE)
                 
-    def is_valid_move(self, move: Move) -> bool:
-        if not self.is_within_board(move.target):
-            return False
+    def set_up_from_bitboard(self):
+        for square, code in enumerate(self.bitboard.squares):
+            if code != chess_bitboard.EMPTY:
+                piece = to_piece(code, square)
+                self.layout[piece.position.row][piece.position.column] = piece
+                
+    def build_bitboard(self, turn: Color) -> chess_bitboard.BitBoard:
+        position = chess_bitboard.BitBoard()
+        for row in self.layout:
+            for piece in row:
+                if piece:
+                    position.put_piece(to_square(piece.position), to_piece_code(piece))
         
-        piece = self.layout[move.initial.row][move.initial.column]
-        if not piece:
-            return False
+        position.turn = COLORS[turn]
+        for right, color, king_square, castle_square in CASTLING_HOMES:
+            king = chess_bitboard.piece_code(COLORS[color], chess_bitboard.KING)
+            castle = chess_bitboard.piece_code(COLORS[color], chess_bitboard.CASTLE)
+            if position.squares[king_square] == king and position.squares[castle_square] == castle:
+                position.castling |= right
+        position.key = position.compute_key()
+        return position
+    
+    def to_move(self, engine_move: int) -> Move:
+        promotion = chess_bitboard.move_promotion(engine_move)
+        return Move(
+            initial=to_position(chess_bitboard.move_from(engine_move)),
+            target=to_position(chess_bitboard.move_to(engine_move)),
+            turn=COLORS_BY_INDEX[self.bitboard.turn],
+            promotion=PIECE_CLASSES[promotion] if promotion else None,
+        )
+    
+    def to_engine_move(self, move: Move) -> Optional[int]:
+        if move.turn != COLORS_BY_INDEX[self.bitboard.turn]:
+            return None
         
-        correct_turn = piece.color == move.turn
-        not_occupied = self.target_not_occupied_by_same_color(move.turn, move.target)
-        can_move_to = piece.can_move_to(move.target, self.size)
+        from_square = to_square(move.initial)
+        target_square = to_square(move.target)
+        # a pawn reaching the last row becomes a queen unless told otherwise
+        promotion = PIECE_TYPES[move.promotion or Queen]
+        for engine_move in self.bitboard.generate_legal_moves():
+            if (chess_bitboard.move_from(engine_move) != from_square
+                    or chess_bitboard.move_to(engine_move) != target_square):
+                continue
+            if chess_bitboard.move_promotion(engine_move) in (0, promotion):
+                return engine_move
+        return None
+    
+    def key(self) -> int:
+        return self.bitboard.key
+    
+    def previous_keys(self) -> List[int]:
+        return self.keys
+    
+    def legal_moves(self) -> List[Move]:
+        return [self.to_move(engine_move) for engine_move in self.bitboard.generate_legal_moves()]
+                
+    def is_valid_move(self, move: Move) -> bool:
+        if not self.is_within_board(move.initial) or not self.is_within_board(move.target):
+            return False
         
-        return correct_turn and not_occupied and can_move_to
+        return self.to_engine_move(move) is not None
     
     def is_within_board(self, target: Position) -> bool:
         return target.row >= 0 and target.row < self.size and target.column >= 0 and target.column < self.size
@@ -179,37 +312,116 @@ class Board:
         target_piece = self.layout[target.row][target.column]
         return target_piece is None or target_piece.color == turn.get_opposite()
     
-    def play_move(self, move: Move) -> None:
+    def update_status(self) -> None:
+        # one pass over the attack maps and legal moves settles all three
+        status = self.bitboard.status()
+        self.is_check = bool(self.bitboard.checkers())
+        self.is_checkmate = status == chess_bitboard.CHECKMATE
+        self.is_stalemate = status == chess_bitboard.STALEMATE
+        # the fifty-move rule or the same position a third time
+        self.is_draw = self.bitboard.halfmove_clock >= 100 or self.count_repetitions() >= 3
+    
+    def count_repetitions(self) -> int:
+        # only positions since the last capture or pawn move can repeat, and
+        # only those with the same side to move, so at most every other key of
+        # the last halfmove_clock is looked at
+        keys = self.keys
+        key = self.bitboard.key
+        earliest = max(len(keys) - self.bitboard.halfmove_clock, 0)
+        repetitions = 1
+        for index in range(len(keys) - 2, earliest - 1, -2):
+            if keys[index] == key:
+                repetitions += 1
+        return repetitions
+    
+    def is_game_over(self) -> bool:
+        return self.is_checkmate or self.is_stalemate or self.is_draw
+    
+    def make_move(self, move: Move) -> None:
+        engine_move = self.to_engine_move(move)
+        if engine_move is None:
+            raise ValueError(f'Not a legal move: {move}')
+        
+        flag = chess_bitboard.move_flag(engine_move)
         piece = self.layout[move.initial.row][move.initial.column]
-        target = self.layout[move.target.row][move.target.column]
+        captured_row = move.initial.row if flag == chess_bitboard.EN_PASSANT else move.target.row
+        target = self.layout[captured_row][move.target.column]
         
-        if type(target) == King:
-            self.is_checkmate = True
+        promotion = chess_bitboard.move_promotion(engine_move)
+        moved = PIECE_CLASSES[promotion](piece.position, piece.color) if promotion else piece
+        self.layout[captured_row][move.target.column] = None
+        self.move_piece(moved, move.initial, move.target)
         
-        piece.position.row = target.position.row
-        piece.position.column = target.position.column
-        self.layout[move.target.row][move.target.column] = piece
-        self.layout[move.initial.row][move.initial.column] = None
+        if flag == chess_bitboard.CASTLING:
+            castle_from, castle_to = chess_bitboard.CASTLE_ROOK_MOVES[to_square(move.target)]
+            initial, target_position = to_position(castle_from), to_position(castle_to)
+            self.move_piece(self.layout[initial.row][initial.column], initial, target_position)
         
         if target:
             self.captured_pieces[target.color].append(target)
+        
+        self.move_history.append((move, piece, target))
+        self.keys.append(self.bitboard.key)
+        self.bitboard.make_move(engine_move)
+        self.update_status()
+    
+    def unmake_move(self) -> Move:
+        move, piece, target = self.move_history.pop()
+        self.keys.pop()
+        engine_move = self.bitboard.unmake_move()
+        
+        if chess_bitboard.move_flag(engine_move) == chess_bitboard.CASTLING:
+            castle_from, castle_to = chess_bitboard.CASTLE_ROOK_MOVES[to_square(move.target)]
+            initial, target_position = to_position(castle_to), to_position(castle_from)
+            self.move_piece(self.layout[initial.row][initial.column], initial, target_position)
+        
+        self.move_piece(piece, move.target, move.initial)
+        if target:
+            self.layout[target.position.row][target.position.column] = target
+            self.captured_pieces[target.color].pop()
+        
+        self.update_status()
+        return move
+    
+    def move_piece(self, piece: Piece, initial: Position, target: Position) -> None:
+        piece.position = Position(row=target.row, column=target.column)
+        self.layout[target.row][target.column] = piece
+        self.layout[initial.row][initial.column] = None
 
            
 class Game:
-    def play(self):
+    player: AlphaBetaPlayer
+    book: Optional[OpeningBook]
+    
+    def __init__(self, player: Optional[AlphaBetaPlayer] = None, book: Optional[OpeningBook] = None,
+                 rng: Optional[random.Random] = None) -> None:
+        self.player = player or AlphaBetaPlayer()
+        self.book = book
+        self.rng = rng or random.Random()
+    
+    def play(self) -> Board:
         board = Board()
         turn = Color.WHITE
         
-        while not board.is_checkmate:
-            move = self.get_player_move()
+        while not board.is_game_over():
+            move = self.get_player_move(board)
+            if move is None:
+                break
             
             is_valid = board.is_valid_move(move)
             
             if is_valid:
-                board.play_move(move)
+                board.make_move(move)
                 turn = turn.get_opposite()
             else:
                 print('Not a valid move, try again')
+        
+        return board
             
-    def get_player_move(self) -> Move:
-        return Move()
\ No newline at end of file
+    def get_player_move(self, board: Board) -> Optional[Move]:
+        # book moves are picked in proportion to their weight, the search only
+        # runs once the game has left the book
+        engine_move = self.book.choose_move(board.bitboard, self.rng) if self.book else None
+        if engine_move is None:
+            engine_move = self.player.get_move(board.bitboard, board.previous_keys())
+        return None if engine_move is None else board.to_move(engine_move)
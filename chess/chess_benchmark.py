@@ -0,0 +1,83 @@
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable, List
+
+from chess_bitboard import BitBoard
+from chess import Board
+from compact_position import CompactPosition
+
+
+def sample_positions(count: int, seed: int = 0) -> List[BitBoard]:
+    # positions from random games, so piece counts vary like a real cache
+    rng = random.Random(seed)
+    positions = []
+    position = BitBoard.starting_position()
+    while len(positions) < count:
+        moves = position.generate_legal_moves()
+        if not moves or position.fullmove_number > 80:
+            position = BitBoard.starting_position()
+            continue
+        position.make_move(rng.choice(moves))
+        positions.append(position.copy())
+    return positions
+
+
+def measure_memory(positions: List[BitBoard], build: Callable[[BitBoard], object]) -> float:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    stored = [build(position) for position in positions]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del stored
+    return (after - before) / len(positions)
+
+
+def measure_copy(items: List[object], copy: Callable[[object], object]) -> float:
+    start = time.perf_counter()
+    for item in items:
+        copy(item)
+    return len(items) / (time.perf_counter() - start)
+
+
+def without_history(position: BitBoard) -> BitBoard:
+    copied = position.copy()
+    copied.history = []
+    return copied
+
+
+def run_memory_benchmark(count: int) -> None:
+    positions = sample_positions(count)
+    print(f'{count} stored positions')
+    for name, build in (
+        ('Board (pieces, layout and bitboards)', lambda position: Board(position=without_history(position))),
+        ('Board.layout of Piece objects', lambda position: Board(position=without_history(position)).layout),
+        ('BitBoard', without_history),
+        ('CompactPosition', CompactPosition.from_bitboard),
+        ('CompactPosition.to_bytes()', lambda position: CompactPosition.from_bitboard(position).to_bytes()),
+    ):
+        print(f'{name:<38} {measure_memory(positions, build):>10,.0f} bytes/position')
+
+    compact = [CompactPosition.from_bitboard(position) for position in positions]
+    packed = [item.to_bytes() for item in compact]
+    print()
+    for name, items, copy in (
+        ('BitBoard.copy', positions, BitBoard.copy),
+        ('CompactPosition.copy', compact, CompactPosition.copy),
+        ('CompactPosition.from_bytes', packed, CompactPosition.from_bytes),
+        ('bytes copy', packed, bytearray),
+    ):
+        print(f'{name:<38} {measure_copy(items, copy):>10,.0f} copies/s')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Chess engine benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    memory_parser = subparsers.add_parser('memory', help='bytes per stored position for each representation')
+    memory_parser.add_argument('--positions', type=int, default=2000)
+
+    args = parser.parse_args()
+    if args.benchmark == 'memory':
+        run_memory_benchmark(args.positions)
@@ -0,0 +1,669 @@
+from typing import List, Optional, Tuple
+
+from zobrist import BLACK_TO_MOVE_KEY, CASTLING_KEYS, EN_PASSANT_KEYS, PIECE_KEYS, compute_key
+
+# Squares are numbered row * 8 + column with the same rows and columns as
+# Board.layout: row 0 is black's back rank, column 0 is the a-file. Square 0
+# is a8, square 63 is h1, and white pawns move towards row 0.
+SIZE = 8
+SQUARE_COUNT = SIZE * SIZE
+FULL = (1 << SQUARE_COUNT) - 1
+
+WHITE = 0
+BLACK = 1
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+CASTLE = 3
+QUEEN = 4
+KING = 5
+PIECE_TYPE_COUNT = 6
+EMPTY = -1
+
+PIECE_SYMBOLS = 'PNBRQKpnbrqk'
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING = 15
+
+# A move is packed into one int: from square, to square, promotion piece type
+# (0 for none) and a flag for the moves that touch more than two squares.
+NORMAL = 0
+DOUBLE_PUSH = 1
+EN_PASSANT = 2
+CASTLING = 3
+TO_SHIFT = 6
+PROMOTION_SHIFT = 12
+FLAG_SHIFT = 15
+SQUARE_MASK = 0x3F
+NULL_MOVE = 0
+MOVE_MASK = (1 << 17) - 1
+
+# An undo record is one int: the move in the low 17 bits, then what the move
+# destroyed - captured piece code + 1, castling rights, en passant square + 1
+# and the halfmove clock.
+UNDO_CAPTURED_SHIFT = 17
+UNDO_CASTLING_SHIFT = 21
+UNDO_EN_PASSANT_SHIFT = 25
+UNDO_HALFMOVE_SHIFT = 32
+
+
+def piece_code(color: int, piece_type: int) -> int:
+    return color * PIECE_TYPE_COUNT + piece_type
+
+
+def encode_move(from_square: int, to_square: int, promotion: int = 0, flag: int = NORMAL) -> int:
+    return from_square | (to_square << TO_SHIFT) | (promotion << PROMOTION_SHIFT) | (flag << FLAG_SHIFT)
+
+
+def move_from(move: int) -> int:
+    return move & SQUARE_MASK
+
+
+def move_to(move: int) -> int:
+    return (move >> TO_SHIFT) & SQUARE_MASK
+
+
+def move_promotion(move: int) -> int:
+    return (move >> PROMOTION_SHIFT) & 0x7
+
+
+def move_flag(move: int) -> int:
+    return move >> FLAG_SHIFT
+
+
+def square_name(square: int) -> str:
+    return 'abcdefgh'[square % SIZE] + str(SIZE - square // SIZE)
+
+
+def parse_square(name: str) -> int:
+    column = 'abcdefgh'.index(name[0])
+    row = SIZE - int(name[1])
+    if not 0 <= row < SIZE:
+        raise ValueError(f'Not a square: {name}')
+    return row * SIZE + column
+
+
+def move_to_uci(move: int) -> str:
+    text = square_name(move_from(move)) + square_name(move_to(move))
+    promotion = move_promotion(move)
+    return text + PIECE_SYMBOLS[PIECE_TYPE_COUNT + promotion] if promotion else text
+
+
+def _bit(row: int, column: int) -> int:
+    if 0 <= row < SIZE and 0 <= column < SIZE:
+        return 1 << (row * SIZE + column)
+    return 0
+
+
+def _build_leaper_table(offsets: List[Tuple[int, int]]) -> List[int]:
+    table = []
+    for square in range(SQUARE_COUNT):
+        row, column = divmod(square, SIZE)
+        attacks = 0
+        for row_offset, column_offset in offsets:
+            attacks |= _bit(row + row_offset, column + column_offset)
+        table.append(attacks)
+    return table
+
+
+KNIGHT_ATTACKS = _build_leaper_table([(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)])
+KING_ATTACKS = _build_leaper_table([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)])
+# the squares a pawn of the given color on a square attacks
+PAWN_ATTACKS = [
+    _build_leaper_table([(-1, -1), (-1, 1)]),
+    _build_leaper_table([(1, -1), (1, 1)]),
+]
+
+# sliding directions as (row step, column step); a direction is positive when
+# it walks towards higher square numbers, so its nearest blocker is the lowest bit
+ROOK_DIRECTIONS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def _build_rays(directions: List[Tuple[int, int]]) -> List[Tuple[bool, List[int]]]:
+    rays = []
+    for row_step, column_step in directions:
+        table = []
+        for square in range(SQUARE_COUNT):
+            row, column = divmod(square, SIZE)
+            ray = 0
+            row, column = row + row_step, column + column_step
+            while 0 <= row < SIZE and 0 <= column < SIZE:
+                ray |= 1 << (row * SIZE + column)
+                row, column = row + row_step, column + column_step
+            table.append(ray)
+        rays.append((row_step * SIZE + column_step > 0, table))
+    return rays
+
+
+ROOK_RAYS = _build_rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _build_rays(BISHOP_DIRECTIONS)
+
+
+def _slide(square: int, occupied: int, rays: List[Tuple[bool, List[int]]]) -> int:
+    attacks = 0
+    for positive, table in rays:
+        ray = table[square]
+        blockers = ray & occupied
+        if blockers:
+            nearest = (blockers & -blockers).bit_length() - 1 if positive else blockers.bit_length() - 1
+            ray ^= table[nearest]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return _slide(square, occupied, ROOK_RAYS)
+
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return _slide(square, occupied, BISHOP_RAYS)
+
+
+def queen_attacks(square: int, occupied: int) -> int:
+    return _slide(square, occupied, ROOK_RAYS) | _slide(square, occupied, BISHOP_RAYS)
+
+
+def _walk(square: int, row_step: int, column_step: int) -> List[int]:
+    row, column = divmod(square, SIZE)
+    squares = []
+    row, column = row + row_step, column + column_step
+    while 0 <= row < SIZE and 0 <= column < SIZE:
+        squares.append(row * SIZE + column)
+        row, column = row + row_step, column + column_step
+    return squares
+
+
+def _build_line_tables() -> Tuple[List[List[int]], List[List[int]]]:
+    # between[a][b] holds the squares strictly between two squares on a shared
+    # row, column or diagonal, line[a][b] the whole line through both
+    between = [[0] * SQUARE_COUNT for _ in range(SQUARE_COUNT)]
+    line = [[0] * SQUARE_COUNT for _ in range(SQUARE_COUNT)]
+    for start in range(SQUARE_COUNT):
+        for row_step, column_step in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            full_line = 1 << start
+            for square in _walk(start, row_step, column_step) + _walk(start, -row_step, -column_step):
+                full_line |= 1 << square
+            walked = 0
+            for end in _walk(start, row_step, column_step):
+                between[start][end] = walked
+                line[start][end] = full_line
+                walked |= 1 << end
+    return between, line
+
+
+def iterate_squares(bits: int):
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def _row_mask(row: int) -> int:
+    return 0xFF << (row * SIZE)
+
+
+def _column_mask(column: int) -> int:
+    return sum(1 << (row * SIZE + column) for row in range(SIZE))
+
+
+BETWEEN, LINE = _build_line_tables()
+
+NOT_A_FILE = FULL ^ _column_mask(0)
+NOT_H_FILE = FULL ^ _column_mask(SIZE - 1)
+PROMOTION_ROWS = [_row_mask(0), _row_mask(SIZE - 1)]
+# rows a pawn reaches after its first single push, from where it may push again
+DOUBLE_PUSH_ROWS = [_row_mask(5), _row_mask(2)]
+
+# rights lost when anything moves from or to a square
+CASTLING_RIGHTS_KEPT = [ALL_CASTLING] * SQUARE_COUNT
+CASTLING_RIGHTS_KEPT[parse_square('e1')] &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_RIGHTS_KEPT[parse_square('h1')] &= ~WHITE_KINGSIDE
+CASTLING_RIGHTS_KEPT[parse_square('a1')] &= ~WHITE_QUEENSIDE
+CASTLING_RIGHTS_KEPT[parse_square('e8')] &= ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_RIGHTS_KEPT[parse_square('h8')] &= ~BLACK_KINGSIDE
+CASTLING_RIGHTS_KEPT[parse_square('a8')] &= ~BLACK_QUEENSIDE
+
+# king target square -> (castle from, castle to)
+CASTLE_ROOK_MOVES = {
+    parse_square('g1'): (parse_square('h1'), parse_square('f1')),
+    parse_square('c1'): (parse_square('a1'), parse_square('d1')),
+    parse_square('g8'): (parse_square('h8'), parse_square('f8')),
+    parse_square('c8'): (parse_square('a8'), parse_square('d8')),
+}
+
+# (right, king from, king to, squares that must be empty, squares that must not be attacked)
+CASTLING_OPTIONS = [
+    [
+        (WHITE_KINGSIDE, parse_square('e1'), parse_square('g1'),
+         [parse_square('f1'), parse_square('g1')], [parse_square('e1'), parse_square('f1'), parse_square('g1')]),
+        (WHITE_QUEENSIDE, parse_square('e1'), parse_square('c1'),
+         [parse_square('d1'), parse_square('c1'), parse_square('b1')],
+         [parse_square('e1'), parse_square('d1'), parse_square('c1')]),
+    ],
+    [
+        (BLACK_KINGSIDE, parse_square('e8'), parse_square('g8'),
+         [parse_square('f8'), parse_square('g8')], [parse_square('e8'), parse_square('f8'), parse_square('g8')]),
+        (BLACK_QUEENSIDE, parse_square('e8'), parse_square('c8'),
+         [parse_square('d8'), parse_square('c8'), parse_square('b8')],
+         [parse_square('e8'), parse_square('d8'), parse_square('c8')]),
+    ],
+]
+
+ONGOING = 0
+CHECKMATE = 1
+STALEMATE = 2
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+
+class BitBoard:
+    pieces: List[int]
+    occupancy: List[int]
+    squares: List[int]
+    turn: int
+    castling: int
+    en_passant: int
+    halfmove_clock: int
+    fullmove_number: int
+    history: List[int]
+    key: int
+
+    def __init__(self) -> None:
+        self.pieces = [0] * (2 * PIECE_TYPE_COUNT)
+        self.occupancy = [0, 0]
+        self.squares = [EMPTY] * SQUARE_COUNT
+        self.turn = WHITE
+        self.castling = 0
+        self.en_passant = -1
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+        self.history = []
+        self.key = self.compute_key()
+
+    @classmethod
+    def starting_position(cls) -> 'BitBoard':
+        return cls.from_fen(STARTING_FEN)
+
+    @classmethod
+    def from_fen(cls, fen: str) -> 'BitBoard':
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f'FEN needs at least 4 fields: {fen!r}')
+
+        position = cls()
+        rows = fields[0].split('/')
+        if len(rows) != SIZE:
+            raise ValueError(f'FEN placement needs {SIZE} rows: {fen!r}')
+        for row, text in enumerate(rows):
+            column = 0
+            for symbol in text:
+                if symbol.isdigit():
+                    column += int(symbol)
+                    continue
+                if symbol not in PIECE_SYMBOLS or column >= SIZE:
+                    raise ValueError(f'Bad FEN row {text!r}')
+                position.put_piece(row * SIZE + column, PIECE_SYMBOLS.index(symbol))
+                column += 1
+            if column != SIZE:
+                raise ValueError(f'Bad FEN row {text!r}')
+
+        if fields[1] not in ('w', 'b'):
+            raise ValueError(f'Bad side to move {fields[1]!r}')
+        position.turn = WHITE if fields[1] == 'w' else BLACK
+
+        for symbol in fields[2]:
+            if symbol == '-':
+                continue
+            position.castling |= {'K': WHITE_KINGSIDE, 'Q': WHITE_QUEENSIDE,
+                                  'k': BLACK_KINGSIDE, 'q': BLACK_QUEENSIDE}[symbol]
+
+        if fields[3] != '-':
+            # the same rule as make_move, so a position read from FEN has the
+            # key it gets when the double push is played
+            passed = parse_square(fields[3])
+            if PAWN_ATTACKS[position.turn ^ 1][passed] & position.pieces[piece_code(position.turn, PAWN)]:
+                position.en_passant = passed
+        position.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        position.fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+        position.key = position.compute_key()
+        return position
+
+    def to_fen(self) -> str:
+        rows = []
+        for row in range(SIZE):
+            text = ''
+            empty = 0
+            for column in range(SIZE):
+                code = self.squares[row * SIZE + column]
+                if code == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    text += str(empty)
+                    empty = 0
+                text += PIECE_SYMBOLS[code]
+            rows.append(text + (str(empty) if empty else ''))
+
+        castling = ''.join(symbol for symbol, right in (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE),
+                                                        ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+                           if self.castling & right) or '-'
+        en_passant = square_name(self.en_passant) if self.en_passant >= 0 else '-'
+        turn = 'w' if self.turn == WHITE else 'b'
+        return f'{"/".join(rows)} {turn} {castling} {en_passant} {self.halfmove_clock} {self.fullmove_number}'
+
+    def copy(self) -> 'BitBoard':
+        position = BitBoard.__new__(BitBoard)
+        position.pieces = self.pieces[:]
+        position.occupancy = self.occupancy[:]
+        position.squares = self.squares[:]
+        position.turn = self.turn
+        position.castling = self.castling
+        position.en_passant = self.en_passant
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.history = self.history[:]
+        position.key = self.key
+        return position
+
+    def compute_key(self) -> int:
+        return compute_key(self.squares, self.turn, self.castling, self.en_passant)
+
+    def put_piece(self, square: int, code: int) -> None:
+        bit = 1 << square
+        self.pieces[code] |= bit
+        self.occupancy[code // PIECE_TYPE_COUNT] |= bit
+        self.squares[square] = code
+        self.key ^= PIECE_KEYS[code * SQUARE_COUNT + square]
+
+    def remove_piece(self, square: int) -> int:
+        code = self.squares[square]
+        if code != EMPTY:
+            bit = 1 << square
+            self.pieces[code] ^= bit
+            self.occupancy[code // PIECE_TYPE_COUNT] ^= bit
+            self.squares[square] = EMPTY
+            self.key ^= PIECE_KEYS[code * SQUARE_COUNT + square]
+        return code
+
+    @property
+    def occupied(self) -> int:
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def king_square(self, color: int) -> int:
+        return self.pieces[color * PIECE_TYPE_COUNT + KING].bit_length() - 1
+
+    def is_square_attacked(self, square: int, by_color: int, occupied: Optional[int] = None) -> bool:
+        pieces = self.pieces
+        base = by_color * PIECE_TYPE_COUNT
+        if PAWN_ATTACKS[by_color ^ 1][square] & pieces[base + PAWN]:
+            return True
+        if KNIGHT_ATTACKS[square] & pieces[base + KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & pieces[base + KING]:
+            return True
+
+        if occupied is None:
+            occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        diagonal = pieces[base + BISHOP] | pieces[base + QUEEN]
+        if diagonal and bishop_attacks(square, occupied) & diagonal:
+            return True
+        straight = pieces[base + CASTLE] | pieces[base + QUEEN]
+        return bool(straight and rook_attacks(square, occupied) & straight)
+
+    def is_in_check(self, color: Optional[int] = None) -> bool:
+        color = self.turn if color is None else color
+        return self.is_square_attacked(self.king_square(color), color ^ 1)
+
+    def attackers_to(self, square: int, by_color: int, occupied: Optional[int] = None) -> int:
+        pieces = self.pieces
+        base = by_color * PIECE_TYPE_COUNT
+        if occupied is None:
+            occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        return ((PAWN_ATTACKS[by_color ^ 1][square] & pieces[base + PAWN])
+                | (KNIGHT_ATTACKS[square] & pieces[base + KNIGHT])
+                | (KING_ATTACKS[square] & pieces[base + KING])
+                | (bishop_attacks(square, occupied) & (pieces[base + BISHOP] | pieces[base + QUEEN]))
+                | (rook_attacks(square, occupied) & (pieces[base + CASTLE] | pieces[base + QUEEN])))
+
+    def checkers(self) -> int:
+        return self.attackers_to(self.king_square(self.turn), self.turn ^ 1)
+
+    def pinned_pieces(self, color: int) -> int:
+        # pieces of color that are the only thing between their king and an
+        # enemy slider looking at it
+        king = self.king_square(color)
+        pieces = self.pieces
+        base = (color ^ 1) * PIECE_TYPE_COUNT
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        snipers = ((rook_attacks(king, 0) & (pieces[base + CASTLE] | pieces[base + QUEEN]))
+                   | (bishop_attacks(king, 0) & (pieces[base + BISHOP] | pieces[base + QUEEN])))
+
+        pinned = 0
+        for sniper in iterate_squares(snipers):
+            blockers = BETWEEN[king][sniper] & occupied
+            if blockers and not blockers & (blockers - 1):
+                pinned |= blockers & self.occupancy[color]
+        return pinned
+
+    def generate_pseudo_legal_moves(self, captures_only: bool = False, target_mask: int = FULL) -> List[int]:
+        moves = []
+        us = self.turn
+        them = us ^ 1
+        pieces = self.pieces
+        own = self.occupancy[us]
+        enemy = self.occupancy[them]
+        occupied = own | enemy
+        empty = FULL ^ occupied
+        base = us * PIECE_TYPE_COUNT
+        # captures only still includes pushes that promote, quiescence search wants those too
+        king_targets = enemy if captures_only else FULL ^ own
+        # the mask narrows where pieces other than the king may land, which is
+        # how check evasions are generated
+        targets = king_targets & target_mask
+
+        self._generate_pawn_moves(moves, pieces[base + PAWN], enemy, empty, captures_only, target_mask)
+
+        for square in iterate_squares(pieces[base + KNIGHT]):
+            for target in iterate_squares(KNIGHT_ATTACKS[square] & targets):
+                moves.append(square | (target << TO_SHIFT))
+        for square in iterate_squares(pieces[base + BISHOP]):
+            for target in iterate_squares(bishop_attacks(square, occupied) & targets):
+                moves.append(square | (target << TO_SHIFT))
+        for square in iterate_squares(pieces[base + CASTLE]):
+            for target in iterate_squares(rook_attacks(square, occupied) & targets):
+                moves.append(square | (target << TO_SHIFT))
+        for square in iterate_squares(pieces[base + QUEEN]):
+            for target in iterate_squares(queen_attacks(square, occupied) & targets):
+                moves.append(square | (target << TO_SHIFT))
+
+        king = pieces[base + KING]
+        if king:
+            square = king.bit_length() - 1
+            for target in iterate_squares(KING_ATTACKS[square] & king_targets):
+                moves.append(square | (target << TO_SHIFT))
+            if not captures_only and target_mask == FULL:
+                self._generate_castling_moves(moves, occupied)
+
+        return moves
+
+    def _generate_pawn_moves(self, moves: List[int], pawns: int, enemy: int, empty: int, captures_only: bool,
+                             target_mask: int) -> None:
+        us = self.turn
+        promotion_row = PROMOTION_ROWS[us]
+        if us == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & DOUBLE_PUSH_ROWS[us]) >> 8) & empty
+            # (targets, distance back to the pawn)
+            pushes = [(single, 8)]
+            captures = [(((pawns & NOT_A_FILE) >> 9) & enemy, 9), (((pawns & NOT_H_FILE) >> 7) & enemy, 7)]
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & DOUBLE_PUSH_ROWS[us]) << 8) & empty
+            pushes = [(single, -8)]
+            captures = [(((pawns & NOT_A_FILE) << 7) & enemy, -7), (((pawns & NOT_H_FILE) << 9) & enemy, -9)]
+        if captures_only:
+            pushes = [(targets & promotion_row, distance) for targets, distance in pushes]
+            double = 0
+        if target_mask != FULL:
+            pushes = [(targets & target_mask, distance) for targets, distance in pushes]
+            captures = [(targets & target_mask, distance) for targets, distance in captures]
+            double &= target_mask
+
+        for targets, distance in pushes + captures:
+            for target in iterate_squares(targets & ~promotion_row):
+                moves.append((target + distance) | (target << TO_SHIFT))
+            for target in iterate_squares(targets & promotion_row):
+                move = (target + distance) | (target << TO_SHIFT)
+                for promotion in (QUEEN, KNIGHT, CASTLE, BISHOP):
+                    moves.append(move | (promotion << PROMOTION_SHIFT))
+
+        distance = 16 if us == WHITE else -16
+        for target in iterate_squares(double):
+            moves.append((target + distance) | (target << TO_SHIFT) | (DOUBLE_PUSH << FLAG_SHIFT))
+
+        if self.en_passant >= 0:
+            for square in iterate_squares(PAWN_ATTACKS[us ^ 1][self.en_passant] & pawns):
+                moves.append(square | (self.en_passant << TO_SHIFT) | (EN_PASSANT << FLAG_SHIFT))
+
+    def _generate_castling_moves(self, moves: List[int], occupied: int) -> None:
+        if not self.castling:
+            return
+
+        them = self.turn ^ 1
+        for right, king_from, king_to, must_be_empty, must_be_safe in CASTLING_OPTIONS[self.turn]:
+            if not self.castling & right:
+                continue
+            if any(occupied >> square & 1 for square in must_be_empty):
+                continue
+            if any(self.is_square_attacked(square, them) for square in must_be_safe):
+                continue
+            moves.append(king_from | (king_to << TO_SHIFT) | (CASTLING << FLAG_SHIFT))
+
+    def generate_legal_moves(self, captures_only: bool = False) -> List[int]:
+        us = self.turn
+        them = us ^ 1
+        king = self.king_square(us)
+        occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        checkers = self.attackers_to(king, them, occupied)
+
+        if not checkers:
+            target_mask = FULL
+        elif checkers & (checkers - 1):
+            # double check, only the king can move
+            target_mask = 0
+        else:
+            # capture the checker or step in between
+            target_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+
+        pinned = self.pinned_pieces(us)
+        # the king must not shield its own destination from a slider
+        without_king = occupied ^ (1 << king)
+        legal = []
+        for move in self.generate_pseudo_legal_moves(captures_only, target_mask):
+            from_square = move & SQUARE_MASK
+            to_square = (move >> TO_SHIFT) & SQUARE_MASK
+            flag = move >> FLAG_SHIFT
+            if from_square == king:
+                if flag == CASTLING or not self.is_square_attacked(to_square, them, without_king):
+                    legal.append(move)
+            elif flag == EN_PASSANT:
+                # two pawns leave one row at once, rare enough to just try it
+                self.make_move(move)
+                if not self.is_in_check(us):
+                    legal.append(move)
+                self.unmake_move()
+            elif not pinned >> from_square & 1 or LINE[king][from_square] >> to_square & 1:
+                legal.append(move)
+
+        return legal
+
+    def status(self) -> int:
+        # one legal move generation answers both whether the game is over and how
+        if self.generate_legal_moves():
+            return ONGOING
+        return CHECKMATE if self.checkers() else STALEMATE
+
+    def make_move(self, move: int) -> None:
+        from_square = move & SQUARE_MASK
+        to_square = (move >> TO_SHIFT) & SQUARE_MASK
+        promotion = (move >> PROMOTION_SHIFT) & 0x7
+        flag = move >> FLAG_SHIFT
+        us = self.turn
+        record = (move | (self.castling << UNDO_CASTLING_SHIFT) | ((self.en_passant + 1) << UNDO_EN_PASSANT_SHIFT)
+                  | (self.halfmove_clock << UNDO_HALFMOVE_SHIFT))
+
+        code = self.remove_piece(from_square)
+        captured = self.remove_piece(to_square)
+        if flag == EN_PASSANT:
+            captured = self.remove_piece(to_square + (SIZE if us == WHITE else -SIZE))
+        self.put_piece(to_square, piece_code(us, promotion) if promotion else code)
+
+        if flag == CASTLING:
+            castle_from, castle_to = CASTLE_ROOK_MOVES[to_square]
+            self.put_piece(castle_to, self.remove_piece(castle_from))
+
+        key = self.key ^ CASTLING_KEYS[self.castling] ^ BLACK_TO_MOVE_KEY
+        if self.en_passant >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant % SIZE]
+        self.castling &= CASTLING_RIGHTS_KEPT[from_square] & CASTLING_RIGHTS_KEPT[to_square]
+        key ^= CASTLING_KEYS[self.castling]
+        self.en_passant = -1
+        if flag == DOUBLE_PUSH:
+            # only kept when a pawn can take it, so transpositions share a key
+            passed = (from_square + to_square) // 2
+            if PAWN_ATTACKS[us][passed] & self.pieces[piece_code(us ^ 1, PAWN)]:
+                self.en_passant = passed
+                key ^= EN_PASSANT_KEYS[passed % SIZE]
+        self.key = key
+        if captured != EMPTY or code % PIECE_TYPE_COUNT == PAWN:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if us == BLACK:
+            self.fullmove_number += 1
+        self.turn = us ^ 1
+        self.history.append(record | ((captured + 1) << UNDO_CAPTURED_SHIFT))
+
+    def unmake_move(self) -> int:
+        record = self.history.pop()
+        move = record & MOVE_MASK
+        from_square = move & SQUARE_MASK
+        to_square = (move >> TO_SHIFT) & SQUARE_MASK
+        flag = move >> FLAG_SHIFT
+        us = self.turn ^ 1
+        self.turn = us
+        if us == BLACK:
+            self.fullmove_number -= 1
+
+        code = self.remove_piece(to_square)
+        if move & (0x7 << PROMOTION_SHIFT):
+            code = piece_code(us, PAWN)
+        self.put_piece(from_square, code)
+
+        captured = ((record >> UNDO_CAPTURED_SHIFT) & 0xF) - 1
+        if captured != EMPTY:
+            if flag == EN_PASSANT:
+                self.put_piece(to_square + (SIZE if us == WHITE else -SIZE), captured)
+            else:
+                self.put_piece(to_square, captured)
+
+        if flag == CASTLING:
+            castle_from, castle_to = CASTLE_ROOK_MOVES[to_square]
+            self.put_piece(castle_from, self.remove_piece(castle_to))
+
+        key = self.key ^ CASTLING_KEYS[self.castling] ^ BLACK_TO_MOVE_KEY
+        if self.en_passant >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant % SIZE]
+        self.castling = (record >> UNDO_CASTLING_SHIFT) & ALL_CASTLING
+        self.en_passant = ((record >> UNDO_EN_PASSANT_SHIFT) & 0x7F) - 1
+        key ^= CASTLING_KEYS[self.castling]
+        if self.en_passant >= 0:
+            key ^= EN_PASSANT_KEYS[self.en_passant % SIZE]
+        self.key = key
+        self.halfmove_clock = record >> UNDO_HALFMOVE_SHIFT
+        return move
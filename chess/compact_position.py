@@ -0,0 +1,82 @@
+import struct
+from typing import Optional
+
+from chess_bitboard import EMPTY, SQUARE_COUNT, WHITE, BitBoard
+from zobrist import compute_key
+
+# side to move, castling rights, en passant square (-1 for none), halfmove
+# clock, fullmove number
+STATE = struct.Struct('<BBbHH')
+PACKED_SIZE = SQUARE_COUNT + STATE.size
+
+
+class CompactPosition:
+    # one byte per square, the piece code + 1 so that 0 is an empty square
+    __slots__ = ('squares', 'turn', 'castling', 'en_passant', 'halfmove_clock', 'fullmove_number')
+
+    squares: bytearray
+    turn: int
+    castling: int
+    en_passant: int
+    halfmove_clock: int
+    fullmove_number: int
+
+    def __init__(self, squares: Optional[bytearray] = None, turn: int = WHITE, castling: int = 0,
+                 en_passant: int = -1, halfmove_clock: int = 0, fullmove_number: int = 1):
+        if squares is not None and len(squares) != SQUARE_COUNT:
+            raise ValueError(f'A mailbox holds {SQUARE_COUNT} squares, got {len(squares)}')
+
+        self.squares = bytearray(SQUARE_COUNT) if squares is None else squares
+        self.turn = turn
+        self.castling = castling
+        self.en_passant = en_passant
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
+
+    def copy(self) -> 'CompactPosition':
+        return CompactPosition(bytearray(self.squares), self.turn, self.castling, self.en_passant,
+                               self.halfmove_clock, self.fullmove_number)
+
+    def piece_at(self, square: int) -> int:
+        return self.squares[square] - 1
+
+    def set_piece(self, square: int, code: int) -> None:
+        self.squares[square] = code + 1
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.squares) + STATE.pack(self.turn, self.castling, self.en_passant, self.halfmove_clock,
+                                                self.fullmove_number)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CompactPosition':
+        if len(data) != PACKED_SIZE:
+            raise ValueError(f'A packed position is {PACKED_SIZE} bytes, got {len(data)}')
+
+        return cls(bytearray(data[:SQUARE_COUNT]), *STATE.unpack_from(data, SQUARE_COUNT))
+
+    @classmethod
+    def from_bitboard(cls, position: BitBoard) -> 'CompactPosition':
+        return cls(bytearray(code + 1 for code in position.squares), position.turn, position.castling,
+                   position.en_passant, position.halfmove_clock, position.fullmove_number)
+
+    def to_bitboard(self) -> BitBoard:
+        position = BitBoard()
+        for square, value in enumerate(self.squares):
+            if value:
+                position.put_piece(square, value - 1)
+        position.turn = self.turn
+        position.castling = self.castling
+        position.en_passant = self.en_passant
+        position.halfmove_clock = self.halfmove_clock
+        position.fullmove_number = self.fullmove_number
+        position.key = position.compute_key()
+        return position
+
+    def key(self) -> int:
+        return compute_key([value - 1 if value else EMPTY for value in self.squares], self.turn, self.castling,
+                           self.en_passant)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactPosition):
+            return NotImplemented
+        return self.to_bytes() == other.to_bytes()
@@ -0,0 +1,99 @@
+from typing import List
+
+from chess_bitboard import BISHOP, CASTLE, KING, KNIGHT, PAWN, PIECE_TYPE_COUNT, QUEEN, SQUARE_COUNT, WHITE, BitBoard
+
+PIECE_VALUES = {PAWN: 100, KNIGHT: 320, BISHOP: 330, CASTLE: 500, QUEEN: 900, KING: 0}
+
+# Bonuses by square from white's side, written with row 0 (black's back rank)
+# first so they index by square directly. Black reads them mirrored.
+PIECE_SQUARE_TABLES = {
+    PAWN: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        50, 50, 50, 50, 50, 50, 50, 50,
+        10, 10, 20, 30, 30, 20, 10, 10,
+        5, 5, 10, 25, 25, 10, 5, 5,
+        0, 0, 0, 20, 20, 0, 0, 0,
+        5, -5, -10, 0, 0, -10, -5, 5,
+        5, 10, 10, -20, -20, 10, 10, 5,
+        0, 0, 0, 0, 0, 0, 0, 0,
+    ],
+    KNIGHT: [
+        -50, -40, -30, -30, -30, -30, -40, -50,
+        -40, -20, 0, 0, 0, 0, -20, -40,
+        -30, 0, 10, 15, 15, 10, 0, -30,
+        -30, 5, 15, 20, 20, 15, 5, -30,
+        -30, 0, 15, 20, 20, 15, 0, -30,
+        -30, 5, 10, 15, 15, 10, 5, -30,
+        -40, -20, 0, 5, 5, 0, -20, -40,
+        -50, -40, -30, -30, -30, -30, -40, -50,
+    ],
+    BISHOP: [
+        -20, -10, -10, -10, -10, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 10, 10, 5, 0, -10,
+        -10, 5, 5, 10, 10, 5, 5, -10,
+        -10, 0, 10, 10, 10, 10, 0, -10,
+        -10, 10, 10, 10, 10, 10, 10, -10,
+        -10, 5, 0, 0, 0, 0, 5, -10,
+        -20, -10, -10, -10, -10, -10, -10, -20,
+    ],
+    CASTLE: [
+        0, 0, 0, 0, 0, 0, 0, 0,
+        5, 10, 10, 10, 10, 10, 10, 5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        -5, 0, 0, 0, 0, 0, 0, -5,
+        0, 0, 0, 5, 5, 0, 0, 0,
+    ],
+    QUEEN: [
+        -20, -10, -10, -5, -5, -10, -10, -20,
+        -10, 0, 0, 0, 0, 0, 0, -10,
+        -10, 0, 5, 5, 5, 5, 0, -10,
+        -5, 0, 5, 5, 5, 5, 0, -5,
+        0, 0, 5, 5, 5, 5, 0, -5,
+        -10, 5, 5, 5, 5, 5, 0, -10,
+        -10, 0, 5, 0, 0, 0, 0, -10,
+        -20, -10, -10, -5, -5, -10, -10, -20,
+    ],
+    KING: [
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -30, -40, -40, -50, -50, -40, -40, -30,
+        -20, -30, -30, -40, -40, -30, -30, -20,
+        -10, -20, -20, -20, -20, -20, -20, -10,
+        20, 20, 0, 0, 0, 0, 20, 20,
+        20, 30, 10, 0, 0, 10, 30, 20,
+    ],
+}
+
+
+def _build_square_scores() -> List[List[int]]:
+    # value plus square bonus for every piece code, negated for black so a
+    # position's score is one sum from white's side
+    scores = []
+    for code in range(2 * PIECE_TYPE_COUNT):
+        color, piece_type = divmod(code, PIECE_TYPE_COUNT)
+        table = PIECE_SQUARE_TABLES[piece_type]
+        if color == WHITE:
+            scores.append([PIECE_VALUES[piece_type] + table[square] for square in range(SQUARE_COUNT)])
+        else:
+            # flipping the row of a square is xor 56
+            scores.append([-(PIECE_VALUES[piece_type] + table[square ^ 56]) for square in range(SQUARE_COUNT)])
+    return scores
+
+
+SQUARE_SCORES = _build_square_scores()
+
+
+def evaluate(position: BitBoard) -> int:
+    # from the side to move, as negamax wants it
+    score = 0
+    squares = position.squares
+    for square in range(SQUARE_COUNT):
+        code = squares[square]
+        if code >= 0:
+            score += SQUARE_SCORES[code][square]
+    return score if position.turn == WHITE else -score
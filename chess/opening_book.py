@@ -0,0 +1,193 @@
+import argparse
+from collections import defaultdict
+from itertools import islice
+import mmap
+import os
+import random
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chess_bitboard import BitBoard, move_to_uci
+from pgn import parse_san, read_pgn
+
+MAGIC = b'CHESSBK1'
+# magic then the number of records, padded to one record so records stay aligned
+HEADER = struct.Struct('<8sQ')
+# position key, move, weight; records are sorted by key then by weight, highest first
+RECORD = struct.Struct('<QII')
+KEY = struct.Struct('<Q')
+MAX_WEIGHT = 0xFFFFFFFF
+DEFAULT_MAX_PLY = 24
+
+# weight given to a move by the result for the side that played it, so moves
+# from lost games drop out of the book
+RESULT_WEIGHTS = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)}
+
+
+def parse_move(position: BitBoard, text: str) -> int:
+    for move in position.generate_legal_moves():
+        if move_to_uci(move) == text:
+            return move
+    return parse_san(position, text)
+
+
+class BookBuilder:
+    max_ply: int
+    weights: Dict[Tuple[int, int], int]
+    skipped: int
+
+    def __init__(self, max_ply: int = DEFAULT_MAX_PLY):
+        self.max_ply = max_ply
+        self.weights = defaultdict(int)
+        # games left out of the book because their moves could not be parsed
+        self.skipped = 0
+
+    def add(self, position: BitBoard, move: int, weight: int = 1) -> None:
+        self.weights[position.key, move] += weight
+
+    def add_game(self, position: BitBoard, moves: Iterable[int], result: str = '*') -> None:
+        result_weights = RESULT_WEIGHTS.get(result, RESULT_WEIGHTS['*'])
+        for ply, move in enumerate(moves):
+            if ply >= self.max_ply:
+                break
+            self.add(position, move, result_weights[position.turn])
+            position.make_move(move)
+
+    def add_pgn(self, path: str) -> int:
+        games = 0
+        for game in read_pgn(path):
+            # the game is only parsed as far as the book goes, and parsed in full
+            # before anything is added so a bad move leaves no partial line behind
+            try:
+                position = BitBoard.from_fen(game.start_fen)
+                moves = list(islice(game.moves(), self.max_ply))
+            except ValueError:
+                self.skipped += 1
+                continue
+            if moves:
+                self.add_game(position, moves, game.headers.get('Result', '*'))
+                games += 1
+        return games
+
+    def add_fen_file(self, path: str) -> int:
+        # one entry per line: FEN;move[;weight], the move as UCI or SAN
+        entries = 0
+        with open(path, encoding='utf-8') as file:
+            for number, line in enumerate(file, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                fields = [field.strip() for field in line.split(';')]
+                if len(fields) not in (2, 3):
+                    raise ValueError(f'{path}:{number}: expected FEN;move[;weight], got {line!r}')
+                position = BitBoard.from_fen(fields[0])
+                self.add(position, parse_move(position, fields[1]), int(fields[2]) if len(fields) == 3 else 1)
+                entries += 1
+        return entries
+
+    def records(self) -> List[Tuple[int, int, int]]:
+        return sorted(((key, move, min(weight, MAX_WEIGHT)) for (key, move), weight in self.weights.items()
+                       if weight > 0), key=lambda record: (record[0], -record[2], record[1]))
+
+    def write(self, path: str) -> int:
+        records = self.records()
+        # written next to the book and renamed over it, so a reader never maps a half-written file
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, len(records)))
+            for record in records:
+                file.write(RECORD.pack(*record))
+        os.replace(temporary_path, path)
+        return len(records)
+
+
+class OpeningBook:
+    count: int
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0) if len(self.data) >= HEADER.size else (b'', 0)
+        if magic != MAGIC or HEADER.size + self.count * RECORD.size != len(self.data):
+            self.data.close()
+            raise ValueError(f'{path} is not an opening book')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key_at(self, index: int) -> int:
+        return KEY.unpack_from(self.data, HEADER.size + index * RECORD.size)[0]
+
+    def lookup(self, key: int) -> List[Tuple[int, int]]:
+        # lower bound binary search, then read the run of records for the key
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        while low < self.count:
+            record_key, move, weight = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+            if record_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def moves(self, position: BitBoard) -> List[Tuple[int, int]]:
+        entries = self.lookup(position.key)
+        if not entries:
+            return []
+        # a key collision could suggest a move from some other position
+        legal_moves = set(position.generate_legal_moves())
+        return [(move, weight) for move, weight in entries if move in legal_moves]
+
+    def choose_move(self, position: BitBoard, rng: Optional[random.Random] = None) -> Optional[int]:
+        entries = self.moves(position)
+        if not entries:
+            return None
+        moves, weights = zip(*entries)
+        return (rng or random).choices(moves, weights)[0]
+
+    def close(self) -> None:
+        self.data.close()
+
+    def __enter__(self) -> 'OpeningBook':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build and probe opening books')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='compile PGN and FEN sources into a book')
+    build_parser.add_argument('book')
+    build_parser.add_argument('--pgn', nargs='*', default=[])
+    build_parser.add_argument('--fen', nargs='*', default=[], help='files of FEN;move[;weight] lines')
+    build_parser.add_argument('--max-ply', type=int, default=DEFAULT_MAX_PLY)
+
+    probe_parser = subparsers.add_parser('probe', help='list the book moves for a position')
+    probe_parser.add_argument('book')
+    probe_parser.add_argument('fen')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        builder = BookBuilder(args.max_ply)
+        games = sum(builder.add_pgn(path) for path in args.pgn)
+        entries = sum(builder.add_fen_file(path) for path in args.fen)
+        records = builder.write(args.book)
+        print(f'{games} games and {entries} FEN entries, {records} book records written')
+        if builder.skipped:
+            print(f'{builder.skipped} games skipped for moves that could not be parsed')
+    elif args.command == 'probe':
+        with OpeningBook(args.book) as book:
+            entries = book.moves(BitBoard.from_fen(args.fen))
+        total = sum(weight for _, weight in entries)
+        for move, weight in entries:
+            print(f'{move_to_uci(move)} {weight} {100 * weight / total:.1f}%')
@@ -0,0 +1,189 @@
+import argparse
+from dataclasses import dataclass
+import multiprocessing
+from multiprocessing import shared_memory
+from multiprocessing.synchronize import Event
+import os
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from chess_bitboard import BitBoard, move_to_uci
+from perft import SUITE
+from search import AlphaBetaPlayer, SearchInfo
+from transposition import TranspositionTable, table_bytes
+
+
+@dataclass(frozen=True)
+class SearchTask:
+    fen: str
+    previous_keys: Tuple[int, ...]
+    max_depth: int
+    time_budget_ms: Optional[float]
+
+
+@dataclass(frozen=True)
+class WorkerResult:
+    worker: int
+    move: Optional[int]
+    # the deepest iteration the worker finished, None if it finished none
+    info: Optional[SearchInfo]
+    nodes: int
+    table_hits: int
+    table_misses: int
+
+
+@dataclass(frozen=True)
+class ParallelResult:
+    move: Optional[int]
+    info: Optional[SearchInfo]
+    workers: List[WorkerResult]
+    elapsed: float
+
+    @property
+    def nodes(self) -> int:
+        return sum(result.nodes for result in self.workers)
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+def worker_start_depth(worker: int) -> int:
+    # Lazy SMP: every worker searches the whole tree and they only cooperate
+    # through the shared table. Starting every other worker a ply deeper keeps
+    # them from all repeating the same iteration in step.
+    return 1 + worker % 2
+
+
+def run_worker(worker: int, table_name: str, hash_mb: float, tasks: multiprocessing.Queue,
+               results: multiprocessing.Queue, stop_event: Event) -> None:
+    memory = shared_memory.SharedMemory(name=table_name)
+    try:
+        table = TranspositionTable(hash_mb, buffer=memory.buf)
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+
+            player = AlphaBetaPlayer(time_budget_ms=task.time_budget_ms, max_depth=task.max_depth, table=table,
+                                     start_depth=worker_start_depth(worker), stop_event=stop_event)
+            table.hits = table.misses = 0
+            move = player.get_move(BitBoard.from_fen(task.fen), task.previous_keys)
+            info = player.info[-1] if player.info else None
+            results.put(WorkerResult(worker, move, info, player.nodes, table.hits, table.misses))
+    finally:
+        # the table and player hold views of the shared buffer, which have to
+        # go before it is closed, or closing raises BufferError over the real error
+        table = player = None
+        memory.close()
+
+
+class ParallelSearch:
+    worker_count: int
+    hash_mb: float
+
+    def __init__(self, workers: int = os.cpu_count() or 1, hash_mb: float = 64):
+        if workers < 1:
+            raise ValueError(f'Parallel search needs at least one worker, got {workers}')
+
+        self.worker_count = workers
+        self.hash_mb = hash_mb
+        # the table lives in shared memory, workers map it rather than being sent copies
+        self.memory = shared_memory.SharedMemory(create=True, size=table_bytes(hash_mb))
+        self.stop_event = multiprocessing.Event()
+        self.results = multiprocessing.Queue()
+        self.task_queues = [multiprocessing.Queue() for _ in range(workers)]
+        self.processes = [
+            multiprocessing.Process(target=run_worker, daemon=True,
+                                    args=(worker, self.memory.name, hash_mb, tasks, self.results, self.stop_event))
+            for worker, tasks in enumerate(self.task_queues)
+        ]
+        for process in self.processes:
+            process.start()
+
+    def search(self, position: BitBoard, max_depth: int = 64, time_budget_ms: Optional[float] = 1000,
+               previous_keys: Sequence[int] = ()) -> ParallelResult:
+        start = time.perf_counter()
+        self.stop_event.clear()
+        task = SearchTask(position.to_fen(), tuple(previous_keys), max_depth, time_budget_ms)
+        for tasks in self.task_queues:
+            tasks.put(task)
+
+        # the first worker back has finished max_depth or run out of time, the
+        # rest are only helping from then on
+        results = [self.results.get()]
+        self.stop_event.set()
+        results.extend(self.results.get() for _ in range(self.worker_count - 1))
+        elapsed = time.perf_counter() - start
+
+        best = max(results, key=lambda result: result.info.depth if result.info else 0)
+        return ParallelResult(best.move, best.info, results, elapsed)
+
+    def clear_table(self) -> None:
+        self.memory.buf[:] = bytes(self.memory.size)
+
+    def close(self) -> None:
+        for tasks in self.task_queues:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self) -> 'ParallelSearch':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def benchmark_time_to_depth(workers: int, fens: List[str], depth: int, hash_mb: float) -> Tuple[float, int]:
+    elapsed = 0.0
+    nodes = 0
+    with ParallelSearch(workers, hash_mb) as search:
+        for fen in fens:
+            # every position starts from an empty table so runs are comparable
+            search.clear_table()
+            result = search.search(BitBoard.from_fen(fen), max_depth=depth, time_budget_ms=None)
+            elapsed += result.elapsed
+            nodes += result.nodes
+    return elapsed, nodes
+
+
+def run_benchmark(worker_counts: List[int], depth: int, hash_mb: float) -> None:
+    fens = [entry.fen for entry in SUITE]
+    print(f'time to depth {depth} over {len(fens)} positions, {hash_mb} MB shared table')
+
+    baseline = None
+    for workers in worker_counts:
+        elapsed, nodes = benchmark_time_to_depth(workers, fens, depth, hash_mb)
+        baseline = baseline or elapsed
+        print(f'{workers:>3} workers: {elapsed:8.2f}s  {baseline / elapsed:5.2f}x  '
+              f'{nodes:>12,} nodes  {nodes / elapsed:>10,.0f} nodes/s')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Lazy SMP chess search over worker processes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search_parser = subparsers.add_parser('search', help='search one position')
+    search_parser.add_argument('fen')
+    search_parser.add_argument('--workers', type=int, default=os.cpu_count())
+    search_parser.add_argument('--depth', type=int, default=64)
+    search_parser.add_argument('--time-budget-ms', type=float, default=5000)
+    search_parser.add_argument('--hash-mb', type=float, default=64)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='time-to-depth speedup against worker count')
+    benchmark_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    benchmark_parser.add_argument('--depth', type=int, default=4)
+    benchmark_parser.add_argument('--hash-mb', type=float, default=64)
+
+    args = parser.parse_args()
+    if args.command == 'search':
+        with ParallelSearch(args.workers, args.hash_mb) as parallel_search:
+            result = parallel_search.search(BitBoard.from_fen(args.fen), args.depth, args.time_budget_ms)
+        print(result.info)
+        print(f'bestmove {move_to_uci(result.move) if result.move is not None else "(none)"} '
+              f'nodes {result.nodes} nps {result.nps:.0f}')
+    elif args.command == 'benchmark':
+        run_benchmark(args.workers, args.depth, args.hash_mb)
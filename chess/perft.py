@@ -0,0 +1,122 @@
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+from chess_bitboard import STARTING_FEN, BitBoard, move_to_uci
+
+
+@dataclass(frozen=True)
+class PerftPosition:
+    name: str
+    fen: str
+    # leaf counts for depth 1, 2, 3, ...
+    counts: Tuple[int, ...]
+
+
+# reference counts from the Chess Programming Wiki perft results page
+SUITE = [
+    PerftPosition('start', STARTING_FEN, (20, 400, 8902, 197281, 4865609)),
+    PerftPosition('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                  (48, 2039, 97862, 4085603)),
+    PerftPosition('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+                  (14, 191, 2812, 43238, 674624)),
+    PerftPosition('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                  (6, 264, 9467, 422333)),
+    PerftPosition('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+                  (44, 1486, 62379, 2103487)),
+    PerftPosition('position 6', 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                  (46, 2079, 89890, 3894594)),
+]
+
+
+def perft(position: BitBoard, depth: int) -> int:
+    if depth == 0:
+        return 1
+
+    moves = position.generate_legal_moves()
+    # the last ply only needs counting, not playing
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        position.make_move(move)
+        nodes += perft(position, depth - 1)
+        position.unmake_move()
+    return nodes
+
+
+def divide(position: BitBoard, depth: int) -> Dict[str, int]:
+    if depth < 1:
+        raise ValueError(f'Divide needs a depth of at least 1, got {depth}')
+
+    counts = {}
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        counts[move_to_uci(move)] = perft(position, depth - 1)
+        position.unmake_move()
+    return counts
+
+
+def timed_perft(position: BitBoard, depth: int) -> Tuple[int, float]:
+    start = time.perf_counter()
+    nodes = perft(position, depth)
+    return nodes, time.perf_counter() - start
+
+
+def run_perft(fen: str, depth: int, show_divide: bool) -> None:
+    position = BitBoard.from_fen(fen)
+    start = time.perf_counter()
+    if show_divide:
+        counts = divide(position, depth)
+        for move, nodes in sorted(counts.items()):
+            print(f'{move}: {nodes}')
+        nodes = sum(counts.values())
+    else:
+        nodes = perft(position, depth)
+    elapsed = time.perf_counter() - start
+
+    print(f'depth {depth}: {nodes:,} nodes in {elapsed:.2f}s ({nodes / elapsed:,.0f} nodes/s)')
+
+
+def run_suite(max_depth: int) -> bool:
+    passed = True
+    total_nodes = 0
+    total_time = 0.0
+    for entry in SUITE:
+        position = BitBoard.from_fen(entry.fen)
+        for depth, expected in enumerate(entry.counts[:max_depth], start=1):
+            nodes, elapsed = timed_perft(position, depth)
+            total_nodes += nodes
+            total_time += elapsed
+            status = 'ok' if nodes == expected else f'FAILED, expected {expected:,}'
+            passed = passed and nodes == expected
+            print(f'{entry.name:<12} depth {depth}: {nodes:>12,} {status}')
+
+    print(f'{total_nodes:,} nodes in {total_time:.2f}s ({total_nodes / total_time:,.0f} nodes/s)')
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Count leaf nodes of the chess move tree')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='perft from one position')
+    run_parser.add_argument('depth', type=int)
+    run_parser.add_argument('--fen', default=STARTING_FEN)
+    run_parser.add_argument('--divide', action='store_true', help='print the count below each root move')
+
+    suite_parser = subparsers.add_parser('suite', help='check the reference positions')
+    suite_parser.add_argument('--max-depth', type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == 'run' and args.depth < 1:
+        parser.error(f'depth must be at least 1, got {args.depth}')
+    if args.command == 'suite' and args.max_depth < 1:
+        parser.error(f'--max-depth must be at least 1, got {args.max_depth}')
+    if args.command == 'run':
+        run_perft(args.fen, args.depth, args.divide)
+    elif args.command == 'suite':
+        sys.exit(0 if run_suite(args.max_depth) else 1)
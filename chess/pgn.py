@@ -0,0 +1,351 @@
+import argparse
+from array import array
+from dataclasses import dataclass
+import re
+import sys
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from chess_bitboard import (CASTLING, EMPTY, EN_PASSANT, PAWN, PIECE_SYMBOLS, PIECE_TYPE_COUNT, SIZE, STARTING_FEN,
+                            WHITE, BitBoard, move_flag, move_from, move_promotion, move_to, parse_square, square_name)
+
+SEVEN_TAG_ROSTER = ['Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result']
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+LINE_WIDTH = 80
+
+HEADER_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+HEADER_ESCAPE = re.compile(r'\\(.)')
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQ]))?$')
+# comments, variations and NAGs are dropped, then every remaining word is a
+# move number, a move or the result
+MOVETEXT_NOISE = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+')
+MOVE_NUMBER = re.compile(r'^\d+\.+')
+CASTLING_SAN = {'O-O': SIZE - 2, '0-0': SIZE - 2, 'O-O-O': 2, '0-0-0': 2}
+
+
+def move_to_san(position: BitBoard, move: int, legal_moves: Optional[List[int]] = None) -> str:
+    from_square = move_from(move)
+    to_square = move_to(move)
+    code = position.squares[from_square]
+    piece_type = code % PIECE_TYPE_COUNT
+
+    if move_flag(move) == CASTLING:
+        san = 'O-O' if to_square % SIZE == SIZE - 2 else 'O-O-O'
+    elif piece_type == PAWN:
+        san = square_name(to_square)
+        if position.squares[to_square] != EMPTY or move_flag(move) == EN_PASSANT:
+            san = square_name(from_square)[0] + 'x' + san
+        if move_promotion(move):
+            san += '=' + PIECE_SYMBOLS[move_promotion(move)]
+    else:
+        if legal_moves is None:
+            legal_moves = position.generate_legal_moves()
+        # other pieces of the same kind that could also reach the square
+        rivals = [move_from(other) for other in legal_moves
+                  if move_to(other) == to_square and other != move and position.squares[move_from(other)] == code]
+        name = square_name(from_square)
+        if not rivals:
+            disambiguation = ''
+        elif all(rival % SIZE != from_square % SIZE for rival in rivals):
+            disambiguation = name[0]
+        elif all(rival // SIZE != from_square // SIZE for rival in rivals):
+            disambiguation = name[1]
+        else:
+            disambiguation = name
+        capture = 'x' if position.squares[to_square] != EMPTY else ''
+        san = PIECE_SYMBOLS[piece_type] + disambiguation + capture + square_name(to_square)
+
+    position.make_move(move)
+    if position.is_in_check():
+        san += '+' if position.generate_legal_moves() else '#'
+    position.unmake_move()
+    return san
+
+
+def parse_san(position: BitBoard, san: str) -> int:
+    text = san.rstrip('+#!?')
+    legal_moves = position.generate_legal_moves()
+
+    if text in CASTLING_SAN:
+        for move in legal_moves:
+            if move_flag(move) == CASTLING and move_to(move) % SIZE == CASTLING_SAN[text]:
+                return move
+        raise ValueError(f'Castling {san} is not legal in {position.to_fen()}')
+
+    match = SAN_PATTERN.match(text)
+    if not match:
+        raise ValueError(f'Not a SAN move: {san!r}')
+
+    piece, from_file, from_rank, _, target, promotion = match.groups()
+    piece_type = PIECE_SYMBOLS.index(piece or 'P')
+    to_square = parse_square(target)
+    promotion_type = PIECE_SYMBOLS.index(promotion) if promotion else 0
+    candidates = []
+    for move in legal_moves:
+        from_square = move_from(move)
+        if move_to(move) != to_square or position.squares[from_square] % PIECE_TYPE_COUNT != piece_type:
+            continue
+        if move_flag(move) == CASTLING or move_promotion(move) != promotion_type:
+            continue
+        if from_file and square_name(from_square)[0] != from_file:
+            continue
+        if from_rank and square_name(from_square)[1] != from_rank:
+            continue
+        candidates.append(move)
+
+    if len(candidates) != 1:
+        problem = 'not legal' if not candidates else 'ambiguous'
+        raise ValueError(f'{san} is {problem} in {position.to_fen()}')
+    return candidates[0]
+
+
+def tokenize_movetext(movetext: str) -> Iterator[str]:
+    depth = 0
+    for word in MOVETEXT_NOISE.sub(' ', movetext).replace('(', ' ( ').replace(')', ' ) ').split():
+        # variations can nest, only the main line is replayed
+        if word == '(':
+            depth += 1
+        elif word == ')':
+            depth -= 1
+        elif not depth:
+            word = MOVE_NUMBER.sub('', word)
+            if word and word not in RESULTS:
+                yield word
+
+
+@dataclass
+class PgnGame:
+    headers: Dict[str, str]
+    movetext: str
+    # where the game starts in its file, for building an index
+    offset: int = 0
+
+    @property
+    def start_fen(self) -> str:
+        return self.headers.get('FEN', STARTING_FEN)
+
+    def san_moves(self) -> Iterator[str]:
+        return tokenize_movetext(self.movetext)
+
+    def replay(self) -> Iterator[Tuple[BitBoard, int]]:
+        # yields the position before each move with the move about to be
+        # played, moves are parsed one at a time as the caller asks for them
+        position = BitBoard.from_fen(self.start_fen)
+        for san in self.san_moves():
+            move = parse_san(position, san)
+            yield position, move
+            position.make_move(move)
+
+    def moves(self) -> Iterator[int]:
+        for _, move in self.replay():
+            yield move
+
+    def final_position(self) -> BitBoard:
+        position = BitBoard.from_fen(self.start_fen)
+        for san in self.san_moves():
+            position.make_move(parse_san(position, san))
+        return position
+
+
+def _read_game_lines(lines: Iterable[bytes]) -> Iterator[Tuple[int, List[str]]]:
+    # splits a stream of lines into games, yielding each game's byte offset
+    # with its lines; a header line after movetext starts the next game
+    offset = 0
+    start = 0
+    game_lines = []
+    in_movetext = False
+    for line in lines:
+        text = line.decode('utf-8', errors='replace').strip()
+        if text.startswith('[') and in_movetext:
+            yield start, game_lines
+            game_lines = []
+            in_movetext = False
+        if text:
+            if not game_lines:
+                start = offset
+            game_lines.append(text)
+            in_movetext = in_movetext or not text.startswith('[')
+        offset += len(line)
+
+    if game_lines:
+        yield start, game_lines
+
+
+def _parse_game(offset: int, lines: List[str]) -> PgnGame:
+    headers = {}
+    movetext = []
+    for line in lines:
+        match = HEADER_PATTERN.fullmatch(line) if line.startswith('[') and not movetext else None
+        if match:
+            headers[match.group(1)] = HEADER_ESCAPE.sub(r'\1', match.group(2))
+        else:
+            movetext.append(line)
+    return PgnGame(headers, '\n'.join(movetext), offset)
+
+
+def read_games(file: BinaryIO) -> Iterator[PgnGame]:
+    # one game's lines are held at a time, so file size does not matter
+    for offset, lines in _read_game_lines(file):
+        yield _parse_game(offset, lines)
+
+
+def read_pgn(path: str) -> Iterator[PgnGame]:
+    with open(path, 'rb') as file:
+        yield from read_games(file)
+
+
+def build_index(path: str) -> array:
+    offsets = array('Q')
+    with open(path, 'rb') as file:
+        for offset, _ in _read_game_lines(file):
+            offsets.append(offset)
+    return offsets
+
+
+def write_index(offsets: array, index_path: str) -> None:
+    if sys.byteorder != 'little':
+        offsets = array('Q', offsets)
+        offsets.byteswap()
+    with open(index_path, 'wb') as file:
+        file.write(offsets.tobytes())
+
+
+def read_index(index_path: str) -> array:
+    offsets = array('Q')
+    with open(index_path, 'rb') as file:
+        offsets.frombytes(file.read())
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    return offsets
+
+
+class IndexedPgn:
+    offsets: array
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.file = open(path, 'rb')
+        self.offsets = read_index(index_path) if index_path else build_index(path)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, number: int) -> PgnGame:
+        if number < 0:
+            number += len(self.offsets)
+        if not 0 <= number < len(self.offsets):
+            raise IndexError(f'Game {number} is out of range for {len(self.offsets)} games')
+
+        offset = self.offsets[number]
+        self.file.seek(offset)
+        _, lines = next(_read_game_lines(self._lines_until(number + 1)))
+        return _parse_game(offset, lines)
+
+    def _lines_until(self, next_number: int) -> Iterator[bytes]:
+        # stops at the next game's offset rather than reading on to the end of the file
+        remaining = self.offsets[next_number] - self.offsets[next_number - 1] if next_number < len(self) else None
+        for line in iter(self.file.readline, b''):
+            if remaining is not None:
+                if remaining <= 0:
+                    break
+                remaining -= len(line)
+            yield line
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> 'IndexedPgn':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def export_game(moves: Iterable[int], headers: Optional[Dict[str, str]] = None,
+                start_fen: str = STARTING_FEN) -> str:
+    headers = dict(headers or {})
+    if start_fen != STARTING_FEN:
+        headers.setdefault('SetUp', '1')
+        headers.setdefault('FEN', start_fen)
+    result = headers.get('Result', '*')
+
+    lines = []
+    for name in SEVEN_TAG_ROSTER:
+        lines.append(f'[{name} "{_escape(headers.get(name, "*" if name == "Result" else "?"))}"]')
+    for name, value in headers.items():
+        if name not in SEVEN_TAG_ROSTER:
+            lines.append(f'[{name} "{_escape(value)}"]')
+    lines.append('')
+
+    position = BitBoard.from_fen(start_fen)
+    words = []
+    for move in moves:
+        if position.turn == WHITE:
+            words.append(f'{position.fullmove_number}.')
+        elif not words:
+            words.append(f'{position.fullmove_number}...')
+        words.append(move_to_san(position, move))
+        position.make_move(move)
+    words.append(result)
+
+    line = ''
+    for word in words:
+        if line and len(line) + 1 + len(word) > LINE_WIDTH:
+            lines.append(line)
+            line = word
+        else:
+            line = f'{line} {word}' if line else word
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+class PgnWriter:
+    games: int
+
+    def __init__(self, path: str):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.games = 0
+
+    def write_game(self, moves: Iterable[int], headers: Optional[Dict[str, str]] = None,
+                   start_fen: str = STARTING_FEN) -> None:
+        # games are separated by one blank line
+        if self.games:
+            self.file.write('\n')
+        self.file.write(export_game(moves, headers, start_fen))
+        self.games += 1
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> 'PgnWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Index and read PGN game databases')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='write the byte offset of every game')
+    index_parser.add_argument('pgn')
+    index_parser.add_argument('index')
+
+    show_parser = subparsers.add_parser('show', help='print one game and its final position')
+    show_parser.add_argument('pgn')
+    show_parser.add_argument('number', type=int)
+    show_parser.add_argument('--index', help='index file from the index command')
+
+    args = parser.parse_args()
+    if args.command == 'index':
+        offsets = build_index(args.pgn)
+        write_index(offsets, args.index)
+        print(f'{len(offsets)} games indexed')
+    elif args.command == 'show':
+        with IndexedPgn(args.pgn, args.index) as games:
+            game = games[args.number]
+        print(export_game(game.moves(), game.headers, game.start_fen))
+        print(game.final_position().to_fen())
@@ -0,0 +1,294 @@
+from dataclasses import dataclass
+from multiprocessing.synchronize import Event
+import time
+from typing import Callable, List, Optional, Sequence
+
+from chess_bitboard import (EMPTY, EN_PASSANT, FLAG_SHIFT, PAWN, PIECE_TYPE_COUNT, PROMOTION_SHIFT, SQUARE_COUNT,
+                            SQUARE_MASK, TO_SHIFT, BitBoard, move_to_uci)
+from evaluation import evaluate
+from transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+INFINITY = 32000
+MATE_SCORE = 30000
+# scores past this are mates, counted in plies from the root
+MATE_THRESHOLD = MATE_SCORE - 1000
+MAX_PLY = 128
+NODES_PER_CLOCK_CHECK = 1024
+FIFTY_MOVE_PLIES = 100
+
+# move ordering buckets, highest searched first
+TABLE_MOVE_ORDER = 1 << 30
+CAPTURE_ORDER = 1 << 28
+KILLER_ORDER = 1 << 27
+HISTORY_LIMIT = 1 << 26
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+@dataclass
+class SearchInfo:
+    depth: int
+    score: int
+    nodes: int
+    elapsed: float
+    pv: List[int]
+    hashfull: int = 0
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mate_in(self) -> Optional[int]:
+        if abs(self.score) < MATE_THRESHOLD:
+            return None
+        moves = (MATE_SCORE - abs(self.score) + 1) // 2
+        return moves if self.score > 0 else -moves
+
+    def __str__(self) -> str:
+        score = f'mate {self.mate_in}' if self.mate_in is not None else f'cp {self.score}'
+        return (f'depth {self.depth} score {score} nodes {self.nodes} nps {self.nps:.0f} '
+                f'time {self.elapsed * 1000:.0f} hashfull {self.hashfull} pv {" ".join(map(move_to_uci, self.pv))}')
+
+
+def score_to_table(score: int, ply: int) -> int:
+    # mates are stored as distance from the node, not from the root
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class AlphaBetaPlayer:
+    time_budget_ms: Optional[float]
+    max_depth: int
+    table: TranspositionTable
+    evaluate: Callable[[BitBoard], int]
+    on_info: Optional[Callable[[SearchInfo], None]]
+    start_depth: int
+    stop_event: Optional[Event]
+    probe: Optional[Callable[[BitBoard, int], Optional[int]]]
+    nodes: int
+    info: List[SearchInfo]
+
+    def __init__(self, time_budget_ms: Optional[float] = 1000, max_depth: int = 64, hash_mb: float = 16,
+                 table: Optional[TranspositionTable] = None, evaluate: Callable[[BitBoard], int] = evaluate,
+                 on_info: Optional[Callable[[SearchInfo], None]] = None, start_depth: int = 1,
+                 stop_event: Optional[Event] = None, probe: Optional[Callable[[BitBoard, int], Optional[int]]] = None):
+        self.time_budget_ms = time_budget_ms
+        self.max_depth = min(max_depth, MAX_PLY - 1)
+        self.table = table or TranspositionTable(hash_mb)
+        self.evaluate = evaluate
+        self.on_info = on_info
+        self.start_depth = max(1, min(start_depth, self.max_depth))
+        # lets another process end the search, checked alongside the clock
+        self.stop_event = stop_event
+        # exact scores for positions it covers, such as Tablebase.score
+        self.probe = probe
+        self.nodes = 0
+        self.info = []
+        self.deadline = 0.0
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * PIECE_TYPE_COUNT * SQUARE_COUNT)
+        self.pv = [[] for _ in range(MAX_PLY + 1)]
+        self.path_keys = []
+
+    def get_move(self, position: BitBoard, previous_keys: Sequence[int] = ()) -> Optional[int]:
+        root_moves = position.generate_legal_moves()
+        if not root_moves:
+            return None
+
+        start = time.perf_counter()
+        # with no budget only max_depth ends the search, as fixed-depth analysis and time-to-depth runs need
+        self.deadline = float('inf') if self.time_budget_ms is None else start + self.time_budget_ms / 1000
+        self.nodes = 0
+        self.info = []
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [value // 8 for value in self.history]
+        self.table.new_search()
+        # keys of earlier positions in the game, so repetitions count as draws
+        self.path_keys = list(previous_keys)
+        root_length = len(position.history)
+
+        best_move = root_moves[0]
+        for depth in range(self.start_depth, self.max_depth + 1):
+            try:
+                score = self.alpha_beta(position, depth, -INFINITY, INFINITY, 0)
+            except SearchTimeout:
+                # unwind whatever line the clock stopped us in
+                while len(position.history) > root_length:
+                    position.unmake_move()
+                break
+
+            if self.pv[0]:
+                best_move = self.pv[0][0]
+            info = SearchInfo(depth, score, self.nodes, time.perf_counter() - start, self.pv[0][:],
+                              self.table.hashfull())
+            self.info.append(info)
+            if self.on_info:
+                self.on_info(info)
+
+            if abs(score) >= MATE_THRESHOLD or len(root_moves) == 1:
+                break
+            # the next iteration takes several times longer than this one, so
+            # it is not worth starting once half the budget is gone
+            if self.time_budget_ms is not None and info.elapsed * 2000 > self.time_budget_ms:
+                break
+
+        return best_move
+
+    def check_clock(self) -> None:
+        self.nodes += 1
+        if self.nodes % NODES_PER_CLOCK_CHECK == 0:
+            if time.perf_counter() > self.deadline or (self.stop_event is not None and self.stop_event.is_set()):
+                raise SearchTimeout()
+
+    def is_repetition(self, position: BitBoard) -> bool:
+        # only positions since the last capture or pawn move can repeat, and
+        # only those with the same side to move
+        keys = self.path_keys
+        key = position.key
+        earliest = max(len(keys) - position.halfmove_clock - 1, 0)
+        for index in range(len(keys) - 3, earliest - 1, -2):
+            if keys[index] == key:
+                return True
+        return False
+
+    def alpha_beta(self, position: BitBoard, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.check_clock()
+        self.pv[ply] = []
+        self.path_keys.append(position.key)
+        try:
+            return self._alpha_beta(position, depth, alpha, beta, ply)
+        finally:
+            self.path_keys.pop()
+
+    def _alpha_beta(self, position: BitBoard, depth: int, alpha: int, beta: int, ply: int) -> int:
+        if ply and (position.halfmove_clock >= FIFTY_MOVE_PLIES or self.is_repetition(position)):
+            return 0
+        if ply and self.probe is not None:
+            score = self.probe(position, ply)
+            if score is not None:
+                return score
+
+        in_check = bool(position.checkers())
+        if in_check and ply < MAX_PLY - 1:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            return self.quiescence(position, alpha, beta, ply)
+
+        key = position.key
+        entry = self.table.probe(key)
+        table_move = 0
+        if entry is not None:
+            table_move = entry.move
+            if ply and entry.depth >= depth:
+                score = score_from_table(entry.score, ply)
+                if (entry.bound == EXACT or (entry.bound == LOWER_BOUND and score >= beta)
+                        or (entry.bound == UPPER_BOUND and score <= alpha)):
+                    return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        legal_moves = position.generate_legal_moves()
+        if not legal_moves:
+            return -MATE_SCORE + ply if in_check else 0
+
+        for move in self.order_moves(position, legal_moves, table_move, ply):
+            position.make_move(move)
+            score = -self.alpha_beta(position, depth - 1, -beta, -alpha, ply + 1)
+            position.unmake_move()
+
+            if score <= best_score:
+                continue
+            best_score = score
+            best_move = move
+            if score <= alpha:
+                continue
+            alpha = score
+            self.pv[ply] = [move] + self.pv[ply + 1]
+            if alpha >= beta:
+                if self.is_quiet(position, move):
+                    self.remember_cutoff(position, move, depth, ply)
+                break
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER_BOUND
+        self.table.store(key, best_move, score_to_table(best_score, ply), depth, bound)
+        return best_score
+
+    def quiescence(self, position: BitBoard, alpha: int, beta: int, ply: int) -> int:
+        # only captures and promotions are searched, so the score is not taken
+        # in the middle of an exchange
+        stand_pat = self.evaluate(position)
+        if stand_pat >= beta or ply >= MAX_PLY - 1:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        for move in self.order_moves(position, position.generate_legal_moves(captures_only=True), 0, ply):
+            position.make_move(move)
+            self.check_clock()
+            score = -self.quiescence(position, -beta, -alpha, ply + 1)
+            position.unmake_move()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+
+        return alpha
+
+    def is_quiet(self, position: BitBoard, move: int) -> bool:
+        return (position.squares[(move >> TO_SHIFT) & SQUARE_MASK] == EMPTY and not move >> PROMOTION_SHIFT & 0x7
+                and move >> FLAG_SHIFT != EN_PASSANT)
+
+    def remember_cutoff(self, position: BitBoard, move: int, depth: int, ply: int) -> None:
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+
+        index = position.squares[move & SQUARE_MASK] * SQUARE_COUNT + ((move >> TO_SHIFT) & SQUARE_MASK)
+        self.history[index] += depth * depth
+        if self.history[index] > HISTORY_LIMIT:
+            self.history = [value // 2 for value in self.history]
+
+    def order_moves(self, position: BitBoard, moves: List[int], table_move: int, ply: int) -> List[int]:
+        squares = position.squares
+        history = self.history
+        first_killer, second_killer = self.killers[ply]
+        scores = {}
+        for move in moves:
+            from_square = move & SQUARE_MASK
+            to_square = (move >> TO_SHIFT) & SQUARE_MASK
+            attacker = squares[from_square]
+            victim = squares[to_square]
+            promotion = (move >> PROMOTION_SHIFT) & 0x7
+            if move == table_move:
+                score = TABLE_MOVE_ORDER
+            elif victim != EMPTY or promotion or move >> FLAG_SHIFT == EN_PASSANT:
+                # most valuable victim first, then least valuable attacker
+                victim_type = victim % PIECE_TYPE_COUNT if victim != EMPTY else PAWN
+                score = CAPTURE_ORDER + promotion * 64 + victim_type * 8 - attacker % PIECE_TYPE_COUNT
+            elif move == first_killer:
+                score = KILLER_ORDER + 1
+            elif move == second_killer:
+                score = KILLER_ORDER
+            else:
+                score = history[attacker * SQUARE_COUNT + to_square]
+            scores[move] = score
+        return sorted(moves, key=scores.__getitem__, reverse=True)
@@ -0,0 +1,409 @@
+import argparse
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from chess_bitboard import (BISHOP, BLACK, CASTLE, EMPTY, KING, KING_ATTACKS, KNIGHT, KNIGHT_ATTACKS, PAWN,
+                            PIECE_SYMBOLS, PIECE_TYPE_COUNT, QUEEN, SIZE, SQUARE_COUNT, WHITE, BitBoard, bishop_attacks,
+                            iterate_squares, move_promotion, move_to, move_to_uci, queen_attacks, rook_attacks)
+from search import MATE_SCORE
+
+# a table value is 0 for a draw, otherwise the number of plies to mate plus one;
+# an odd number of plies is a win for the side to move, an even one a loss
+DRAW = 0
+ILLEGAL = 255
+MAX_PLIES = ILLEGAL - 2
+
+# bits of the per-position flags worked out before the retrograde passes
+ILLEGAL_FLAG = 1
+# a move leaves the table into a draw, or there are no moves and no check
+DRAWN_FLAG = 2
+MATED_FLAG = 4
+
+MATERIAL_PATTERN = re.compile(r'^K([QRBNP]*)K([QRBNP]*)$')
+MATERIAL_ORDER = 'QRBNP'
+MATERIAL_VALUES = {'Q': 9, 'R': 5, 'B': 3, 'N': 3, 'P': 1}
+# the strongest piece first, the order pieces take in a table's name and index
+PIECE_ORDER = [QUEEN, CASTLE, BISHOP, KNIGHT, PAWN]
+PAWN_SQUARES = SQUARE_COUNT - 2 * SIZE
+MAX_TABLE_SIZE = 2 * SQUARE_COUNT ** 4
+TABLE_EXTENSION = '.tb'
+CHUNKS_PER_WORKER = 8
+
+
+def _sort_pieces(pieces: str) -> str:
+    return ''.join(sorted(pieces, key=MATERIAL_ORDER.index))
+
+
+def _strength(pieces: str) -> Tuple[int, str]:
+    return sum(MATERIAL_VALUES[piece] for piece in pieces), pieces
+
+
+def canonical_name(white: str, black: str) -> str:
+    # tables are only built with the stronger side as white, the other
+    # colouring is probed by mirroring the board
+    white, black = _sort_pieces(white), _sort_pieces(black)
+    return f'K{white}K{black}' if _strength(white) >= _strength(black) else f'K{black}K{white}'
+
+
+def parse_material(name: str) -> Tuple[str, str]:
+    match = MATERIAL_PATTERN.match(name.upper())
+    if not match:
+        raise ValueError(f'Not a material signature like KQK or KRKP: {name!r}')
+    return match.group(1), match.group(2)
+
+
+def is_insufficient(white: str, black: str) -> bool:
+    return not white + black or white + black in ('B', 'N')
+
+
+def dependencies(name: str) -> List[str]:
+    # the tables reached by one capture or one promotion
+    white, black = parse_material(name)
+    reached = set()
+    for is_white, side in ((True, white), (False, black)):
+        for index, piece in enumerate(side):
+            remaining = side[:index] + side[index + 1:]
+            for changed in [remaining] + ([remaining + promoted for promoted in 'QRBN'] if piece == 'P' else []):
+                new_white, new_black = (changed, black) if is_white else (white, changed)
+                if not is_insufficient(new_white, new_black):
+                    reached.add(canonical_name(new_white, new_black))
+    reached.discard(canonical_name(white, black))
+    return sorted(reached)
+
+
+class TableLayout:
+    # a position's index is its side to move followed by the square of every
+    # piece, white king, black king, then white and black pieces in name order;
+    # pawns only take the 48 squares they can stand on
+    name: str
+    slots: List[Tuple[int, int]]
+    strides: List[int]
+    turn_stride: int
+    size: int
+
+    def __init__(self, name: str):
+        white, black = parse_material(name)
+        if 'P' in white and 'P' in black:
+            raise ValueError(f'{name} has pawns on both sides, en passant is not indexed')
+
+        self.name = f'K{white}K{black}'
+        self.slots = [(WHITE, KING), (BLACK, KING)]
+        self.slots += [(WHITE, PIECE_SYMBOLS.index(piece)) for piece in white]
+        self.slots += [(BLACK, PIECE_SYMBOLS.index(piece)) for piece in black]
+        ranges = [PAWN_SQUARES if piece_type == PAWN else SQUARE_COUNT for _, piece_type in self.slots]
+        self.strides = [1] * len(ranges)
+        for slot in range(len(ranges) - 2, -1, -1):
+            self.strides[slot] = self.strides[slot + 1] * ranges[slot + 1]
+        self.turn_stride = self.strides[0] * ranges[0]
+        self.size = 2 * self.turn_stride
+        if self.size > MAX_TABLE_SIZE:
+            raise ValueError(f'{name} needs {self.size:,} entries, at most {MAX_TABLE_SIZE:,} are supported')
+
+    def encode(self, turn: int, squares: List[int]) -> int:
+        index = turn * self.turn_stride
+        for (_, piece_type), stride, square in zip(self.slots, self.strides, squares):
+            index += (square - SIZE if piece_type == PAWN else square) * stride
+        return index
+
+    def decode(self, index: int) -> Tuple[int, List[int]]:
+        turn, rest = divmod(index, self.turn_stride)
+        squares = []
+        for (_, piece_type), stride in zip(self.slots, self.strides):
+            local, rest = divmod(rest, stride)
+            squares.append(local + SIZE if piece_type == PAWN else local)
+        return turn, squares
+
+    def position(self, turn: int, squares: List[int]) -> BitBoard:
+        position = BitBoard()
+        for (color, piece_type), square in zip(self.slots, squares):
+            position.put_piece(square, color * PIECE_TYPE_COUNT + piece_type)
+        position.turn = turn
+        if turn == BLACK:
+            position.key = position.compute_key()
+        return position
+
+    def predecessors(self, index: int) -> List[int]:
+        # positions one quiet move earlier; captures and promotions lead out of
+        # the table, so they are never undone here
+        turn, squares = self.decode(index)
+        mover = 1 - turn
+        occupied = 0
+        for square in squares:
+            occupied |= 1 << square
+        base = index + (mover - turn) * self.turn_stride
+
+        found = []
+        for (color, piece_type), stride, square in zip(self.slots, self.strides, squares):
+            if color != mover:
+                continue
+            if piece_type == PAWN:
+                step = SIZE if color == WHITE else -SIZE
+                start_row = SIZE - 2 if color == WHITE else 1
+                earlier = square + step
+                if not 1 <= earlier // SIZE <= SIZE - 2 or (1 << earlier) & occupied:
+                    continue
+                found.append(base + step * stride)
+                # two rows back when that is the pawn's starting row
+                if (earlier + step) // SIZE == start_row and not (1 << (earlier + step)) & occupied:
+                    found.append(base + 2 * step * stride)
+                continue
+
+            if piece_type == KNIGHT:
+                targets = KNIGHT_ATTACKS[square]
+            elif piece_type == KING:
+                targets = KING_ATTACKS[square]
+            elif piece_type == BISHOP:
+                targets = bishop_attacks(square, occupied)
+            elif piece_type == CASTLE:
+                targets = rook_attacks(square, occupied)
+            else:
+                targets = queen_attacks(square, occupied)
+            for target in iterate_squares(targets & ~occupied):
+                found.append(base + (target - square) * stride)
+        return found
+
+
+def _flags_entry(layout: TableLayout, index: int, tablebase: 'Tablebase') -> Tuple[int, int, int, int]:
+    # flags, quiet legal moves, plies + 1 of the fastest win leaving the table,
+    # plies of the slowest loss forced by moves leaving it
+    turn, squares = layout.decode(index)
+    if len(set(squares)) != len(squares):
+        return ILLEGAL_FLAG, 0, 0, 0
+    position = layout.position(turn, squares)
+    if position.is_square_attacked(position.king_square(1 - turn), turn):
+        return ILLEGAL_FLAG, 0, 0, 0
+
+    moves = position.generate_legal_moves()
+    if not moves:
+        return (MATED_FLAG if position.is_in_check() else DRAWN_FLAG), 0, 0, 0
+
+    flags = quiet = exit_win = exit_loss = 0
+    for move in moves:
+        if position.squares[move_to(move)] == EMPTY and not move_promotion(move):
+            quiet += 1
+            continue
+        position.make_move(move)
+        score = tablebase.score(position)
+        position.unmake_move()
+        if score is None:
+            raise ValueError(f'No table covers {move_to_uci(move)} from {position.to_fen()}, '
+                             f'generate the dependencies first')
+        if score == 0:
+            flags |= DRAWN_FLAG
+        elif score < 0:
+            plies = MATE_SCORE + score + 1
+            exit_win = plies + 1 if not exit_win else min(exit_win, plies + 1)
+        else:
+            exit_loss = max(exit_loss, MATE_SCORE - score + 1)
+    return flags, quiet, exit_win, exit_loss
+
+
+_tablebase: Optional['Tablebase'] = None
+
+
+def _start_worker(directory: str) -> None:
+    global _tablebase
+    _tablebase = Tablebase(directory)
+
+
+def _classify_range(name: str, start: int, stop: int) -> Tuple[bytes, bytes, bytes, bytes]:
+    layout = TableLayout(name)
+    columns = [bytearray(stop - start) for _ in range(4)]
+    for offset, index in enumerate(range(start, stop)):
+        for column, value in zip(columns, _flags_entry(layout, index, _tablebase)):
+            column[offset] = value
+    return tuple(bytes(column) for column in columns)
+
+
+@dataclass(frozen=True)
+class TableStats:
+    name: str
+    positions: int
+    wins: int
+    losses: int
+    draws: int
+    longest_mate: int
+    elapsed: float
+
+    def __str__(self) -> str:
+        return (f'{self.name}: {self.positions:,} positions, {self.wins:,} wins, {self.losses:,} losses, '
+                f'{self.draws:,} draws, longest mate {self.longest_mate} plies, {self.elapsed:.1f}s')
+
+
+def table_path(directory: str, name: str) -> str:
+    return os.path.join(directory, name + TABLE_EXTENSION)
+
+
+def generate_table(name: str, directory: str, workers: int = os.cpu_count() or 1) -> TableStats:
+    start = time.perf_counter()
+    layout = TableLayout(name)
+    size = layout.size
+
+    # the classification of every position is independent, so it is split
+    # across processes; the retrograde passes that follow are cheap by comparison
+    chunk = -(-size // (workers * CHUNKS_PER_WORKER))
+    starts = list(range(0, size, chunk))
+    stops = [min(first + chunk, size) for first in starts]
+    flags, quiet, exit_win, exit_loss = bytearray(), bytearray(), bytearray(), bytearray()
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(directory,)) as executor:
+        for columns in executor.map(_classify_range, [layout.name] * len(starts), starts, stops):
+            for column, part in zip((flags, quiet, exit_win, exit_loss), columns):
+                column.extend(part)
+
+    values = bytearray(size)
+    buckets: Dict[int, List[int]] = defaultdict(list)
+    for index in range(size):
+        if flags[index] & ILLEGAL_FLAG:
+            values[index] = ILLEGAL
+        elif flags[index] & MATED_FLAG:
+            buckets[0].append(index)
+        elif exit_win[index]:
+            buckets[exit_win[index] - 1].append(index)
+        elif not quiet[index] and exit_loss[index] and not flags[index] & DRAWN_FLAG:
+            buckets[exit_loss[index]].append(index)
+
+    # positions are settled in order of distance, so the first time one is
+    # reached is its shortest win or, for a loss, the last quiet reply running out
+    ply = 0
+    while buckets:
+        settled = []
+        for index in buckets.pop(ply, ()):
+            if values[index] == DRAW:
+                values[index] = ply + 1
+                settled.append(index)
+        if settled and ply >= MAX_PLIES:
+            raise ValueError(f'{name} has mates longer than {MAX_PLIES} plies')
+
+        for index in settled:
+            for earlier in layout.predecessors(index):
+                if values[earlier] != DRAW:
+                    continue
+                if ply % 2 == 0:
+                    buckets[ply + 1].append(earlier)
+                else:
+                    quiet[earlier] -= 1
+                    if not quiet[earlier] and not exit_win[earlier] and not flags[earlier] & DRAWN_FLAG:
+                        buckets[max(ply + 1, exit_loss[earlier])].append(earlier)
+        ply += 1
+
+    table = array('B', values)
+    temporary_path = table_path(directory, layout.name) + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        table.tofile(file)
+    os.replace(temporary_path, table_path(directory, layout.name))
+
+    legal = size - values.count(ILLEGAL)
+    draws = values.count(DRAW)
+    wins = sum(values.count(value) for value in range(2, ILLEGAL, 2))
+    longest = max((value - 1 for value in range(1, ILLEGAL) if values.count(value)), default=0)
+    return TableStats(layout.name, legal, wins, legal - wins - draws, draws, longest, time.perf_counter() - start)
+
+
+def generate(name: str, directory: str, workers: int = os.cpu_count() or 1) -> List[TableStats]:
+    # dependencies first, skipping tables already on disk
+    name = canonical_name(*parse_material(name))
+    stats = []
+    for dependency in dependencies(name):
+        if not os.path.exists(table_path(directory, dependency)):
+            stats.extend(generate(dependency, directory, workers))
+    os.makedirs(directory, exist_ok=True)
+    stats.append(generate_table(name, directory, workers))
+    return stats
+
+
+class Tablebase:
+    directory: str
+    tables: Dict[str, array]
+    layouts: Dict[str, TableLayout]
+    max_pieces: int
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tables = {}
+        self.layouts = {}
+        self.max_pieces = 2
+        if os.path.isdir(directory):
+            for file_name in sorted(os.listdir(directory)):
+                name, extension = os.path.splitext(file_name)
+                if extension == TABLE_EXTENSION and MATERIAL_PATTERN.match(name):
+                    self.load(name)
+
+    def load(self, name: str) -> None:
+        layout = TableLayout(name)
+        table = array('B')
+        with open(table_path(self.directory, name), 'rb') as file:
+            table.fromfile(file, layout.size)
+        self.tables[name] = table
+        self.layouts[name] = layout
+        self.max_pieces = max(self.max_pieces, len(layout.slots))
+
+    def score(self, position: BitBoard, ply: int = 0) -> Optional[int]:
+        # the exact search score for the position, None when no table covers it
+        occupied = position.occupancy[WHITE] | position.occupancy[BLACK]
+        if bin(occupied).count('1') > self.max_pieces or position.castling:
+            return None
+
+        pieces = position.pieces
+        white = ''.join(PIECE_SYMBOLS[piece_type] * bin(pieces[piece_type]).count('1') for piece_type in PIECE_ORDER)
+        black = ''.join(PIECE_SYMBOLS[piece_type] * bin(pieces[PIECE_TYPE_COUNT + piece_type]).count('1')
+                        for piece_type in PIECE_ORDER)
+        if is_insufficient(white, black):
+            return 0
+
+        name, flip = f'K{white}K{black}', 0
+        if name not in self.tables:
+            name, flip = f'K{black}K{white}', 1
+            if name not in self.tables:
+                return None
+        table, layout = self.tables[name], self.layouts[name]
+
+        # a mirrored table sees black as white, with the board turned over
+        mirror = (SQUARE_COUNT - SIZE) * flip
+        squares_by_piece = {}
+        squares = []
+        for color, piece_type in layout.slots:
+            code = (color ^ flip) * PIECE_TYPE_COUNT + piece_type
+            if code not in squares_by_piece:
+                squares_by_piece[code] = list(iterate_squares(pieces[code]))
+            squares.append(squares_by_piece[code].pop() ^ mirror)
+
+        value = table[layout.encode(position.turn ^ flip, squares)]
+        if value == DRAW or value == ILLEGAL:
+            return 0 if value == DRAW else None
+        plies = ply + value - 1
+        return MATE_SCORE - plies if value % 2 == 0 else plies - MATE_SCORE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate and probe distance-to-mate endgame tables')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='build tables and the tables they depend on')
+    generate_parser.add_argument('names', nargs='+', help='material signatures such as KQK, KRK or KPK')
+    generate_parser.add_argument('--directory', default='tablebases')
+    generate_parser.add_argument('--workers', type=int, default=os.cpu_count())
+
+    probe_parser = subparsers.add_parser('probe', help='look a position up')
+    probe_parser.add_argument('fen')
+    probe_parser.add_argument('--directory', default='tablebases')
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        for material in args.names:
+            for table_stats in generate(material, args.directory, args.workers):
+                print(table_stats)
+    elif args.command == 'probe':
+        result = Tablebase(args.directory).score(BitBoard.from_fen(args.fen))
+        if result is None:
+            print('not in the tablebase')
+        elif result == 0:
+            print('draw')
+        else:
+            plies = MATE_SCORE - abs(result)
+            print(f'{"win" if result > 0 else "loss"} for the side to move, mate in {plies} plies')
@@ -0,0 +1,114 @@
+import io
+import json
+
+import analysis_service
+from analysis_service import AnalysisService, analyse
+from chess_bitboard import STARTING_FEN
+from search import MATE_SCORE
+
+MATED_FEN = 'rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3'
+STALEMATE_FEN = '7k/5Q2/6K1/8/8/8/8/8 b - - 0 1'
+MIDDLEGAME_FEN = 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'
+
+
+class TimedOutPlayer:
+    # a search whose clock ran out before its first iteration finished
+    def __init__(self):
+        self.info = []
+        self.nodes = 1024
+
+    def get_move(self, position):
+        return position.generate_legal_moves()[0]
+
+
+def read_lines(output):
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_analyse_when_checkmated_then_mate_status_and_score():
+    result = analyse(MATED_FEN, 3, None)
+
+    assert result['status'] == 'checkmate'
+    assert result['bestmove'] is None
+    assert result['score'] == -MATE_SCORE
+    assert result['mate'] == 0
+
+
+def test_analyse_when_stalemated_then_draw_status_and_score():
+    result = analyse(STALEMATE_FEN, 3, None)
+
+    assert result['status'] == 'stalemate'
+    assert result['bestmove'] is None
+    assert result['score'] == 0
+    assert result['mate'] is None
+
+
+def test_analyse_when_moves_left_then_ongoing_with_best_move():
+    result = analyse('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 3, None)
+
+    assert result['status'] == 'ongoing'
+    assert result['bestmove'] == 'a1a8'
+    assert result['mate'] == 1
+
+
+def test_analyse_when_no_iteration_finished_then_depth_and_score_unknown(monkeypatch):
+    monkeypatch.setattr(analysis_service, '_player', TimedOutPlayer())
+
+    result = analyse(STARTING_FEN, 3, 1)
+
+    assert result['status'] == 'ongoing'
+    assert result['bestmove'] is not None
+    assert result['depth'] is None
+    assert result['score'] is None
+    assert result['mate'] is None
+    assert result['nodes'] == 1024
+
+
+def test_submit_when_same_position_requested_concurrently_then_one_search_shared():
+    output = io.StringIO()
+
+    with AnalysisService(output, workers=1) as service:
+        service.submit({'id': 1, 'fen': MIDDLEGAME_FEN, 'depth': 4})
+        service.submit({'id': 2, 'fen': MIDDLEGAME_FEN, 'depth': 4})
+
+    lines = read_lines(output)
+    assert [line['id'] for line in lines] == [1, 2]
+    assert [line['cached'] for line in lines] == [False, True]
+    assert lines[0]['bestmove'] == lines[1]['bestmove']
+    assert service.stats.searched == 1
+    assert service.stats.joined == 1
+    assert service.pending == {}
+
+
+def test_submit_when_position_already_searched_then_answered_from_cache():
+    output = io.StringIO()
+    with AnalysisService(output, workers=1) as service:
+        service.submit({'id': 1, 'fen': MIDDLEGAME_FEN, 'depth': 3})
+
+    # the pool is shut down, so only the cache can answer; the move clocks
+    # are not part of the key
+    service.submit({'id': 2, 'fen': MIDDLEGAME_FEN.replace(' 4 4', ' 0 9'), 'depth': 3})
+    service.submit({'id': 3, 'fen': MIDDLEGAME_FEN, 'depth': 2})
+
+    first, cached, other_depth = read_lines(output)
+    assert cached['cached'] is True
+    assert cached['queue_ms'] == 0.0
+    assert cached['bestmove'] == first['bestmove']
+    assert cached['score'] == first['score']
+    assert 'error' in other_depth
+    assert service.stats.cache_hits == 1
+    assert service.stats.searched == 1
+
+
+def test_submit_when_pool_shut_down_then_error_written_and_slot_freed():
+    output = io.StringIO()
+    service = AnalysisService(output, workers=1, max_pending=1)
+    service.close()
+
+    service.submit({'id': 1, 'fen': MATED_FEN})
+    service.submit({'id': 2, 'fen': STALEMATE_FEN})
+
+    lines = read_lines(output)
+    assert [line['id'] for line in lines] == [1, 2]
+    assert all('error' in line for line in lines)
+    assert service.pending == {}
@@ -0,0 +1,58 @@
+import random
+
+from chess import Board
+from chess_bitboard import move_to_uci
+
+
+def play_uci(board, *moves):
+    for uci in moves:
+        board.make_move(next(move for move in board.legal_moves() if move_to_uci(board.to_engine_move(move)) == uci))
+
+
+def scanned_repetitions(board):
+    return board.previous_keys()[-board.bitboard.halfmove_clock or len(board.previous_keys()):].count(board.key()) + 1
+
+
+def test_update_status_when_position_seen_three_times_then_draw():
+    board = Board()
+
+    play_uci(board, 'g1f3', 'g8f6', 'f3g1', 'f6g8')
+    assert board.count_repetitions() == 2
+    assert not board.is_draw
+
+    play_uci(board, 'g1f3', 'g8f6', 'f3g1', 'f6g8')
+    assert board.count_repetitions() == 3
+    assert board.is_draw
+    assert board.is_game_over()
+
+
+def test_unmake_move_when_repetition_undone_then_no_longer_draw():
+    board = Board()
+    play_uci(board, 'g1f3', 'g8f6', 'f3g1', 'f6g8', 'g1f3', 'g8f6', 'f3g1', 'f6g8')
+
+    board.unmake_move()
+
+    assert not board.is_draw
+    assert len(board.previous_keys()) == 7
+
+
+def test_update_status_when_pawn_moved_between_then_earlier_positions_do_not_count():
+    board = Board()
+    play_uci(board, 'g1f3', 'g8f6', 'f3g1', 'f6g8', 'e2e4', 'e7e5')
+
+    play_uci(board, 'g1f3', 'g8f6', 'f3g1', 'f6g8')
+
+    assert board.count_repetitions() == 2
+    assert not board.is_draw
+
+
+def test_count_repetitions_when_random_games_then_matches_scan_of_all_keys():
+    rng = random.Random(0)
+    for _ in range(20):
+        board = Board.from_fen('4k3/8/8/8/8/8/8/R3K2R w KQ - 0 1')
+        for _ in range(60):
+            moves = board.legal_moves()
+            if not moves or board.is_game_over():
+                break
+            board.make_move(rng.choice(moves))
+            assert board.count_repetitions() == scanned_repetitions(board)
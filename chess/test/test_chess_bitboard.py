@@ -0,0 +1,47 @@
+import pytest
+
+from chess_bitboard import BitBoard, move_to_uci
+from perft import SUITE
+
+
+def snapshot(position):
+    return position.key, position.to_fen(), list(position.pieces), list(position.occupancy), list(position.squares)
+
+
+@pytest.mark.parametrize('entry', SUITE, ids=[entry.name for entry in SUITE])
+def test_unmake_move_when_every_move_played_then_position_restored(entry):
+    position = BitBoard.from_fen(entry.fen)
+    before = snapshot(position)
+
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        after_move = snapshot(position)
+        for reply in position.generate_legal_moves():
+            position.make_move(reply)
+            position.unmake_move()
+            assert snapshot(position) == after_move, move_to_uci(reply)
+        position.unmake_move()
+        assert snapshot(position) == before, move_to_uci(move)
+
+
+@pytest.mark.parametrize('entry', SUITE, ids=[entry.name for entry in SUITE])
+def test_make_move_when_played_then_key_matches_fen_and_recomputed_key(entry):
+    position = BitBoard.from_fen(entry.fen)
+
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        for reply in position.generate_legal_moves():
+            position.make_move(reply)
+            assert position.key == position.compute_key()
+            assert position.key == BitBoard.from_fen(position.to_fen()).key
+            position.unmake_move()
+        position.unmake_move()
+
+
+def test_unmake_move_when_move_returned_then_matches_move_played():
+    position = BitBoard.starting_position()
+    move = position.generate_legal_moves()[0]
+
+    position.make_move(move)
+
+    assert position.unmake_move() == move
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from chess_bitboard import BitBoard
+from compact_position import PACKED_SIZE, CompactPosition
+from perft import SUITE
+
+
+def suite_positions(plies=40):
+    # each perft position and the positions of a random game from it, which
+    # pass through captures, castling and en passant squares
+    rng = random.Random(0)
+    positions = []
+    for entry in SUITE:
+        position = BitBoard.from_fen(entry.fen)
+        positions.append(position.copy())
+        for _ in range(plies):
+            legal_moves = position.generate_legal_moves()
+            if not legal_moves:
+                break
+            position.make_move(rng.choice(legal_moves))
+            positions.append(position.copy())
+    return positions
+
+
+POSITIONS = suite_positions()
+
+
+@pytest.mark.parametrize('entry', SUITE, ids=lambda entry: entry.fen)
+def test_to_bitboard_when_perft_fen_then_same_fen_back(entry):
+    compact = CompactPosition.from_bitboard(BitBoard.from_fen(entry.fen))
+
+    fen = CompactPosition.from_bytes(compact.to_bytes()).to_bitboard().to_fen()
+
+    assert fen == entry.fen
+
+
+def test_to_bytes_when_positions_round_trip_then_equal_and_same_fen():
+    for position in POSITIONS:
+        compact = CompactPosition.from_bitboard(position)
+
+        data = compact.to_bytes()
+        restored = CompactPosition.from_bytes(data)
+
+        assert len(data) == PACKED_SIZE
+        assert restored == compact
+        assert restored.to_bitboard().to_fen() == position.to_fen()
+
+
+def test_to_bitboard_when_positions_round_trip_then_bitboard_state_matches():
+    for position in POSITIONS:
+        compact = CompactPosition.from_bitboard(position)
+
+        restored = compact.to_bitboard()
+
+        assert restored.squares == position.squares
+        assert restored.pieces == position.pieces
+        assert restored.occupancy == position.occupancy
+        assert restored.key == position.key == compact.key()
+        assert sorted(restored.generate_legal_moves()) == sorted(position.generate_legal_moves())
+        assert CompactPosition.from_bitboard(restored) == compact
+
+
+def test_eq_when_move_made_then_positions_differ():
+    position = BitBoard.from_fen(SUITE[0].fen)
+    before = CompactPosition.from_bitboard(position)
+
+    position.make_move(position.generate_legal_moves()[0])
+    after = CompactPosition.from_bitboard(position)
+    position.unmake_move()
+
+    assert after != before
+    assert CompactPosition.from_bitboard(position) == before
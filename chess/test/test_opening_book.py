@@ -0,0 +1,104 @@
+import random
+
+from chess import Board, Game
+from chess_bitboard import STARTING_FEN, BitBoard, move_to_uci
+from opening_book import BookBuilder, OpeningBook
+from search import AlphaBetaPlayer
+
+PGN = '''[Event "first"]
+[Result "1-0"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Event "bad token"]
+[Result "1-0"]
+
+1. e4 e5 2. Zz9 Nc6 1-0
+
+[Event "illegal move"]
+[Result "0-1"]
+
+1. d4 Qh5 0-1
+
+[Event "second"]
+[Result "1/2-1/2"]
+
+1. d4 d5 1/2-1/2
+'''
+
+
+def play_uci(board, uci):
+    board.make_move(next(move for move in board.legal_moves() if move_to_uci(board.to_engine_move(move)) == uci))
+
+
+def book_moves(book, fen):
+    return [(move_to_uci(move), weight) for move, weight in book.moves(BitBoard.from_fen(fen))]
+
+
+def write_book(tmp_path, lines):
+    fen_path = tmp_path / 'book.txt'
+    fen_path.write_text('\n'.join(lines) + '\n')
+    builder = BookBuilder()
+    builder.add_fen_file(str(fen_path))
+    book_path = str(tmp_path / 'book.bin')
+    builder.write(book_path)
+    return book_path
+
+
+def test_add_pgn_when_game_has_bad_move_then_game_skipped_and_build_continues(tmp_path):
+    path = tmp_path / 'games.pgn'
+    path.write_text(PGN)
+    builder = BookBuilder()
+
+    games = builder.add_pgn(str(path))
+
+    assert games == 2
+    assert builder.skipped == 2
+    book_path = str(tmp_path / 'book.bin')
+    builder.write(book_path)
+    with OpeningBook(book_path) as book:
+        # the bad games add nothing, not even the moves before the bad one
+        assert book_moves(book, STARTING_FEN) == [('e2e4', 2), ('d2d4', 1)]
+        assert book_moves(book, 'rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq - 0 1') == [('d7d5', 1)]
+
+
+def test_lookup_when_book_written_then_moves_read_back_highest_weight_first(tmp_path):
+    book_path = write_book(tmp_path, [f'{STARTING_FEN};d2d4;1', f'{STARTING_FEN};e4;3', f'{STARTING_FEN};g1f3;2',
+                                      f'{STARTING_FEN};e2e4;1'])
+
+    with OpeningBook(book_path) as book:
+        entries = book_moves(book, STARTING_FEN)
+        missing = book.lookup(BitBoard.from_fen('8/8/8/8/8/8/8/K6k w - - 0 1').key)
+
+    assert entries == [('e2e4', 4), ('g1f3', 2), ('d2d4', 1)]
+    assert missing == []
+
+
+def test_choose_move_when_weighted_then_picked_in_proportion(tmp_path):
+    book_path = write_book(tmp_path, [f'{STARTING_FEN};e2e4;3', f'{STARTING_FEN};d2d4;1'])
+    rng = random.Random(0)
+    position = BitBoard.from_fen(STARTING_FEN)
+
+    with OpeningBook(book_path) as book:
+        choices = [move_to_uci(book.choose_move(position, rng)) for _ in range(4000)]
+
+    assert set(choices) == {'e2e4', 'd2d4'}
+    assert abs(choices.count('e2e4') / len(choices) - 0.75) < 0.03
+
+
+def test_get_player_move_when_position_not_in_book_then_falls_back_to_search(tmp_path):
+    book_path = write_book(tmp_path, [f'{STARTING_FEN};e2e4;1'])
+    board = Board()
+    player = AlphaBetaPlayer(time_budget_ms=None, max_depth=2)
+
+    with OpeningBook(book_path) as book:
+        game = Game(player, book, random.Random(0))
+        book_move = move_to_uci(board.to_engine_move(game.get_player_move(board)))
+        searched = bool(player.info)
+        play_uci(board, book_move)
+        search_move = move_to_uci(board.to_engine_move(game.get_player_move(board)))
+
+    assert book_move == 'e2e4'
+    assert not searched
+    assert player.info
+    assert search_move in {move_to_uci(move) for move in board.bitboard.generate_legal_moves()}
@@ -0,0 +1,56 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import queue
+
+import pytest
+
+from chess_bitboard import STARTING_FEN, BitBoard, move_to_uci
+from parallel_search import ParallelSearch, SearchTask, run_worker
+from search import MATE_SCORE
+from transposition import table_bytes
+
+HASH_MB = 1
+
+
+class FailingQueue:
+    def put(self, item):
+        raise RuntimeError('results queue closed')
+
+
+@pytest.fixture(scope='module')
+def parallel_search():
+    with ParallelSearch(workers=2, hash_mb=HASH_MB) as search:
+        yield search
+
+
+def test_search_when_two_workers_then_legal_move_from_every_worker(parallel_search):
+    position = BitBoard.from_fen(STARTING_FEN)
+
+    result = parallel_search.search(position, max_depth=3, time_budget_ms=None)
+
+    assert result.move in position.generate_legal_moves()
+    assert sorted(worker.worker for worker in result.workers) == [0, 1]
+    assert result.info.depth == 3
+    assert result.nodes > 0
+
+
+def test_search_when_mate_in_one_then_mating_move(parallel_search):
+    parallel_search.clear_table()
+    position = BitBoard.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+
+    result = parallel_search.search(position, max_depth=4, time_budget_ms=None)
+
+    assert move_to_uci(result.move) == 'a1a8'
+    assert result.info.score == MATE_SCORE - 1
+
+
+def test_run_worker_when_task_raises_then_original_error_surfaces():
+    memory = shared_memory.SharedMemory(create=True, size=table_bytes(HASH_MB))
+    tasks = queue.Queue()
+    tasks.put(SearchTask(STARTING_FEN, (), 1, None))
+    try:
+        with pytest.raises(RuntimeError, match='results queue closed'):
+            run_worker(0, memory.name, HASH_MB, tasks, FailingQueue(), multiprocessing.Event())
+    finally:
+        memory.close()
+        memory.unlink()
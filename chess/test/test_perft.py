@@ -0,0 +1,34 @@
+import pytest
+
+from chess_bitboard import STARTING_FEN, BitBoard
+from perft import SUITE, divide, perft
+
+
+@pytest.mark.parametrize('entry', SUITE, ids=[entry.name for entry in SUITE])
+def test_perft_when_reference_position_then_counts_match(entry):
+    position = BitBoard.from_fen(entry.fen)
+
+    for depth, expected in enumerate(entry.counts[:3], start=1):
+        assert perft(position, depth) == expected
+
+
+def test_perft_when_counted_then_position_is_unchanged():
+    position = BitBoard.from_fen(SUITE[1].fen)
+    key = position.key
+
+    perft(position, 3)
+
+    assert position.key == key
+    assert position.to_fen() == SUITE[1].fen
+
+
+def test_divide_when_start_position_then_sums_to_perft():
+    counts = divide(BitBoard.from_fen(STARTING_FEN), 2)
+
+    assert len(counts) == 20
+    assert sum(counts.values()) == 400
+
+
+def test_divide_when_depth_below_one_then_raises():
+    with pytest.raises(ValueError):
+        divide(BitBoard.from_fen(STARTING_FEN), 0)
@@ -0,0 +1,85 @@
+import random
+
+from chess_bitboard import STARTING_FEN, BitBoard
+from pgn import IndexedPgn, PgnWriter, build_index, export_game, read_pgn, write_index
+from perft import SUITE
+
+
+def random_game(start_fen, plies, seed):
+    rng = random.Random(seed)
+    position = BitBoard.from_fen(start_fen)
+    moves = []
+    for _ in range(plies):
+        legal_moves = position.generate_legal_moves()
+        if not legal_moves:
+            break
+        move = rng.choice(legal_moves)
+        position.make_move(move)
+        moves.append(move)
+    return moves, position.to_fen()
+
+
+def write_games(path):
+    games = []
+    with PgnWriter(str(path)) as writer:
+        for number, entry in enumerate(SUITE * 2):
+            moves, final_fen = random_game(entry.fen, 60, number)
+            headers = {'White': f'Player "{number}"', 'Result': '1/2-1/2'}
+            writer.write_game(moves, headers, entry.fen)
+            games.append((entry.fen, moves, final_fen))
+    return games
+
+
+def test_export_game_when_read_back_then_replays_same_moves(tmp_path):
+    path = tmp_path / 'games.pgn'
+    games = write_games(path)
+
+    read = list(read_pgn(str(path)))
+
+    assert len(read) == len(games)
+    for game, (start_fen, moves, final_fen) in zip(read, games):
+        assert game.start_fen == start_fen
+        assert list(game.moves()) == moves
+        assert game.final_position().to_fen() == final_fen
+        assert game.headers['Result'] == '1/2-1/2'
+
+
+def test_export_game_when_header_has_quotes_then_value_read_back(tmp_path):
+    path = tmp_path / 'games.pgn'
+    write_games(path)
+
+    game = next(read_pgn(str(path)))
+
+    assert game.headers['White'] == 'Player "0"'
+
+
+def test_export_game_when_starting_position_then_no_fen_header():
+    moves, _ = random_game(STARTING_FEN, 10, 0)
+
+    text = export_game(moves)
+
+    assert '[FEN' not in text
+    assert text.startswith('[Event "?"]')
+
+
+def test_indexed_pgn_when_read_in_any_order_then_matches_sequential_read(tmp_path):
+    path = tmp_path / 'games.pgn'
+    games = write_games(path)
+
+    with IndexedPgn(str(path)) as indexed:
+        assert len(indexed) == len(games)
+        for number in reversed(range(len(games))):
+            _, moves, final_fen = games[number]
+            assert list(indexed[number].moves()) == moves
+            assert indexed[number].final_position().to_fen() == final_fen
+        assert list(indexed[-1].moves()) == games[-1][1]
+
+
+def test_indexed_pgn_when_index_file_written_then_same_games(tmp_path):
+    path = tmp_path / 'games.pgn'
+    index_path = tmp_path / 'games.idx'
+    games = write_games(path)
+    write_index(build_index(str(path)), str(index_path))
+
+    with IndexedPgn(str(path), str(index_path)) as indexed:
+        assert [list(indexed[number].moves()) for number in range(len(indexed))] == [moves for _, moves, _ in games]
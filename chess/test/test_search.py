@@ -0,0 +1,66 @@
+import time
+
+from chess_bitboard import CHECKMATE, STARTING_FEN, BitBoard, move_to_uci
+from search import MATE_SCORE, AlphaBetaPlayer
+
+
+def mates_in_one(position):
+    for move in position.generate_legal_moves():
+        position.make_move(move)
+        mate = position.status() == CHECKMATE
+        position.unmake_move()
+        if mate:
+            return True
+    return False
+
+
+def test_get_move_when_back_rank_mate_in_one_then_mating_move():
+    position = BitBoard.from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+    player = AlphaBetaPlayer(time_budget_ms=None, max_depth=4)
+
+    move = player.get_move(position)
+
+    assert move_to_uci(move) == 'a1a8'
+    assert player.info[-1].score == MATE_SCORE - 1
+    assert player.info[-1].mate_in == 1
+
+
+def test_get_move_when_mate_in_two_then_every_reply_allows_mate():
+    position = BitBoard.from_fen('k7/8/2K5/8/8/8/8/7R w - - 0 1')
+    player = AlphaBetaPlayer(time_budget_ms=None, max_depth=4)
+
+    move = player.get_move(position)
+
+    assert player.info[-1].mate_in == 2
+    position.make_move(move)
+    replies = position.generate_legal_moves()
+    assert replies
+    for reply in replies:
+        position.make_move(reply)
+        assert mates_in_one(position), move_to_uci(reply)
+        position.unmake_move()
+
+
+def test_get_move_when_queen_hangs_then_queen_captured():
+    position = BitBoard.from_fen('rnb1kbnr/pppp1ppp/8/4p1q1/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 1')
+    player = AlphaBetaPlayer(time_budget_ms=None, max_depth=3)
+
+    move = player.get_move(position)
+
+    assert move_to_uci(move) == 'f3g5'
+    assert player.info[-1].score > 500
+
+
+def test_get_move_when_time_budget_set_then_returns_within_budget():
+    position = BitBoard.from_fen(STARTING_FEN)
+    player = AlphaBetaPlayer(time_budget_ms=200)
+
+    start = time.perf_counter()
+    move = player.get_move(position)
+    elapsed = time.perf_counter() - start
+
+    assert move in position.generate_legal_moves()
+    assert player.info
+    # the clock is only read every so many nodes, so allow a little over
+    assert elapsed < 0.4
+    assert position.to_fen() == STARTING_FEN
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from chess_bitboard import CHECKMATE, BitBoard, move_to_uci
+from search import MATE_SCORE, AlphaBetaPlayer
+from tablebase import Tablebase, generate
+
+# a rook pawn with the defending king in the corner, and the defending king
+# in front of the pawn with the opposition
+KPK_DRAWS = ['k7/8/K7/P7/8/8/8/8 w - - 0 1', '8/8/8/8/8/4k3/4P3/4K3 w - - 0 1']
+
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    # KPK pulls in KQK and KRK for its promotions; generating them takes a while,
+    # so the tables are shared by every test here
+    directory = str(tmp_path_factory.mktemp('tablebases'))
+    stats = {table_stats.name: table_stats for table_stats in generate('KPK', directory)}
+    return stats, Tablebase(directory)
+
+
+def mirror_fen(fen):
+    # the same position with the colors swapped and the board turned over
+    placement, turn = fen.split()[:2]
+    return f"{'/'.join(placement.swapcase().split('/')[::-1])} {'b' if turn == 'w' else 'w'} - - 0 1"
+
+
+def random_fen(rng, pieces):
+    squares = rng.sample(range(64), len(pieces))
+    board = [['1'] * 8 for _ in range(8)]
+    for piece, square in zip(pieces, squares):
+        if piece in 'Pp' and square // 8 in (0, 7):
+            return None
+        board[square // 8][square % 8] = piece
+    rows = []
+    for row in board:
+        text = ''.join(row)
+        for run in range(8, 1, -1):
+            text = text.replace('1' * run, str(run))
+        rows.append(text)
+    return f"{'/'.join(rows)} {rng.choice('wb')} - - 0 1"
+
+
+def test_generate_when_kqk_then_longest_mate_is_20_plies(tables):
+    stats, _ = tables
+
+    assert stats['KQK'].longest_mate == 20
+    assert stats['KQK'].positions == stats['KQK'].wins + stats['KQK'].losses + stats['KQK'].draws
+
+
+def test_score_when_krk_mate_in_two_then_three_plies_and_search_agrees(tables):
+    _, tablebase = tables
+    position = BitBoard.from_fen('k7/8/2K5/8/8/8/8/7R w - - 0 1')
+
+    player = AlphaBetaPlayer(time_budget_ms=None, max_depth=4)
+    player.get_move(position)
+
+    assert tablebase.score(position) == MATE_SCORE - 3
+    assert player.info[-1].score == MATE_SCORE - 3
+
+
+def test_score_when_krk_mate_in_one_then_one_ply_and_counts_from_ply(tables):
+    _, tablebase = tables
+    position = BitBoard.from_fen('k7/8/1K6/8/8/8/8/7R w - - 0 1')
+
+    assert tablebase.score(position) == MATE_SCORE - 1
+    assert tablebase.score(position, ply=4) == MATE_SCORE - 5
+    position.make_move(next(move for move in position.generate_legal_moves() if move_to_uci(move) == 'h1h8'))
+    assert position.status() == CHECKMATE
+
+
+@pytest.mark.parametrize('fen', KPK_DRAWS)
+def test_score_when_kpk_draw_then_zero(tables, fen):
+    _, tablebase = tables
+
+    assert tablebase.score(BitBoard.from_fen(fen)) == 0
+
+
+def test_score_when_kpk_won_with_king_in_front_then_mate_for_the_pawn_side(tables):
+    _, tablebase = tables
+
+    assert tablebase.score(BitBoard.from_fen('4k3/8/4K3/4P3/8/8/8/8 b - - 0 1')) < 0
+
+
+@pytest.mark.parametrize('pieces', ['KQk', 'KRk', 'KPk', 'Kkq', 'Kkp'])
+def test_score_when_colors_mirrored_then_same_score(tables, pieces):
+    _, tablebase = tables
+    rng = random.Random(pieces)
+    checked = 0
+    while checked < 300:
+        fen = random_fen(rng, pieces)
+        if fen is None:
+            continue
+        assert tablebase.score(BitBoard.from_fen(fen)) == tablebase.score(BitBoard.from_fen(mirror_fen(fen))), fen
+        checked += 1
+
+
+def test_score_when_material_not_in_tables_then_none_or_insufficient_draw(tables):
+    _, tablebase = tables
+
+    assert tablebase.score(BitBoard.from_fen('k7/8/8/8/8/8/8/KQ5r w - - 0 1')) is None
+    assert tablebase.score(BitBoard.from_fen('k7/8/8/8/8/8/8/KN6 w - - 0 1')) == 0
+    assert tablebase.score(BitBoard.starting_position()) is None
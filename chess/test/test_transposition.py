@@ -0,0 +1,109 @@
+from multiprocessing import shared_memory
+
+from transposition import (ENTRIES_PER_BUCKET, ENTRY, EXACT, LOWER_BOUND, MAX_SCORE, UPPER_BOUND, TableEntry,
+                           TranspositionTable, table_bytes)
+
+SIZE_MB = 0.01
+KEY = 0x9E3779B97F4A7C15
+
+
+def test_probe_when_entry_stored_then_same_entry_returned():
+    table = TranspositionTable(SIZE_MB)
+
+    table.store(KEY, 1234, -567, 7, UPPER_BOUND)
+    table.store(KEY + 1, 99, 40000, 300, LOWER_BOUND)
+
+    assert table.probe(KEY) == TableEntry(1234, -567, 7, UPPER_BOUND)
+    # out of range scores and depths are clamped rather than wrapped
+    assert table.probe(KEY + 1) == TableEntry(99, MAX_SCORE, 255, LOWER_BOUND)
+    assert table.probe(KEY + 2) is None
+    assert table.hits == 2
+    assert table.misses == 1
+
+
+def test_probe_when_key_shares_bucket_then_entry_not_returned():
+    table = TranspositionTable(SIZE_MB)
+    colliding_key = KEY + table.bucket_count
+
+    table.store(KEY, 1234, 10, 3, EXACT)
+
+    assert table.probe(colliding_key) is None
+    assert table.probe(KEY).move == 1234
+
+
+def test_probe_when_data_word_changed_without_key_then_entry_rejected():
+    table = TranspositionTable(SIZE_MB)
+    table.store(KEY, 1234, 10, 3, EXACT)
+    offset = next(offset for offset in range(0, table.size_bytes, ENTRY.size)
+                  if ENTRY.unpack_from(table.data, offset)[1])
+    checked_key, data = ENTRY.unpack_from(table.data, offset)
+
+    # as another process would leave it halfway through writing a new entry
+    ENTRY.pack_into(table.data, offset, checked_key, data ^ 1)
+
+    assert table.probe(KEY) is None
+
+
+def test_store_when_shallower_result_in_same_search_then_deeper_entry_kept():
+    table = TranspositionTable(SIZE_MB)
+    table.store(KEY, 1234, 10, 9, LOWER_BOUND)
+
+    table.store(KEY, 0, 20, 2, UPPER_BOUND)
+    kept = table.probe(KEY)
+    table.store(KEY, 0, 30, 2, EXACT)
+    exact = table.probe(KEY)
+
+    assert kept == TableEntry(1234, 10, 9, LOWER_BOUND)
+    # an exact result always replaces, keeping the move it was not given
+    assert exact == TableEntry(1234, 30, 2, EXACT)
+
+
+def test_store_when_bucket_full_then_shallowest_entry_replaced():
+    table = TranspositionTable(SIZE_MB)
+    keys = [KEY + index * table.bucket_count for index in range(ENTRIES_PER_BUCKET + 1)]
+    depths = [6, 2, 8, 5]
+    for key, depth in zip(keys, depths):
+        table.store(key, depth, 0, depth, EXACT)
+
+    table.store(keys[-1], 1, 0, 1, EXACT)
+
+    assert table.replacements == 1
+    assert table.probe(keys[1]) is None
+    assert [table.probe(key).depth for key in keys if key != keys[1]] == [6, 8, 5, 1]
+
+
+def test_store_when_bucket_full_then_entry_from_old_search_replaced_first():
+    table = TranspositionTable(SIZE_MB)
+    keys = [KEY + index * table.bucket_count for index in range(ENTRIES_PER_BUCKET + 1)]
+    table.store(keys[0], 1, 0, 10, EXACT)
+    table.new_search()
+    for key in keys[1:ENTRIES_PER_BUCKET]:
+        table.store(key, 1, 0, 3, EXACT)
+
+    table.store(keys[-1], 1, 0, 3, EXACT)
+
+    assert table.probe(keys[0]) is None
+    assert all(table.probe(key) is not None for key in keys[1:])
+
+
+def test_probe_when_table_shares_memory_then_other_table_sees_stores():
+    memory = shared_memory.SharedMemory(create=True, size=table_bytes(SIZE_MB))
+    other_memory = shared_memory.SharedMemory(name=memory.name)
+    try:
+        writer = TranspositionTable(SIZE_MB, buffer=memory.buf)
+        reader = TranspositionTable(SIZE_MB, buffer=other_memory.buf)
+
+        writer.store(KEY, 1234, -50, 4, EXACT)
+        entry = reader.probe(KEY)
+        reader.clear()
+        cleared = writer.probe(KEY)
+
+        # the tables hold views of the buffers, which must go before the memory is closed
+        del writer, reader
+    finally:
+        other_memory.close()
+        memory.close()
+        memory.unlink()
+
+    assert entry == TableEntry(1234, -50, 4, EXACT)
+    assert cleared is None
@@ -0,0 +1,175 @@
+import struct
+from typing import NamedTuple, Optional, Union
+
+# Entries live in one flat buffer rather than a dict of objects so a hash
+# budget in MB maps straight onto a number of entries, and so the buffer can be
+# shared memory. Each entry is 16 bytes, two u64s: the key xor the data, then
+# the data itself, which packs move u32, score i16, depth u8, and a byte with
+# the bound in the low 2 bits and the search generation it was written in
+# above them. Four entries share a 64-byte bucket picked by the low bits of the
+# key. Storing the key xor the data means an entry half written by another
+# process simply fails to match, so shared tables need no locks.
+ENTRY = struct.Struct('<QQ')
+ENTRIES_PER_BUCKET = 4
+BUCKET_SIZE = ENTRY.size * ENTRIES_PER_BUCKET
+BYTES_PER_MB = 1024 * 1024
+
+EMPTY = 0
+EXACT = 1
+LOWER_BOUND = 2
+UPPER_BOUND = 3
+BOUND_MASK = 0x3
+GENERATION_SHIFT = 2
+GENERATION_COUNT = 64
+MAX_DEPTH = 255
+MAX_SCORE = 32767
+SCORE_SHIFT = 32
+DEPTH_SHIFT = 48
+FLAGS_SHIFT = 56
+
+
+def pack_data(move: int, score: int, depth: int, flags: int) -> int:
+    return move | ((score & 0xFFFF) << SCORE_SHIFT) | (depth << DEPTH_SHIFT) | (flags << FLAGS_SHIFT)
+
+
+def unpack_score(data: int) -> int:
+    score = (data >> SCORE_SHIFT) & 0xFFFF
+    return score - 0x10000 if score & 0x8000 else score
+
+
+class TableEntry(NamedTuple):
+    move: int
+    score: int
+    depth: int
+    bound: int
+
+
+def bucket_count_for(size_mb: float) -> int:
+    bucket_count = max(1, int(size_mb * BYTES_PER_MB) // BUCKET_SIZE)
+    # a power of two lets the key pick its bucket with a mask
+    return 1 << (bucket_count.bit_length() - 1)
+
+
+def table_bytes(size_mb: float) -> int:
+    return bucket_count_for(size_mb) * BUCKET_SIZE
+
+
+class TranspositionTable:
+    size_mb: float
+    bucket_count: int
+    generation: int
+    hits: int
+    misses: int
+    stores: int
+    replacements: int
+
+    def __init__(self, size_mb: float = 16, buffer: Optional[Union[bytearray, memoryview]] = None):
+        if size_mb <= 0:
+            raise ValueError(f'Hash size must be positive, got {size_mb} MB')
+
+        self.bucket_count = bucket_count_for(size_mb)
+        self.size_mb = size_mb
+        if buffer is None:
+            buffer = bytearray(self.bucket_count * BUCKET_SIZE)
+        elif len(buffer) < self.bucket_count * BUCKET_SIZE:
+            raise ValueError(f'A {size_mb} MB table needs {self.bucket_count * BUCKET_SIZE} bytes, '
+                             f'the buffer has {len(buffer)}')
+        self.data = buffer
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self.bucket_count * BUCKET_SIZE
+
+    @property
+    def capacity(self) -> int:
+        return self.bucket_count * ENTRIES_PER_BUCKET
+
+    def probe(self, key: int) -> Optional[TableEntry]:
+        data = self.data
+        offset = (key & (self.bucket_count - 1)) * BUCKET_SIZE
+        for _ in range(ENTRIES_PER_BUCKET):
+            checked_key, entry_data = ENTRY.unpack_from(data, offset)
+            if checked_key ^ entry_data == key and entry_data >> FLAGS_SHIFT & BOUND_MASK:
+                self.hits += 1
+                return TableEntry(entry_data & 0xFFFFFFFF, unpack_score(entry_data),
+                                  (entry_data >> DEPTH_SHIFT) & 0xFF, (entry_data >> FLAGS_SHIFT) & BOUND_MASK)
+            offset += ENTRY.size
+
+        self.misses += 1
+        return None
+
+    def store(self, key: int, move: int, score: int, depth: int, bound: int) -> None:
+        data = self.data
+        generation = self.generation
+        bucket = (key & (self.bucket_count - 1)) * BUCKET_SIZE
+        depth = min(max(depth, 0), MAX_DEPTH)
+        score = min(max(score, -MAX_SCORE), MAX_SCORE)
+
+        target = bucket
+        target_value = None
+        replacing = True
+        for slot in range(ENTRIES_PER_BUCKET):
+            offset = bucket + slot * ENTRY.size
+            checked_key, entry_data = ENTRY.unpack_from(data, offset)
+            flags = entry_data >> FLAGS_SHIFT
+            entry_depth = (entry_data >> DEPTH_SHIFT) & 0xFF
+            # slots fill in order and are never emptied, so no entry for this
+            # key can sit beyond an empty one
+            if not flags & BOUND_MASK:
+                target, replacing = offset, False
+                break
+
+            if checked_key ^ entry_data == key:
+                # a much shallower result from this search is worth less than
+                # the one already here, unless it is exact
+                if bound != EXACT and depth + 2 < entry_depth and flags >> GENERATION_SHIFT == generation:
+                    return
+                if not move:
+                    move = entry_data & 0xFFFFFFFF
+                target, replacing = offset, False
+                break
+
+            # prefer replacing entries from old searches, then shallow ones
+            age = (generation - (flags >> GENERATION_SHIFT)) % GENERATION_COUNT
+            value = entry_depth - 8 * age
+            if target_value is None or value < target_value:
+                target, target_value = offset, value
+
+        if replacing:
+            self.replacements += 1
+        entry_data = pack_data(move, score, depth, bound | (generation << GENERATION_SHIFT))
+        ENTRY.pack_into(data, target, key ^ entry_data, entry_data)
+        self.stores += 1
+
+    def new_search(self) -> None:
+        self.generation = (self.generation + 1) % GENERATION_COUNT
+
+    def clear(self) -> None:
+        self.data[:self.size_bytes] = bytes(self.size_bytes)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def hashfull(self) -> int:
+        # permille of a sample of entries written during the current search,
+        # the same measure UCI engines report
+        sample = min(1000, self.capacity)
+        used = 0
+        for index in range(sample):
+            # the flags byte is the last byte of the little-endian data word
+            flags = self.data[index * ENTRY.size + ENTRY.size - 1]
+            if flags & BOUND_MASK and flags >> GENERATION_SHIFT == self.generation:
+                used += 1
+        return used * 1000 // sample
@@ -0,0 +1,30 @@
+import random
+from typing import List
+
+# Fixed seed so keys, and anything stored by key such as an opening book,
+# stay the same from one run to the next.
+SEED = 0x5EED_C4E55
+SQUARE_COUNT = 64
+PIECE_CODE_COUNT = 12
+
+_rng = random.Random(SEED)
+
+# indexed by piece code * 64 + square
+PIECE_KEYS: List[int] = [_rng.getrandbits(64) for _ in range(PIECE_CODE_COUNT * SQUARE_COUNT)]
+# indexed by the 4-bit castling rights mask
+CASTLING_KEYS: List[int] = [_rng.getrandbits(64) for _ in range(16)]
+# indexed by the column of the en passant square
+EN_PASSANT_KEYS: List[int] = [_rng.getrandbits(64) for _ in range(8)]
+BLACK_TO_MOVE_KEY: int = _rng.getrandbits(64)
+
+
+def compute_key(squares: List[int], turn: int, castling: int, en_passant: int) -> int:
+    key = CASTLING_KEYS[castling]
+    for square, code in enumerate(squares):
+        if code >= 0:
+            key ^= PIECE_KEYS[code * SQUARE_COUNT + square]
+    if en_passant >= 0:
+        key ^= EN_PASSANT_KEYS[en_passant % 8]
+    if turn:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
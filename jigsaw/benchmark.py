@@ -0,0 +1,100 @@
+import argparse
+import time
+from typing import List, Optional
+
+from csp_solver import BacktrackingSolver
+from generator import generate_candidates, generate_puzzle
+from jigsaw import Edge, Puzzle
+from parallel_solver import ParallelSolver
+
+
+class ScanningPuzzle(Puzzle):
+    # the matching the solver used before the edge index, every edge of every
+    # piece is looked at for each cell
+    def _get_matching_edge(self, edge_to_match: Edge) -> Optional[Edge]:
+        matching_id = self.matching_edges.get(edge_to_match.id)
+        for p in self.pieces:
+            for edge in p.edges.values():
+                if edge.id == matching_id and edge.id in self.edge_index:
+                    return edge
+        return None
+
+
+def benchmark_solve(size: int, scan: bool = False) -> None:
+    start = time.perf_counter()
+    puzzle = generate_puzzle(size, seed=size)
+    if scan:
+        puzzle = ScanningPuzzle(puzzle.pieces, puzzle.matching_edges, size)
+    generated = time.perf_counter() - start
+
+    start = time.perf_counter()
+    puzzle.solve()
+    elapsed = time.perf_counter() - start
+    if not puzzle.is_solved():
+        raise ValueError(f'The {size}x{size} puzzle was not solved')
+
+    pieces = size * size
+    print(f'{"scan" if scan else "index":<6} {pieces:>10,} pieces  generate {generated:7.2f}s  '
+          f'solve {elapsed:8.2f}s  {pieces / elapsed:>12,.0f} pieces/s')
+
+
+def run_solve_benchmark(sizes: List[int], scan_sizes: List[int]) -> None:
+    for size in scan_sizes:
+        benchmark_solve(size, scan=True)
+    for size in sizes:
+        benchmark_solve(size)
+
+
+def run_backtrack_benchmark(sizes: List[int], decoys: int, max_nodes: Optional[int]) -> None:
+    print(f'{decoys} decoy candidates per edge')
+    for size in sizes:
+        puzzle = generate_puzzle(size, seed=size)
+        candidates = generate_candidates(puzzle, decoys, seed=size)
+        stats = BacktrackingSolver(puzzle, candidates, max_nodes).solve()
+        if not puzzle.is_solved():
+            raise ValueError(f'The {size}x{size} puzzle was not solved')
+        print(f'{size * size:>10,} pieces  {stats}  {size * size / stats.elapsed:>10,.0f} pieces/s')
+
+
+def run_parallel_benchmark(size: int, worker_counts: List[int]) -> None:
+    # every run gets a fresh copy of the same puzzle, solving turns its pieces
+    puzzle = generate_puzzle(size, seed=size)
+    start = time.perf_counter()
+    puzzle.solve()
+    serial = time.perf_counter() - start
+    print(f'{size * size:,} pieces, serial solve {serial:.2f}s')
+
+    for workers in worker_counts:
+        puzzle = generate_puzzle(size, seed=size)
+        stats = ParallelSolver(puzzle, workers).solve()
+        if not puzzle.is_solved():
+            raise ValueError(f'The {size}x{size} puzzle was not solved')
+        print(f'{stats}  {serial / stats.elapsed:5.2f}x')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Jigsaw solver benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    solve_parser = subparsers.add_parser('solve', help='time to solve generated puzzles')
+    solve_parser.add_argument('--sizes', type=int, nargs='+', default=[100, 317, 1000],
+                              help='puzzle sides, the default is about 10k, 100k and 1M pieces')
+    solve_parser.add_argument('--scan-sizes', type=int, nargs='*', default=[10, 32, 64],
+                              help='sides to also solve with the old linear scan, which is quadratic')
+
+    backtrack_parser = subparsers.add_parser('backtrack', help='solve puzzles with ambiguous edge candidates')
+    backtrack_parser.add_argument('--sizes', type=int, nargs='+', default=[10, 32, 100])
+    backtrack_parser.add_argument('--decoys', type=int, default=3)
+    backtrack_parser.add_argument('--max-nodes', type=int, default=None)
+
+    parallel_parser = subparsers.add_parser('parallel', help='speedup of the parallel solver against worker count')
+    parallel_parser.add_argument('--size', type=int, default=1000)
+    parallel_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+    if args.benchmark == 'solve':
+        run_solve_benchmark(args.sizes, args.scan_sizes)
+    elif args.benchmark == 'backtrack':
+        run_backtrack_benchmark(args.sizes, args.decoys, args.max_nodes)
+    elif args.benchmark == 'parallel':
+        run_parallel_benchmark(args.size, args.workers)
@@ -0,0 +1,193 @@
+from dataclasses import dataclass
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from jigsaw import Edge, Orientation, Piece, Puzzle, Shape
+
+Cell = Tuple[int, int]
+# a piece by its position in Puzzle.pieces, with how many times it is rotated
+Placement = Tuple[int, int]
+
+SIDE_STEPS = {
+    Orientation.LEFT: (0, -1),
+    Orientation.TOP: (-1, 0),
+    Orientation.RIGHT: (0, 1),
+    Orientation.BOTTOM: (1, 0),
+}
+
+
+@dataclass
+class SolveStats:
+    nodes: int
+    # placements undone, whether a neighbour was left without options or
+    # everything below them failed
+    backtracks: int
+    max_depth: int
+    elapsed: float
+
+    def __str__(self) -> str:
+        return (f'{self.nodes:,} nodes, {self.backtracks:,} backtracks, depth {self.max_depth:,}, '
+                f'{self.elapsed:.2f}s')
+
+
+class BacktrackingSolver:
+    # placing pieces as a constraint satisfaction problem: each empty cell next
+    # to a placed piece keeps a domain of the placements its placed neighbours
+    # allow, the cell with the smallest domain is filled next, and a placement
+    # that empties a neighbour's domain is undone straight away
+    puzzle: Puzzle
+    candidate_edges: Dict[int, Set[int]]
+    max_nodes: Optional[int]
+
+    def __init__(self, puzzle: Puzzle, candidate_edges: Optional[Dict[int, Iterable[int]]] = None,
+                 max_nodes: Optional[int] = None) -> None:
+        self.puzzle = puzzle
+        if candidate_edges is None:
+            candidate_edges = {edge_id: [other_id] for edge_id, other_id in puzzle.matching_edges.items()}
+        self.candidate_edges = {edge_id: set(others) for edge_id, others in candidate_edges.items()}
+        self.max_nodes = max_nodes
+        self.size = puzzle.size
+        # edges as the pieces lie now, LEFT, TOP, RIGHT, BOTTOM; rotations are
+        # only applied to the pieces once a solution is found
+        self.edges: List[Tuple[Edge, ...]] = [tuple(piece.edges[o] for o in Orientation) for piece in puzzle.pieces]
+        self.edge_index: Dict[int, Tuple[int, Orientation]] = {}
+        for number, piece in enumerate(puzzle.pieces):
+            for orientation, edge in piece.edges.items():
+                if edge.shape != Shape.FLAT:
+                    self.edge_index[edge.id] = (number, orientation)
+        self.used = bytearray(len(puzzle.pieces))
+        self.grid: Dict[Cell, Placement] = {}
+        self.domains: Dict[Cell, List[Placement]] = {}
+        self.frontier: Set[Cell] = set()
+
+    def solve(self) -> SolveStats:
+        start = time.perf_counter()
+        nodes = backtracks = max_depth = 0
+        cell_count = self.size * self.size
+
+        # each frame is a cell, its choices, the next choice to try and what
+        # placing the current choice changed; memory grows with the number of
+        # cells, never with the size of the search tree
+        frames = [[(0, 0), self._compute_domain((0, 0)), 0, None]]
+        while frames:
+            frame = frames[-1]
+            cell, choices, next_choice, placed = frame
+            if placed is not None:
+                self._remove(cell, *placed)
+                frame[3] = None
+                backtracks += 1
+            if next_choice == len(choices):
+                frames.pop()
+                continue
+
+            frame[2] = next_choice + 1
+            placement = choices[next_choice]
+            nodes += 1
+            if self.max_nodes is not None and nodes > self.max_nodes:
+                raise Exception(f"Can't solve within {self.max_nodes:,} nodes")
+
+            changed = self._place(cell, placement)
+            frame[3] = (placement, changed)
+            max_depth = max(max_depth, len(frames))
+            if len(self.grid) == cell_count:
+                break
+            if any(not self._live_domain(neighbour) for neighbour, _ in changed):
+                continue
+
+            next_cell = self._most_constrained_cell()
+            frames.append([next_cell, self._live_domain(next_cell), 0, None])
+        else:
+            raise Exception("Can't solve")
+
+        for (row, column), (number, rotations) in self.grid.items():
+            piece = self.puzzle.pieces[number]
+            piece.rotate_edges(rotations)
+            self.puzzle.solution[row][column] = piece
+        return SolveStats(nodes, backtracks, max_depth, time.perf_counter() - start)
+
+    def _edge_at(self, placement: Placement, side: Orientation) -> Edge:
+        number, rotations = placement
+        # a rotation moves every edge one side on, LEFT to TOP and so on
+        return self.edges[number][(side - 1 - rotations) % 4]
+
+    def _fits(self, cell: Cell, placement: Placement) -> bool:
+        row, column = cell
+        for side, (row_step, column_step) in SIDE_STEPS.items():
+            edge = self._edge_at(placement, side)
+            neighbour = (row + row_step, column + column_step)
+            if not (0 <= neighbour[0] < self.size and 0 <= neighbour[1] < self.size):
+                if edge.shape != Shape.FLAT:
+                    return False
+                continue
+            if edge.shape == Shape.FLAT:
+                return False
+            if neighbour in self.grid:
+                facing = self._edge_at(self.grid[neighbour], side.get_opposite())
+                if edge.id not in self.candidate_edges.get(facing.id, ()) or not edge.fits_with(facing):
+                    return False
+        return True
+
+    def _compute_domain(self, cell: Cell) -> List[Placement]:
+        row, column = cell
+        for side, (row_step, column_step) in SIDE_STEPS.items():
+            neighbour = (row + row_step, column + column_step)
+            if neighbour in self.grid:
+                # one placed neighbour names the candidates, the others only filter them
+                facing = self._edge_at(self.grid[neighbour], side.get_opposite())
+                options = []
+                for edge_id in self.candidate_edges.get(facing.id, ()):
+                    entry = self.edge_index.get(edge_id)
+                    if entry is not None and not self.used[entry[0]]:
+                        options.append((entry[0], (side - entry[1]) % 4))
+                break
+        else:
+            options = [(number, rotations) for number in range(len(self.edges)) if not self.used[number]
+                       for rotations in range(4)]
+        return [placement for placement in options if self._fits(cell, placement)]
+
+    def _live_domain(self, cell: Cell) -> List[Placement]:
+        # a domain is not rebuilt when one of its pieces is used elsewhere
+        return [placement for placement in self.domains[cell] if not self.used[placement[0]]]
+
+    def _most_constrained_cell(self) -> Cell:
+        def constraint(cell: Cell) -> Tuple[int, int, Cell]:
+            placed_neighbours = sum((cell[0] + row_step, cell[1] + column_step) in self.grid
+                                    for row_step, column_step in SIDE_STEPS.values())
+            return len(self._live_domain(cell)), -placed_neighbours, cell
+
+        return min(self.frontier, key=constraint)
+
+    def _place(self, cell: Cell, placement: Placement) -> List[Tuple[Cell, Optional[List[Placement]]]]:
+        self.grid[cell] = placement
+        self.used[placement[0]] = 1
+        self.frontier.discard(cell)
+
+        # the empty neighbours gain a constraint, their old domains are kept for undoing
+        changed = []
+        row, column = cell
+        for row_step, column_step in SIDE_STEPS.values():
+            neighbour = (row + row_step, column + column_step)
+            if 0 <= neighbour[0] < self.size and 0 <= neighbour[1] < self.size and neighbour not in self.grid:
+                changed.append((neighbour, self.domains.get(neighbour)))
+                self.domains[neighbour] = self._compute_domain(neighbour)
+                self.frontier.add(neighbour)
+        return changed
+
+    def _remove(self, cell: Cell, placement: Placement,
+                changed: List[Tuple[Cell, Optional[List[Placement]]]]) -> None:
+        for neighbour, domain in changed:
+            if domain is None:
+                del self.domains[neighbour]
+                self.frontier.discard(neighbour)
+            else:
+                self.domains[neighbour] = domain
+        del self.grid[cell]
+        self.used[placement[0]] = 0
+        if cell in self.domains:
+            self.frontier.add(cell)
+
+
+def solve_with_backtracking(puzzle: Puzzle, candidate_edges: Optional[Dict[int, Iterable[int]]] = None,
+                            max_nodes: Optional[int] = None) -> Tuple[List[List[Piece]], SolveStats]:
+    stats = BacktrackingSolver(puzzle, candidate_edges, max_nodes).solve()
+    return puzzle.solution, stats
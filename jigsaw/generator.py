@@ -0,0 +1,64 @@
+import random
+from typing import Dict, List, Optional
+
+from jigsaw import Edge, Orientation, Piece, Puzzle, Shape
+
+
+def generate_puzzle(size: int, seed: Optional[int] = None) -> Puzzle:
+    rng = random.Random(seed)
+    grid = [[Piece() for _ in range(size)] for _ in range(size)]
+    matching_edges: Dict[int, int] = {}
+    next_id = 0
+
+    def add_edge(piece: Piece, orientation: Orientation, shape: Shape) -> int:
+        nonlocal next_id
+        piece.edges[orientation] = Edge(next_id, shape, piece)
+        next_id += 1
+        return next_id - 1
+
+    for row in range(size):
+        for column in range(size):
+            piece = grid[row][column]
+            if row == 0:
+                add_edge(piece, Orientation.TOP, Shape.FLAT)
+            if column == 0:
+                add_edge(piece, Orientation.LEFT, Shape.FLAT)
+
+            # each edge is made together with the one it fits on the neighbouring piece
+            for orientation, neighbour in ((Orientation.RIGHT, (row, column + 1)), (Orientation.BOTTOM, (row + 1, column))):
+                if size in neighbour:
+                    add_edge(piece, orientation, Shape.FLAT)
+                    continue
+                shape = rng.choice((Shape.OUTER, Shape.INNER))
+                edge_id = add_edge(piece, orientation, shape)
+                other_id = add_edge(grid[neighbour[0]][neighbour[1]], orientation.get_opposite(), shape.get_opposite())
+                matching_edges[edge_id] = other_id
+                matching_edges[other_id] = edge_id
+
+    pieces: List[Piece] = [piece for row in grid for piece in row]
+    for piece in pieces:
+        piece.rotate_edges(rng.randrange(4))
+    rng.shuffle(pieces)
+    return Puzzle(pieces, matching_edges, size)
+
+
+def generate_candidates(puzzle: Puzzle, decoys: int, seed: Optional[int] = None) -> Dict[int, List[int]]:
+    # what a noisy scan gives: every edge's true partner hidden among others of
+    # the fitting shape, so shape alone can not tell them apart
+    rng = random.Random(seed)
+    edges_by_shape: Dict[Shape, List[int]] = {Shape.OUTER: [], Shape.INNER: []}
+    shapes: Dict[int, Shape] = {}
+    for piece in puzzle.pieces:
+        for edge in piece.edges.values():
+            if edge.shape != Shape.FLAT:
+                edges_by_shape[edge.shape].append(edge.id)
+                shapes[edge.id] = edge.shape
+
+    candidates = {}
+    for edge_id, other_id in puzzle.matching_edges.items():
+        pool = edges_by_shape[shapes[edge_id].get_opposite()]
+        options = {other_id}
+        while len(options) < min(decoys + 1, len(pool)):
+            options.add(rng.choice(pool))
+        candidates[edge_id] = rng.sample(sorted(options), len(options))
+    return candidates
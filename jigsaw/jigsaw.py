@@ -1,9 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum, IntEnum
-from math import sqrt
-from typing import Dict, List
-
-from linked_list import LinkedList
+from typing import Dict, List, Optional, Tuple
 
 
 class Orientation(IntEnum):
@@ -36,22 +33,29 @@ class Shape(Enum):
         elif self == Shape.INNER:
             return Shape.OUTER
         else:
-            None
+            return None
             
 
 @dataclass
 class Edge:
+    __slots__ = ('id', 'shape', 'parent_piece')
+    
     id: int
     shape: Shape
     parent_piece: 'Piece'
     
     def fits_with(self, other: 'Edge') -> bool:
-        return False
+        return self.shape != Shape.FLAT and other.shape == self.shape.get_opposite()
     
 
 class Piece:
+    __slots__ = ('edges',)
+    
     edges: Dict[Orientation, Edge]
     
+    def __init__(self, edges: Optional[Dict[Orientation, Edge]] = None) -> None:
+        self.edges = edges or {}
+    
     def rotate_edges(self, rotations: int) -> None:
         while rotations > 0:
             left = self.edges[Orientation.LEFT]
@@ -59,98 +63,119 @@ class Piece:
             self.edges[Orientation.BOTTOM] = self.edges[Orientation.RIGHT]
             self.edges[Orientation.RIGHT] = self.edges[Orientation.TOP]
             self.edges[Orientation.TOP] = left
+            rotations -= 1
+    
+    def get_orientation(self, edge: Edge) -> Orientation:
+        return next(o for (o, e) in self.edges.items() if e is edge)
     
     def set_edge_as_orientation(self, edge: Edge, orientation: Orientation) -> None:
-        current_orientation = [o for (o, e) in self.edges.items() if e == edge]
+        current_orientation = self.get_orientation(edge)
         rotation_diff = orientation - current_orientation if orientation >= current_orientation else orientation + 4 - current_orientation
         
         self.rotate_edges(rotation_diff)
+    
+    def count_flat_edges(self) -> int:
+        return len([e for e in self.edges.values() if e.shape == Shape.FLAT])
         
 
 class Puzzle:
-    pieces: LinkedList[Piece]
+    pieces: List[Piece]
     matching_edges: Dict[int, int]
+    # every edge of a piece not yet placed, by id, with the side of the piece it is on
+    edge_index: Dict[int, Tuple[Piece, Orientation]]
     solution: List[List[Piece]]
     size: int
     
     def __init__(self, pieces: List[Piece], matching_edges: Dict[int, int], size: int) -> None:
+        if len(pieces) != size * size:
+            raise ValueError(f'A {size}x{size} puzzle needs {size * size} pieces, got {len(pieces)}')
+        
         self.pieces = pieces
         self.matching_edges = matching_edges
-        row = [None] * size
-        rows = row * size
-        self.solution = rows
-        self.size = sqrt(len(pieces))
+        self.edge_index = {}
+        self.solution = [[None] * size for _ in range(size)]
+        self.size = size
         
     def solve(self) -> List[List[Piece]]:
-        corner_pieces = LinkedList()
-        border_pieces = LinkedList()
-        inside_pieces = LinkedList()
-        self._group_pieces(corner_pieces, border_pieces, inside_pieces)
+        self._build_edge_index()
         
         for row in range(self.size):
             for column in range(self.size):
-                pieces_to_search = self._get_pieces_to_search(corner_pieces, border_pieces, inside_pieces)
-                self._fit_next_edge(pieces_to_search, row, column)
+                self._fit_next_edge(row, column)
 
         return self.solution
     
-    def _group_pieces(self, corner_pieces: LinkedList, border_pieces: LinkedList, inside_pieces: LinkedList) -> None:
-            for piece in self.pieces:
-                flat_edges_count = len([e.shape for e in piece.edges if e.shape == Shape.FLAT])
-                
-                if flat_edges_count == 2:
-                    corner_pieces.add(piece)
-                elif flat_edges_count == 1:
-                    border_pieces.add(piece)
-                else: 
-                    inside_pieces.add(piece)
-    
-    def _get_pieces_to_search(self, corner_pieces: LinkedList, border_pieces: LinkedList, inside_pieces: LinkedList, row: int, column: int) -> LinkedList:
-        if (row == 0 and (column == 0 or column == self.size - 1)) or (row == self.size - 1 and (column == 0 or column == self.size - 1)):
-            return corner_pieces
-        elif row == 0 or row == self.size - 1 or column == 0 or column == self.size - 1:
-            return border_pieces
-        else:
-            return inside_pieces
+    def is_solved(self) -> bool:
+        for row in range(self.size):
+            for column in range(self.size):
+                piece = self.solution[row][column]
+                if piece is None:
+                    return False
+                for orientation, row_step, column_step in ((Orientation.RIGHT, 0, 1), (Orientation.BOTTOM, 1, 0)):
+                    edge = piece.edges[orientation]
+                    next_row, next_column = row + row_step, column + column_step
+                    if next_row == self.size or next_column == self.size:
+                        if edge.shape != Shape.FLAT:
+                            return False
+                    elif self.matching_edges.get(edge.id) != self.solution[next_row][next_column].edges[orientation.get_opposite()].id:
+                        return False
+        return all(self.solution[0][i].edges[Orientation.TOP].shape == Shape.FLAT
+                   and self.solution[i][0].edges[Orientation.LEFT].shape == Shape.FLAT for i in range(self.size))
+    
+    def _build_edge_index(self) -> None:
+        self.edge_index = {}
+        for piece in self.pieces:
+            for orientation, edge in piece.edges.items():
+                if edge.shape != Shape.FLAT:
+                    self.edge_index[edge.id] = (piece, orientation)
+    
+    def _get_corner_piece(self) -> Piece:
+        for piece in self.pieces:
+            if piece.count_flat_edges() >= 2:
+                return piece
+        raise ValueError("Can't solve, there is no corner piece")
         
-    def _fit_next_edge(self, pieces_to_search: LinkedList, row: int, column: int) -> None:
+    def _fit_next_edge(self, row: int, column: int) -> None:
         if row == 0 and column == 0:
-            p: Piece = pieces_to_search.remove_first().value
+            p = self._get_corner_piece()
             self._orient_top_left_corner(p)
-            self.solution[0][0] = p     
+            self._place_piece(p, row, column)
         else:
             piece_to_match = self.solution[row - 1][0] if column == 0 else self.solution[row][column - 1]
-            orientation_to_match = Orientation.BOTTOM if column == 0 else Orientation.BOTTOM
+            orientation_to_match = Orientation.BOTTOM if column == 0 else Orientation.RIGHT
             edge_to_match = piece_to_match.edges.get(orientation_to_match)
             
-            edge = self._get_matching_edge(edge_to_match, pieces_to_search)
+            edge = self._get_matching_edge(edge_to_match)
             if edge == None:
                 raise Exception("Can't solve")
             
             orientation = orientation_to_match.get_opposite()
-            self._set_edge_in_solution(pieces_to_search, edge, row, column, orientation)
+            self._set_edge_in_solution(edge, row, column, orientation)
             
     def _orient_top_left_corner(self, piece: Piece) -> None:
-        # find 2 flad edges and place them to match the outside of puzzle
-        return
+        # find 2 flat edges next to each other and turn them to the outside of the puzzle
+        for orientation in Orientation:
+            following = Orientation(orientation % 4 + 1)
+            if piece.edges[orientation].shape == Shape.FLAT and piece.edges[following].shape == Shape.FLAT:
+                piece.set_edge_as_orientation(piece.edges[orientation], Orientation.LEFT)
+                return
     
-    def _get_matching_edge(self, edge_to_match: Edge, pieces_to_search: LinkedList) -> Edge:
+    def _get_matching_edge(self, edge_to_match: Edge) -> Optional[Edge]:
         matching_id = self.matching_edges.get(edge_to_match.id)
-        for p in pieces_to_search:
-            for edge in p.edges:
-                if edge.id == matching_id:
-                    return edge
-        return None
+        entry = self.edge_index.get(matching_id)
+        if entry is None:
+            return None
         
-    def _set_edge_in_solution(self, pieces: LinkedList, edge: Edge, row: int, column: int, orientation: Orientation) -> None:
+        piece, orientation = entry
+        return piece.edges[orientation]
+        
+    def _set_edge_in_solution(self, edge: Edge, row: int, column: int, orientation: Orientation) -> None:
         piece = edge.parent_piece
         piece.set_edge_as_orientation(edge, orientation)
-        pieces.delete_node(piece)
-        self.solution[row][column] = piece
-        
+        self._place_piece(piece, row, column)
     
-        
-    
-            
-    
-    
\ No newline at end of file
+    def _place_piece(self, piece: Piece, row: int, column: int) -> None:
+        # a placed piece can not be matched again, so its edges leave the index
+        for edge in piece.edges.values():
+            self.edge_index.pop(edge.id, None)
+        self.solution[row][column] = piece
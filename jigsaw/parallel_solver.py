@@ -0,0 +1,154 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import os
+import time
+from typing import List, Optional, Tuple
+
+from jigsaw import Orientation, Piece, Puzzle
+
+# sides as offsets into a piece's four edge slots, in Orientation order
+ORIENTATIONS = tuple(Orientation)
+LEFT, TOP, RIGHT, BOTTOM = (o - 1 for o in ORIENTATIONS)
+# a piece by its position in Puzzle.pieces, with how many times it is rotated
+Placement = Tuple[int, int]
+
+
+def build_partners(puzzle: Puzzle) -> array:
+    # every edge as a slot, piece * 4 + side, pointing at the slot of the edge
+    # it matches or -1 for a flat edge; a flat array pickles quickly to workers
+    edges = [piece.edges[orientation] for piece in puzzle.pieces for orientation in ORIENTATIONS]
+    slots = {edge.id: slot for slot, edge in enumerate(edges)}
+    matching_edges = puzzle.matching_edges
+    return array('q', [slots.get(matching_edges.get(edge.id), -1) for edge in edges])
+
+
+def next_placement(partners: array, placement: Placement, side: int) -> Placement:
+    # the piece fitting on the given side, rotated so its edge faces back
+    number, rotations = placement
+    partner = partners[number * 4 + (side - rotations) % 4]
+    if partner < 0:
+        raise Exception("Can't solve")
+    return partner // 4, ((side + 2) % 4 - partner % 4) % 4
+
+
+def find_corner(partners: array, piece_count: int) -> Placement:
+    for number in range(piece_count):
+        flat = [partners[number * 4 + side] < 0 for side in range(4)]
+        for rotations in range(4):
+            # rotated so the two outside edges are LEFT and TOP
+            if flat[(LEFT - rotations) % 4] and flat[(TOP - rotations) % 4]:
+                return number, rotations
+    raise Exception("Can't solve, there is no corner piece")
+
+
+def walk_left_border(partners: array, size: int) -> List[Placement]:
+    # one placement per row; this is the only serial part of the search and it
+    # only costs the side of the puzzle
+    column = [find_corner(partners, len(partners) // 4)]
+    for _ in range(size - 1):
+        column.append(next_placement(partners, column[-1], BOTTOM))
+    return column
+
+
+_partners: Optional[array] = None
+
+
+def _start_worker(partners: array) -> None:
+    global _partners
+    _partners = partners
+
+
+def _grow_band(seeds: List[Placement], size: int) -> Tuple[array, bytes]:
+    # fills whole rows from their left border pieces, row after row
+    pieces = array('q')
+    rotations = bytearray()
+    for seed in seeds:
+        placement = seed
+        pieces.append(placement[0])
+        rotations.append(placement[1])
+        for _ in range(size - 1):
+            placement = next_placement(_partners, placement, RIGHT)
+            pieces.append(placement[0])
+            rotations.append(placement[1])
+    return pieces, bytes(rotations)
+
+
+@dataclass
+class ParallelStats:
+    workers: int
+    bands: int
+    # time to index the edges and walk the border before the workers start
+    setup: float
+    grow: float
+    merge: float
+
+    @property
+    def elapsed(self) -> float:
+        return self.setup + self.grow + self.merge
+
+    def __str__(self) -> str:
+        return (f'{self.workers} workers, {self.bands} bands: setup {self.setup:.2f}s, grow {self.grow:.2f}s, '
+                f'merge {self.merge:.2f}s, total {self.elapsed:.2f}s')
+
+
+class ParallelSolver:
+    # regions are seeded from the left border, the top left corner and the
+    # pieces below it, then grown as bands of rows in worker processes and
+    # merged where the bands meet
+    puzzle: Puzzle
+    workers: int
+    bands: int
+
+    def __init__(self, puzzle: Puzzle, workers: int = os.cpu_count() or 1, bands: Optional[int] = None) -> None:
+        if workers < 1:
+            raise ValueError(f'The parallel solver needs at least one worker, got {workers}')
+
+        self.puzzle = puzzle
+        self.workers = workers
+        self.bands = max(1, min(bands or workers * 2, puzzle.size))
+
+    def solve(self) -> ParallelStats:
+        start = time.perf_counter()
+        size = self.puzzle.size
+        partners = build_partners(self.puzzle)
+        border = walk_left_border(partners, size)
+        starts = [band * size // self.bands for band in range(self.bands + 1)]
+        seeds = [border[first:last] for first, last in zip(starts, starts[1:])]
+        ready = time.perf_counter()
+
+        with ProcessPoolExecutor(self.workers, initializer=_start_worker, initargs=(partners,)) as executor:
+            bands = list(executor.map(_grow_band, seeds, [size] * self.bands))
+        grown = time.perf_counter()
+
+        # where bands meet, every bottom edge of the upper band has to match
+        # the top edge below it
+        for band in range(1, self.bands):
+            upper_pieces, upper_rotations = bands[band - 1]
+            lower_pieces, lower_rotations = bands[band]
+            offset = len(upper_pieces) - size
+            for column in range(size):
+                below = next_placement(partners, (upper_pieces[offset + column], upper_rotations[offset + column]),
+                                       BOTTOM)
+                if below != (lower_pieces[column], lower_rotations[column]):
+                    raise Exception("Can't solve, bands do not meet")
+
+        pieces = array('q')
+        rotations = bytearray()
+        for band_pieces, band_rotations in bands:
+            pieces.extend(band_pieces)
+            rotations.extend(band_rotations)
+        if len(set(pieces)) != len(self.puzzle.pieces):
+            raise Exception("Can't solve, a piece was placed twice")
+
+        for cell, (number, rotation) in enumerate(zip(pieces, rotations)):
+            piece: Piece = self.puzzle.pieces[number]
+            piece.rotate_edges(rotation)
+            self.puzzle.solution[cell // size][cell % size] = piece
+        end = time.perf_counter()
+        return ParallelStats(self.workers, self.bands, ready - start, grown - ready, end - grown)
+
+
+def solve_in_parallel(puzzle: Puzzle, workers: int = os.cpu_count() or 1) -> Tuple[List[List[Piece]], ParallelStats]:
+    stats = ParallelSolver(puzzle, workers).solve()
+    return puzzle.solution, stats
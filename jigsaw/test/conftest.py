@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# the jigsaw modules import each other by name, as when run from this
+# directory; there is no __init__.py here, so the jigsaw package does not
+# take the place of jigsaw.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _piece_numbers(puzzle):
+    return [[puzzle.pieces.index(piece) for piece in row] for row in puzzle.solution]
+
+
+@pytest.fixture
+def piece_numbers():
+    # the solution as positions in Puzzle.pieces, so solves of two copies of a puzzle can be compared
+    return _piece_numbers
+
+
+@pytest.fixture
+def assert_assembled():
+    def check(puzzle):
+        assert puzzle.is_solved()
+        assert sorted(number for row in _piece_numbers(puzzle) for number in row) == list(range(puzzle.size ** 2))
+    return check
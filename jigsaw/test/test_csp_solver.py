@@ -0,0 +1,50 @@
+import pytest
+
+from csp_solver import BacktrackingSolver, solve_with_backtracking
+from generator import generate_candidates, generate_puzzle
+
+
+@pytest.mark.parametrize('size', [2, 5, 12])
+def test_solve_when_edges_known_then_is_solved(size, assert_assembled):
+    puzzle = generate_puzzle(size, seed=size)
+
+    _, stats = solve_with_backtracking(puzzle)
+
+    assert_assembled(puzzle)
+    assert stats.nodes == size * size
+
+
+@pytest.mark.parametrize('size, decoys', [(4, 1), (8, 3), (12, 5)])
+def test_solve_when_candidates_are_ambiguous_then_is_solved(size, decoys, assert_assembled):
+    puzzle = generate_puzzle(size, seed=size)
+    candidates = generate_candidates(puzzle, decoys, seed=size)
+
+    stats = BacktrackingSolver(puzzle, candidates).solve()
+
+    assert_assembled(puzzle)
+    assert stats.nodes >= size * size
+
+
+def test_generate_candidates_when_decoys_added_then_true_partner_kept():
+    puzzle = generate_puzzle(6, seed=1)
+
+    candidates = generate_candidates(puzzle, 3, seed=1)
+
+    for edge_id, other_id in puzzle.matching_edges.items():
+        assert other_id in candidates[edge_id]
+        assert len(candidates[edge_id]) == 4
+
+
+def test_solve_when_node_limit_reached_then_raises():
+    puzzle = generate_puzzle(8, seed=8)
+
+    with pytest.raises(Exception):
+        BacktrackingSolver(puzzle, max_nodes=10).solve()
+
+
+def test_solve_when_true_partner_missing_then_raises():
+    puzzle = generate_puzzle(3, seed=3)
+    candidates = {edge_id: [] for edge_id in puzzle.matching_edges}
+
+    with pytest.raises(Exception):
+        BacktrackingSolver(puzzle, candidates).solve()
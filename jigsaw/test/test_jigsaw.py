@@ -0,0 +1,67 @@
+import pytest
+
+from csp_solver import solve_with_backtracking
+from generator import generate_puzzle
+from jigsaw import Orientation, Puzzle, Shape
+
+
+@pytest.mark.parametrize('size', [2, 3, 10, 40])
+def test_solve_when_generated_puzzle_then_is_solved(size, assert_assembled):
+    puzzle = generate_puzzle(size, seed=size)
+
+    puzzle.solve()
+
+    assert_assembled(puzzle)
+
+
+def test_solve_when_solved_then_edge_index_is_empty():
+    puzzle = generate_puzzle(8, seed=1)
+
+    puzzle.solve()
+
+    assert puzzle.edge_index == {}
+
+
+def test_solve_when_compared_with_backtracking_then_same_assembly(piece_numbers):
+    indexed = generate_puzzle(12, seed=3)
+    backtracked = generate_puzzle(12, seed=3)
+
+    indexed.solve()
+    solve_with_backtracking(backtracked)
+
+    assert piece_numbers(indexed) == piece_numbers(backtracked)
+
+
+def test_solve_when_edge_has_no_match_then_raises():
+    puzzle = generate_puzzle(4, seed=2)
+    edge_id = next(iter(puzzle.matching_edges))
+    del puzzle.matching_edges[edge_id]
+
+    with pytest.raises(Exception):
+        puzzle.solve()
+
+
+def test_is_solved_when_pieces_swapped_then_false():
+    puzzle = generate_puzzle(4, seed=4)
+    puzzle.solve()
+
+    puzzle.solution[1][1], puzzle.solution[1][2] = puzzle.solution[1][2], puzzle.solution[1][1]
+
+    assert not puzzle.is_solved()
+
+
+def test_puzzle_when_piece_count_wrong_then_raises():
+    puzzle = generate_puzzle(3, seed=0)
+
+    with pytest.raises(ValueError):
+        Puzzle(puzzle.pieces[:-1], puzzle.matching_edges, 3)
+
+
+def test_solve_when_solved_then_top_left_corner_faces_out():
+    puzzle = generate_puzzle(5, seed=5)
+
+    corner = puzzle.solve()[0][0]
+
+    assert corner.count_flat_edges() == 2
+    assert corner.edges[Orientation.LEFT].shape == Shape.FLAT
+    assert corner.edges[Orientation.TOP].shape == Shape.FLAT
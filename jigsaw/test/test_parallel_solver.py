@@ -0,0 +1,42 @@
+import pytest
+
+from generator import generate_puzzle
+from parallel_solver import ParallelSolver, build_partners, solve_in_parallel
+
+
+@pytest.mark.parametrize('size, workers, bands', [(2, 1, None), (7, 2, 3), (16, 2, 16), (16, 3, None)])
+def test_solve_when_grown_in_bands_then_is_solved(size, workers, bands, assert_assembled):
+    puzzle = generate_puzzle(size, seed=size)
+
+    stats = ParallelSolver(puzzle, workers, bands).solve()
+
+    assert_assembled(puzzle)
+    assert stats.bands == min(bands or workers * 2, size)
+
+
+def test_solve_when_compared_with_serial_solve_then_same_assembly(piece_numbers):
+    serial = generate_puzzle(12, seed=12)
+    parallel = generate_puzzle(12, seed=12)
+
+    serial.solve()
+    solve_in_parallel(parallel, workers=2)
+
+    assert piece_numbers(parallel) == piece_numbers(serial)
+
+
+def test_build_partners_when_edges_match_then_slots_point_at_each_other():
+    puzzle = generate_puzzle(5, seed=5)
+
+    partners = build_partners(puzzle)
+
+    assert len(partners) == 4 * 25
+    for slot, partner in enumerate(partners):
+        if partner >= 0:
+            assert partners[partner] == slot
+    # a 5x5 puzzle has 20 flat edges on its border
+    assert sum(partner < 0 for partner in partners) == 20
+
+
+def test_parallel_solver_when_no_workers_then_raises():
+    with pytest.raises(ValueError):
+        ParallelSolver(generate_puzzle(3, seed=3), workers=0)